@@ -1,8 +1,49 @@
 import urllib
 import urllib.request
-import pandas as pd
-from pandas import DataFrame
-import numpy as np 
+import re
+
+from . import tables
+from .lazy import np
+
+
+_PATH = "DB//BloodExpsomeDatabase_version_1.0.csv"
+
+# the lookup column of each identifier
+_IDENTIFIERS = {"hmdb":"HMDB_ID","cid":"PubChem_CID","kegg":"KEGG_ID","formula":"Molecular_Formula",
+    "smiles":"CanonicalSMILES","inchikey":"InChIKey"}
+
+# how each identifier is recognized, in the order they are tried (detect moves formula after SMILES when it is not in Hill order)
+_PATTERNS = [
+    ("HMDB", re.compile(r"HMDB\d+")),
+    ("InChIKey", re.compile(r"[A-Z]{14}-[A-Z]{10}-[A-Z]")),
+    ("KEGG", re.compile(r"C\d{5}")),
+    ("CID", re.compile(r"\d+")),
+    ("formula", re.compile(r"(?:[A-Z][a-z]?\d*)+")),
+    ("SMILES", re.compile(r"[A-Za-z0-9@+\-\[\]()=#$%/\\.:*]+")),
+]
+
+# the elements of a formula
+_ELEMENT = re.compile(r"([A-Z][a-z]?)\d*")
+
+
+def _database():
+    # read once, the identifier columns are indexed by their str() like the lookups always compared them
+    return tables.table(_PATH, _IDENTIFIERS.values(), as_str=True)
+
+
+def build_tables():
+
+    """
+
+    Convert the Blood Exposome CSV file of DB/ into memory-mapped NumPy files, loaded instead of the CSV file from then on
+
+    Returns:
+
+        str path of the directory written
+
+    """
+
+    return tables.build(_PATH, list(_IDENTIFIERS.values()), as_str=True)
 
 
 def GetInfo(accessions, identifier = "hmdb"):
@@ -34,42 +75,115 @@ def GetInfo(accessions, identifier = "hmdb"):
     if type(accessions) != list:
         raise TypeError ("GetInfo takes accessions as a list as an argument")
 
-    df_db = pd.read_csv("DB//BloodExpsomeDatabase_version_1.0.csv")
+    column = _IDENTIFIERS.get(identifier.lower()) if type(identifier) == str else None
+    if column is None:
+        return None
 
-    if identifier == "HMDB":
-        df_db["HMDB_ID"]= df_db["HMDB_ID"].apply(str)
+    df_db = _database().lookup(column, accessions)
+    df_db[column] = df_db[column].apply(str)
+    return(df_db)
 
-        df_db = df_db.loc[df_db["HMDB_ID"].isin(accessions)]
-        return(df_db)
 
-    elif identifier == "CID":
-        df_db["PubChem_CID"]= df_db["PubChem_CID"].apply(str)
-        df_db = df_db.loc[df_db["PubChem_CID"].isin(accessions)]
+def detect(accession):
 
-        return(df_db)
+    """
+
+    Guess the identifier type of an accession from its pattern
+
+    Args:
 
-    elif identifier == "KEGG":
-        df_db["KEGG_ID"]= df_db["KEGG_ID"].apply(str)
+        accession (str): HMDB ID, InChIKey, KEGG ID, PubChem CID, formula or SMILES
 
-        df_db = df_db.loc[df_db["KEGG_ID"].isin(accessions)]
-        return(df_db)
+    Returns:
 
-    elif identifier == "formula":
-        df_db["Molecular_Formula"]= df_db["Molecular_Formula"].apply(str)
+        list of the identifier types it could be, in the order they are tried (e.g. ["formula","SMILES"] for CO,
+        ["SMILES","formula"] for CCO which is not a formula in Hill order)
 
-        df_db = df_db.loc[df_db["Molecular_Formula"].isin(accessions)]
-        return(df_db)
-    
-    elif identifier == "SMILES":
-        df_db["CanonicalSMILES"]= df_db["CanonicalSMILES"].apply(str)
+    """
 
-        df_db = df_db.loc[df_db["CanonicalSMILES"].isin(accessions)]
-        return(df_db)
-        
-    elif identifier == "InChIKey":
-        df_db["InChIKey"]= df_db["InChIKey"].apply(str)
-        df_db = df_db.loc[df_db["InChIKey"].isin(accessions)]
-        return(df_db)
+    accession = accession.strip()
+    found = [identifier for identifier, pattern in _PATTERNS if pattern.fullmatch(accession)]
+    # CCO fits the formula pattern too, but a formula written in Hill order never repeats an element
+    if "formula" in found and "SMILES" in found and not _is_hill(accession):
+        found.remove("formula")
+        found.append("formula")
+    return found
 
 
+def _is_hill(formula):
+    # C then H then the other elements in alphabetical order (all of them alphabetical without carbon), each once
+    elements = _ELEMENT.findall(formula)
+    if len(set(elements)) != len(elements):
+        return False
+    if "C" in elements:
+        head = ["C", "H"] if "H" in elements else ["C"]
+        return elements[:len(head)] == head and elements[len(head):] == sorted(elements[len(head):])
+    return elements == sorted(elements)
 
+
+def Resolve(accessions):
+
+    """
+
+    Retrieve the Blood Exposome Database rows of a list mixing identifier types, each identifier type detected from its pattern
+
+    Args:
+
+        accessions (list): HMDB IDs, InChIKeys, KEGG IDs, PubChem CIDs, formulas and SMILES in any mix
+
+    Returns:
+
+        A pandas object for Data frame contains the matching rows, with the columns Query (the accession) and Matched Identifier
+        (the identifier type it was found as) first, in the order of the accessions. The accessions that match nothing are left out
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Note:
+
+        Each identifier column is looked up once for all the accessions, an accession is then matched as the first type of
+        detect(accession) that has rows (e.g. CCO as SMILES before formula).
+
+    Example:
+
+        df = Resolve(["HMDB0000001","RDHQFKQIGNGIED-UHFFFAOYSA-N","C00001","H2O"])
+        print (df)
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("Resolve takes accessions as a list as an argument")
+
+    database = _database()
+    candidates = [(accession, detect(str(accession))) for accession in accessions]
+
+    # every value of a column is looked up at once, in one lookup of its index
+    requested = {}
+    for accession, identifiers in candidates:
+        value = str(accession).strip()
+        for identifier in identifiers:
+            # the CIDs of the file are read as float when some of them are missing
+            values = [value, f"{value}.0"] if identifier == "CID" else [value]
+            requested.setdefault(_IDENTIFIERS[identifier.lower()], set()).update(values)
+    found = {column: database.matches(column, values) for column, values in requested.items()}
+
+    queries, matched, positions = [], [], []
+    for accession, identifiers in candidates:
+        value = str(accession).strip()
+        # the first identifier type, in the order of detect, that matches some rows
+        for identifier in identifiers:
+            column_found = found[_IDENTIFIERS[identifier.lower()]]
+            values = [value, f"{value}.0"] if identifier == "CID" else [value]
+            rows = [column_found[each] for each in values if each in column_found]
+            if rows:
+                rows = np.sort(np.concatenate(rows))
+                queries.extend([accession] * len(rows))
+                matched.extend([identifier] * len(rows))
+                positions.append(rows)
+                break
+
+    df_db = database.rows(np.concatenate(positions) if positions else [])
+    df_db.insert(0, "Matched Identifier", matched)
+    df_db.insert(0, "Query", queries)
+    return(df_db)
@@ -1,39 +1,241 @@
 import urllib
-import urllib.request
-import pandas as pd
-from pandas import DataFrame
+import urllib.parse
+from . import ids, images, local, parallel, records, throttle, transport
+from .lazy import aio, pd
 
 
+class Record(records.Record):
 
-def Geninfo(accessions):
+    """
+
+    One metabolite page from The Human Metabolome Database (HMDB), downloaded and parsed only once
+
+    Args:
+
+        accession (str): HMDB ID
+
+    Raises:
+
+        TypeError if argument (accession) is not a string
+
+    Note:
+
+        The page is fetched on first use, and every section (Geninfo, SynonymsData, ExpProp, PredProp, Spectra,
+        NConcsData, AConcsData and Pathways) is built lazily from that one fetch and then kept.
+        A Record can be passed anywhere a list of HMDB IDs is accepted by those functions.
+
+    Example:
+
+        record = Record("HMDB0000001")
+        print (record.Geninfo)
+        print (record.Pathways)
 
     """
 
-    Retrieve information about small molecule metabolites found in the human body from The Human Metabolome Database (HMDB)
+    main_url = "http://www.hmdb.ca/metabolites/"
+
+    Geninfo = property(lambda self: self._section("Geninfo", _Geninfo))
+    SynonymsData = property(lambda self: self._section("SynonymsData", _SynonymsData))
+    ExpProp = property(lambda self: self._section("ExpProp", _ExpProp))
+    PredProp = property(lambda self: self._section("PredProp", _PredProp))
+    Spectra = property(lambda self: self._section("Spectra", _Spectra))
+    NConcsData = property(lambda self: self._section("NConcsData", _NConcsData))
+    AConcsData = property(lambda self: self._section("AConcsData", _AConcsData))
+    Pathways = property(lambda self: self._section("Pathways", _Pathways))
+
+
+def fetch_all(accessions, concurrency=1):
+
+    """
+
+    Download and parse the HMDB page of each metabolite once, to serve all of its sections from that one fetch
 
     Args:
 
-        accessions (list): list of HMDB ID 
+        accessions (list): list of HMDB ID
+
+        concurrency (int): default = 1, number of pages downloaded at the same time, the results keep the order of accessions
 
     Returns:
 
-        A generator object for Data frame(s) contains general information retrieved from HMDB about metabolites
+        A generator object for Record(s), one for each HMDB ID
 
     Raises:
 
         TypeError if argument (accessions) is not a list
 
+    Example:
+
+        for record in fetch_all(["HMDB0000001","HMDB0000002","HMDB0000005"], concurrency=4):
+            print (record.Geninfo)
+            print (record.NConcsData)
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("fetch_all takes list as an argument")
+
+    return records.fetch_all(Record, accessions, concurrency)
+
+
+def set_backend(backend="web", path=None):
+
+    """
+
+    Choose where the metabolite sections are read from
+
+    Args:
+
+        backend (str): default = "web", either "web" to download the HMDB pages, or "local" to read the store built with build_local
+
+        path (str): path of the local store, needed when backend is "local"
+
+    Raises:
+
+        TypeError if argument (backend) is not "web" or "local"
+
+        TypeError if argument (path) is not a string of an HMDB store when backend is "local"
+
     Note:
 
-        If an accession has no information in HMDB the function will return an empty data frame
+        With the local backend Geninfo, SynonymsData, ExpProp, PredProp, NConcsData, AConcsData and Pathways return
+        the same data frames without any download. Spectra is not in the dump and is still read from the web.
 
     Example:
 
-        for i_data in Geninfo(["HMDB0000001","HMDB0000002","HMDB0000005"]):
-            print (i_data.head())
+        build_local("hmdb_metabolites.xml", "hmdb.sqlite")
+        set_backend("local", "hmdb.sqlite")
+        for i_data in Geninfo(["HMDB0000001","HMDB0000002"]):
+            print (i_data)
+
+    """
+
+    records.set_backend(Record, backend, path)
+
+
+def set_rate_limit(**kwargs):
+
+    """
+
+    Pace the requests sent to HMDB (e.g. to stay under the rate the server tolerates)
+
+    Args:
+
+        the keyword arguments of throttle.configure (rate, burst, adaptive, concurrency, min_concurrency, max_concurrency, slow, failures, cooldown)
+
+    Raises:
+
+        TypeError if an argument is not one of the settings of throttle.configure
+
+    Note:
+
+        With adaptive=True the number of requests in flight adapts between min_concurrency and max_concurrency:
+        it grows while HMDB answers quickly and is halved after a 429/503 answer or a latency spike.
+
+    Example:
+
+        set_rate_limit(rate=5, burst=5, adaptive=True, max_concurrency=8)
+
+    """
+
+    throttle.configure("HMDB", **kwargs)
+
+
+def structures(accessions, out_dir=".", concurrency=1):
+    """
+
+    Download the structure images of metabolites from The Human Metabolome Database (HMDB)
+
+    Args:
+
+        accessions (list): list of HMDB IDs
+
+        out_dir (str): default = ".", directory of the images, one file <accession>.png per accession
+
+        concurrency (int): default = 1, number of images downloaded at the same time
+
+    Returns:
+
+        Data frame of the Path, Status and Error of the image of each accession, see images.download
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        structures(["HMDB0000001", "HMDB0000002"], "structures", concurrency=8)
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("structures takes list as an argument")
+
+    return images.download(accessions, out_dir, "HMDB", concurrency)
+
+
+def _xml_sections(element):
+    # the same data frames as the web sections, built from one metabolite element of the XML dump
+    accession = local.accession(element)
+    sections = {
+        "Geninfo": local.xml_geninfo(element, _Geninfo_rows, "HMDB ID"),
+        "SynonymsData": local.xml_synonyms(element),
+        "ExpProp": local.xml_properties(element, "experimental_properties/property", "Reference"),
+        "PredProp": local.xml_properties(element, "predicted_properties/property", "Source"),
+        "NConcsData": local.xml_concentrations(element, "normal_concentrations/concentration"),
+        "AConcsData": local.xml_concentrations(element, "abnormal_concentrations/concentration"),
+        "Pathways": local.xml_pathways(element, accession),
+    }
+    return accession, local.xml_compound(element), local.drop_empty(sections)
+
+
+def build_local(xml_path, path="hmdb.sqlite"):
+
+    """
+
+    Build the local HMDB store from the official metabolites dump (hmdb_metabolites.xml from hmdb.ca/downloads)
+
+    Args:
+
+        xml_path (str): path of the extracted XML dump
+
+        path (str): default = "hmdb.sqlite", path of the store to write (replaced if it exists)
+
+    Returns:
+
+        int number of metabolites written
+
+    Raises:
+
+        TypeError if argument (xml_path) is not a string
+
+    Note:
+
+        The dump is streamed one metabolite at a time, so the memory used does not grow with its size.
+
+    Example:
+
+        print (build_local("hmdb_metabolites.xml", "hmdb.sqlite"))
 
     """
 
+    if type(xml_path) != str:
+        raise TypeError ("xml_path argument should be a string")
+
+    items = (_xml_sections(element) for element in local.iterparse(xml_path, "metabolite"))
+    return local.build(path, "HMDB", items)
+
+
+#the general information rows of the page
+_Geninfo_rows = ["Version","Status","Creation Date","Update Date","HMDB ID","Common Name","Chemical Formula","Average Molecular Weight",
+    "Monoisotopic Molecular Weight","IUPAC Name","Traditional Name","CAS Registry Number",
+    "SMILES","InChI Identifier","InChI Key","Kingdom","Super Class","Class","Sub Class","Direct Parent",
+    "Molecular Framework","Role","State","Cellular Locations","Biospecimen Locations","Tissue Locations",
+    "DrugBank ID","FoodDB ID","Chemspider ID","KEGG Compound ID","ChEBI ID","PubChem Compound"]
+
+
+def _Geninfo(record):
+
     def add_all_df(dfdf_new):
 
     
@@ -44,50 +246,80 @@ def Geninfo(accessions):
 
         return dfdf
 
+    #take only the general information
+    take_from_tables0 = _Geninfo_rows
+
+    # get the data in form of tables
+    try:
+        tables = record.fetch()
+        #removing row with no data
+        tables0 = tables[0].iloc[:,0:2]
+        #rename the col 
+        tables0.columns = ["col1", "col2"]
+
+        tables0 = tables0[tables0["col1"].isin(take_from_tables0)]
+        tables0 = add_all_df(tables0)
+
+    except Exception:
+        not_found = ["NaN"] * len(take_from_tables0)
+        not_found = dict( zip(take_from_tables0,not_found) )
+        tables0 = pd.DataFrame(data=not_found , index= [0])
+
+        tables0 = tables0.rename(index={0:record.accession })
+
+    return tables0
+
+
+def Geninfo(accessions, concurrency=1):
+
+    """
+
+    Retrieve information about small molecule metabolites found in the human body from The Human Metabolome Database (HMDB)
+
+    Args:
+
+        accessions (list): list of HMDB ID and/or Record
+
+        concurrency (int): default = 1, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        A generator object for Data frame(s) contains general information retrieved from HMDB about metabolites
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Note:
+
+        If an accession has no information in HMDB the function will return an empty data frame
+
+    Example:
+
+        for i_data in Geninfo(["HMDB0000001","HMDB0000002","HMDB0000005"]):
+            print (i_data.head())
+
+    """
+
     if type(accessions) != list:
         raise TypeError ("Geninfo takes list as an argument")
 
-    main_url = "http://www.hmdb.ca/metabolites/"
-    for i_acc in accessions:
-        # creating the query search url by accessions
-        api_request = main_url + i_acc
-        # get the data in form of tables
-        try:
-            tables = pd.read_html(api_request)
-            #removing row with no data
-            tables0 = tables[0].iloc[:,0:2]
-            #rename the col 
-            tables0.columns = ["col1", "col2"]
-  
-            #take only the general information
-            take_from_tables0 = ["Version","Status","Creation Date","Update Date","HMDB ID","Common Name","Chemical Formula","Average Molecular Weight",
-            "Monoisotopic Molecular Weight","IUPAC Name","Traditional Name","CAS Registry Number",
-            "SMILES","InChI Identifier","InChI Key","Kingdom","Super Class","Class","Sub Class","Direct Parent",
-            "Molecular Framework","Role","State","Cellular Locations","Biospecimen Locations","Tissue Locations",
-            "DrugBank ID","FoodDB ID","Chemspider ID","KEGG Compound ID","ChEBI ID","PubChem Compound"]
-            
-            tables0 = tables0[tables0["col1"].isin(take_from_tables0)]
-            tables0 = add_all_df(tables0)
-
-            yield tables0
+    for record in records.fetch_all(Record, accessions, concurrency):
+        yield record.Geninfo
 
-        except:
-            take_from_tables0 = ["Version","Status","Creation Date","Update Date","HMDB ID","Common Name","Chemical Formula","Average Molecular Weight",
-            "Monoisotopic Molecular Weight","IUPAC Name","Traditional Name","CAS Registry Number",
-            "SMILES","InChI Identifier","InChI Key","Kingdom","Super Class","Class","Sub Class","Direct Parent",
-            "Molecular Framework","Role","State","Cellular Locations","Biospecimen Locations","Tissue Locations",
-            "DrugBank ID","FoodDB ID","Chemspider ID","KEGG Compound ID","ChEBI ID","PubChem Compound"]
 
-            not_found = ["NaN"] * len(take_from_tables0)
-            not_found = dict( zip(take_from_tables0,not_found) )
-            tables0 = pd.DataFrame(data=not_found , index= [0])
+def _SynonymsData(record):
 
-            tables0 = tables0.rename(index={0:i_acc })
+    try:
+        tables = record.fetch()
+        tables = tables[1]
+    except Exception:
+        tables = pd.DataFrame(data = {"Value":["NA"], "Source":["NA"]})
 
-            yield tables0
+    return records.rename_index(tables, record.accession)
 
 
-def SynonymsData(accessions):
+def SynonymsData(accessions, concurrency=1):
 
     """
 
@@ -95,7 +327,9 @@ def SynonymsData(accessions):
 
     Args:
 
-        accessions (list): list of HMDB ID
+        accessions (list): list of HMDB ID and/or Record
+
+        concurrency (int): default = 1, number of pages downloaded at the same time, the results keep the order of accessions
 
     Returns:
 
@@ -112,31 +346,26 @@ def SynonymsData(accessions):
 
     """
 
+
     if type(accessions) != list:
         raise TypeError ("SynonymsData takes list as an argument")
 
-    main_url = "http://www.hmdb.ca/metabolites/"
-    
-    for i_acc in accessions:
-        # creating the query search url by accessions
-        api_request = main_url + i_acc
-        try:
-            tables = pd.read_html(api_request)
-            tables = tables[1]
-        except:
-            tables = pd.DataFrame(data = {"Value":["NA"], "Source":["NA"]})
-        
-        # to make the row.names =  to the id 
-        index_name = range(0,len(tables))
-        index_value = f"{i_acc}," *len(index_name)
-        index_value = index_value.split(",")
-        dictionary = dict(zip(index_name, index_value))
-        tables = tables.rename(index= dictionary )
+    for record in records.fetch_all(Record, accessions, concurrency):
+        yield record.SynonymsData
+
 
-        yield tables
+def _ExpProp(record):
 
+    try:
+        tables = record.fetch()
+        tables = tables[2]
+    except Exception:
+        tables = pd.DataFrame(data = {"Property":["NA"], "Value":["NA"], "Reference":["NA"]    })
+
+    return records.rename_index(tables, record.accession)
 
-def ExpProp(accessions):
+
+def ExpProp(accessions, concurrency=1):
 
     """
 
@@ -144,7 +373,9 @@ def ExpProp(accessions):
 
     Args:
 
-        accessions (list): list of HMDB ID
+        accessions (list): list of HMDB ID and/or Record
+
+        concurrency (int): default = 1, number of pages downloaded at the same time, the results keep the order of accessions
 
     Returns:
 
@@ -165,26 +396,22 @@ def ExpProp(accessions):
     if type(accessions) != list:
         raise TypeError ("SynonymsData takes list as an argument")
 
-    main_url = "http://www.hmdb.ca/metabolites/"
-    for i_acc in accessions:
-        # creating the query search url by accessions
-        api_request = main_url + i_acc
-        try:
-            tables = pd.read_html(api_request)
-            tables = tables[2]
-        except:
-            tables = pd.DataFrame(data = {"Property":["NA"], "Value":["NA"], "Reference":["NA"]    })
-
-        # to make the row.names =  to the id 
-        index_name = range(0,len(tables))
-        index_value = f"{i_acc}," *len(index_name)
-        index_value = index_value.split(",")
-        dictionary = dict(zip(index_name, index_value))
-        tables = tables.rename(index= dictionary )
-            
-        yield tables
-            
-def PredProp(accessions):
+    for record in records.fetch_all(Record, accessions, concurrency):
+        yield record.ExpProp
+
+
+def _PredProp(record):
+
+    try:
+        tables = record.fetch()
+        tables = tables[3]
+    except Exception:
+        tables = pd.DataFrame(data = {"Property":["NA"],"Value":["NA"],"Source":["NA"]})
+
+    return records.rename_index(tables, record.accession)
+
+
+def PredProp(accessions, concurrency=1):
 
     """
 
@@ -192,7 +419,9 @@ def PredProp(accessions):
 
     Args:
 
-        accessions (list): list of HMDB ID
+        accessions (list): list of HMDB ID and/or Record
+
+        concurrency (int): default = 1, number of pages downloaded at the same time, the results keep the order of accessions
 
     Returns:
 
@@ -213,27 +442,22 @@ def PredProp(accessions):
     if type(accessions) != list:
         raise TypeError ("SynonymsData takes list as an argument")
 
-    main_url = "http://www.hmdb.ca/metabolites/"
-    for i_acc in accessions:
-        # creating the query search url by accessions
-        api_request = main_url + i_acc
-        try:
-            tables = pd.read_html(api_request)
-            tables = tables[3]
-        except:
-            tables = pd.DataFrame(data = {"Property":["NA"],"Value":["NA"],"Source":["NA"]})
-
-        # to make the row.names =  to the id 
-        index_name = range(0,len(tables))
-        index_value = f"{i_acc}," *len(index_name)
-        index_value = index_value.split(",")
-        dictionary = dict(zip(index_name, index_value))
-        tables = tables.rename(index= dictionary )
-
-        yield tables
-
-
-def Spectra(accessions):
+    for record in records.fetch_all(Record, accessions, concurrency):
+        yield record.PredProp
+
+
+def _Spectra(record):
+
+    try:
+        tables = record.fetch()
+        tables = tables.section("Spectra", 4).iloc[0:,0:3]
+    except Exception:
+        tables = pd.DataFrame(data = {"Spectrum Type":["NA"],  "Description":["NA"], "Splash Key":["NA"] })
+
+    return records.rename_index(tables, record.accession)
+
+
+def Spectra(accessions, concurrency=1):
     
     """
 
@@ -241,7 +465,9 @@ def Spectra(accessions):
 
     Args:
 
-        accessions (list): list of LMDB ID 
+        accessions (list): list of HMDB ID and/or Record
+
+        concurrency (int): default = 1, number of pages downloaded at the same time, the results keep the order of accessions
 
     Returns:
 
@@ -262,35 +488,32 @@ def Spectra(accessions):
     if type(accessions) != list:
         raise TypeError ("Spectra takes list as an argument")
 
-    main_url = "http://www.hmdb.ca/metabolites/"
-    for i_acc in accessions:
-        # creating the query search url by accessions
-        api_request = main_url + i_acc
-        try:
-            tables = pd.read_html(api_request)
-            tables = tables[4].iloc[0:,0:3]
-        except:
-            
-            tables = pd.DataFrame(data = {"Spectrum Type":["NA"],  "Description":["NA"], "Splash Key":["NA"] })
+    for record in records.fetch_all(Record, accessions, concurrency):
+        yield record.Spectra
+
 
-        # to make the row.names =  to the id 
-        index_name = range(0,len(tables))
-        index_value = f"{i_acc}," *len(index_name)
-        index_value = index_value.split(",")
-        dictionary = dict(zip(index_name, index_value))
-        tables = tables.rename(index= dictionary )
+def _NConcsData(record):
+
+    try:
+        tables = record.fetch()
+        tables = tables[6].iloc[0:,0:6]
+        tables.rename(columns={"Reference": "Pubmed"},inplace=True)
+    except Exception:
+        tables = pd.DataFrame(data = {"Biospecimen":["NA"], "Status":["NA"], "Value":["NA"], "Age":["NA"], "Sex":["NA"], "Condition":["NA"]})
 
-        yield tables
+    return records.rename_index(tables, record.accession)
 
 
-def NConcsData(accessions):
+def NConcsData(accessions, concurrency=1):
     """
 
     Retrieve Normal Concentrations Properties information about small molecule metabolites found in the human body from The Human Metabolome Database (HMDB)
 
     Args:
 
-        accessions (list): list of HMDB ID 
+        accessions (list): list of HMDB ID and/or Record
+
+        concurrency (int): default = 1, number of pages downloaded at the same time, the results keep the order of accessions
 
     Returns:
 
@@ -311,34 +534,32 @@ def NConcsData(accessions):
     if type(accessions) != list:
         raise TypeError ("ConcsData takes list as an argument")
 
-    main_url = "http://www.hmdb.ca/metabolites/"
-    for i_acc in accessions:
-        # creating the query search url by accessions
-        api_request = main_url + i_acc
-        try:
-            tables = pd.read_html(api_request)
-            tables = tables[6].iloc[0:,0:6]
-            tables.rename(columns={"Reference": "Pubmed"},inplace=True)
-        except:
-            tables = pd.DataFrame(data = {"Biospecimen":["NA"], "Status":["NA"], "Value":["NA"], "Age":["NA"], "Sex":["NA"], "Condition":["NA"]})
+    for record in records.fetch_all(Record, accessions, concurrency):
+        yield record.NConcsData
+
+
+def _AConcsData(record):
 
-        # to make the row.names =  to the id 
-        index_name = range(0,len(tables))
-        index_value = f"{i_acc}," *len(index_name)
-        index_value = index_value.split(",")
-        dictionary = dict(zip(index_name, index_value))
-        tables = tables.rename(index= dictionary )
+    try:
+        tables = record.fetch()
+        tables = tables[7].iloc[0:,0:6]
+        tables.rename(columns={"Reference": "Pubmed"},inplace=True)
+    except Exception:
+        tables = pd.DataFrame(data = {"Biospecimen":["NA"], "Status":["NA"], "Value":["NA"], "Age":["NA"], "Sex":["NA"], "Condition":["NA"]})
+
+    return records.rename_index(tables, record.accession)
 
-        yield tables
 
-def AConcsData(accessions):
+def AConcsData(accessions, concurrency=1):
     """
 
     Retrieve Abnormal Concentrations Properties information about small molecule metabolites found in the human body from The Human Metabolome Database (HMDB)
 
     Args:
 
-        accessions (list): list of HMDB ID 
+        accessions (list): list of HMDB ID and/or Record
+
+        concurrency (int): default = 1, number of pages downloaded at the same time, the results keep the order of accessions
 
     Returns:
 
@@ -359,34 +580,37 @@ def AConcsData(accessions):
     if type(accessions) != list:
         raise TypeError ("ConcsData takes list as an argument")
 
-    main_url = "http://www.hmdb.ca/metabolites/"
-    for i_acc in accessions:
-        # creating the query search url by accessions
-        api_request = main_url + i_acc
-        try:
-            tables = pd.read_html(api_request)
-            tables = tables[7].iloc[0:,0:6]
-            tables.rename(columns={"Reference": "Pubmed"},inplace=True)
-        except:
-            tables = pd.DataFrame(data = {"Biospecimen":["NA"], "Status":["NA"], "Value":["NA"], "Age":["NA"], "Sex":["NA"], "Condition":["NA"]})
-        # to make the row.names =  to the id 
-        index_name = range(0,len(tables))
-        index_value = f"{i_acc}," *len(index_name)
-        index_value = index_value.split(",")
-        dictionary = dict(zip(index_name, index_value))
-        tables = tables.rename(index= dictionary )
+    for record in records.fetch_all(Record, accessions, concurrency):
+        yield record.AConcsData
 
-        yield tables
 
+def _Pathways(record):
 
-def Pathways(accessions):
+    try:
+        tables = record.fetch()
+        tables = tables.section("Pathways", 5).copy()
+        for index in range(len(tables.columns)):
+            try:
+                tables.drop(tables.columns[1], axis=1, inplace=True)
+            except Exception:
+                break
+        tables.rename(columns={tables.columns[0]:record.accession},inplace=True)
+    except Exception:
+        tables = pd.DataFrame(data = {record.accession:["NaN"]})
+
+    return tables
+
+
+def Pathways(accessions, concurrency=1):
     """
 
     Retrieve Pathways names about small molecule metabolites found in the human body from The Human Metabolome Database (HMDB)
 
     Args:
 
-        accessions (list): list of HMDB ID
+        accessions (list): list of HMDB ID and/or Record
+
+        concurrency (int): default = 1, number of pages downloaded at the same time, the results keep the order of accessions
 
     Returns:
 
@@ -407,22 +631,8 @@ def Pathways(accessions):
     if type(accessions) != list:
         raise TypeError ("SynonymsData takes list as an argument")
 
-    main_url = "http://www.hmdb.ca/metabolites/"
-    for i_acc in accessions:
-        # creating the query search url by accessions
-        api_request = main_url + i_acc
-        try:
-            tables = pd.read_html(api_request)
-            tables = tables[5]
-            for index in range(len(tables.columns)):
-                try:
-                    tables.drop(tables.columns[1], axis=1, inplace=True)
-                except:
-                    break
-            tables.rename(columns={tables.columns[0]:i_acc},inplace=True)
-        except:
-            tables = pd.DataFrame(data = {i_acc:["NaN"]})
-        yield tables
+    for record in records.fetch_all(Record, accessions, concurrency):
+        yield record.Pathways
 
 
 def BroDis(status=list(),biospecimen=list(),metabolite=list(),disease=list(),inborn_errors=False):
@@ -513,7 +723,7 @@ def BroDis(status=list(),biospecimen=list(),metabolite=list(),disease=list(),inb
     api_request = main_url + api_request 
     
     #get the diseases names form the xml
-    xml = urllib.request.urlopen(api_request).read()
+    xml = transport.get(api_request)
     
     def find_dis_name(xml):
         import re
@@ -525,7 +735,7 @@ def BroDis(status=list(),biospecimen=list(),metabolite=list(),disease=list(),inb
         return names_final
 
     try:
-        tables = pd.read_html(api_request)
+        tables = transport.parse_html(xml.decode("utf-8", errors="replace"))
         diseases_names = find_dis_name(xml)
 
         for i_tables, name in zip(range(len(tables)), diseases_names):
@@ -629,7 +839,7 @@ def Biospecimen(status=list(),biospecimen=list(),metabolite=list(),disease=list(
     api_request = main_url + api_request 
     
     #get the diseases names form the xml
-    xml = urllib.request.urlopen(api_request).read()
+    xml = transport.get(api_request)
     
     def find_dis_name(xml):
         import re
@@ -641,7 +851,7 @@ def Biospecimen(status=list(),biospecimen=list(),metabolite=list(),disease=list(
         return names_final
 
     try:
-        tables = pd.read_html(api_request)
+        tables = transport.parse_html(xml.decode("utf-8", errors="replace"))
         diseases_names = find_dis_name(xml)
 
         for i_tables, name in zip(range(len(tables)), diseases_names):
@@ -662,7 +872,7 @@ def Biospecimen(status=list(),biospecimen=list(),metabolite=list(),disease=list(
         yield "No diseases found"
 
 
-def Bioclass(status=list(),biospecimen=list()):
+def iBioclass(status=list(),biospecimen=list(),concurrency=4):
     """
 
     Browsing diseases information about small molecule metabolites found in the human body from The Human Metabolome Database (HMDB)
@@ -673,9 +883,11 @@ def Bioclass(status=list(),biospecimen=list()):
 
         biospecimen (list): list of keywords to filter by biospecimen (blood,saliva,urine,csf,feces,sweat,breast_milk,bile,amniotic_fluid, or/and other_fluids)
 
+        concurrency (int): default = 4, number of result pages fetched ahead at the same time
+
     Returns:
 
-       A generator object for Data frame(s) contains the browsing diseases information of metabolites from LMDB
+       A generator object for Data frame(s), one for each page of the browsing classes of metabolites from HMDB, yielded as soon as it is parsed
 
     Raises:
 
@@ -685,7 +897,8 @@ def Bioclass(status=list(),biospecimen=list()):
 
     Example:
 
-        print (Bioclass(status=[],biospecimen=["other_fluids"]))
+        for data in iBioclass(status=[],biospecimen=["other_fluids"]):
+            print (data)
 
     """
 
@@ -718,85 +931,118 @@ def Bioclass(status=list(),biospecimen=list()):
             dict_url[i_bio] = "1"
     api_request = urllib.parse.urlencode(dict_url)
     api_request = main_url + api_request     
-    try:
-        all_tables = pd.DataFrame()
-        page_count = 0
-        while True:
-            page_count += 1
-            api_request = f"{api_request}&page={page_count}"
-            tables = pd.read_html(api_request)
-            all_tables = all_tables.append(tables[0], ignore_index=True, sort=False)
-            if len(tables[0]) == 0:
-                break
+    #the next pages are fetched ahead until the first empty one
+    def read_page(page):
+        return transport.read_table(f"{api_request}&page={page}")
 
-        all_tables.columns = all_tables.columns.droplevel(1)
+    def read_pages():
+        for tables in parallel.paginate(read_page, concurrency):
+            tables.columns = tables.columns.droplevel(1)
+            yield tables.iloc[0:,:5]
 
-        if len(all_tables) == 0:
-            return "No diseases found"
-        else:
-            return all_tables.iloc[0:,:5]
-    except:
-        return "No diseases found"
+    return read_pages()
 
 
-def Search(query,searcher):
+def Bioclass(status=list(),biospecimen=list(),concurrency=4):
     """
 
-    Searching for query on small molecule metabolites found in the human body from The Human Metabolome Database (HMDB)
+    Browsing diseases information about small molecule metabolites found in the human body from The Human Metabolome Database (HMDB)
 
     Args:
 
-        query (str): a query string
+        status (list): list of keywords to filter by metabolite status (quantified, detected, expected, or/and predicted) (default all)
 
-        searcher (str): searcher to use from ( ["metabolites","diseases","pathways","proteins","reactions"] )
+        biospecimen (list): list of keywords to filter by biospecimen (blood,saliva,urine,csf,feces,sweat,breast_milk,bile,amniotic_fluid, or/and other_fluids)
+
+        concurrency (int): default = 4, number of result pages fetched ahead at the same time
 
     Returns:
 
-        list of HMDB IDs
+       A generator object for Data frame(s) contains the browsing diseases information of metabolites from LMDB
 
     Raises:
 
-        TypeError if argument (query) is not a string
+        TypeError if argument (status) is not a list
 
-        TypeError if argument (searcher) is not a string
+        TypeError if argument (biospecimen) is not a list
 
     Example:
-    
-        data = Search("Dehydroepiandrosterone","metabolites")
-        print (data)
+
+        print (Bioclass(status=[],biospecimen=["other_fluids"]))
 
     """
-    
-    if type(query) != str:
-        raise TypeError ("query argument should be a string")
-    if type(searcher) != str:
-        raise TypeError ("searcher argument should be a string")
-    opp_searcher = ["metabolites","diseases","pathways","proteins","reactions"]
-    if searcher not in opp_searcher:
-        raise TypeError (' searcher argument should be a string from ["metabolites","diseases","pathways","proteins","reactions"] ')
 
-    main_url = "http://www.hmdb.ca/unearth/q?"
-    dict_url = {"utf8":"✓","query":query,"searcher":searcher}
+    pages = iBioclass(status, biospecimen, concurrency)
+    try:
+        all_tables = list(pages)
+        if len(all_tables) == 0:
+            return "No diseases found"
+        else:
+            return pd.concat(all_tables, ignore_index=True, sort=False)
+    except:
+        return "No diseases found"
+
+
+def _search_url(query,searcher):
+
+    if type(query) != str:
+        raise TypeError ("query argument should be a string")
+    if type(searcher) != str:
+        raise TypeError ("searcher argument should be a string")
+    opp_searcher = ["metabolites","diseases","pathways","proteins","reactions"]
+    if searcher not in opp_searcher:
+        raise TypeError (' searcher argument should be a string from ["metabolites","diseases","pathways","proteins","reactions"] ')
+
+    main_url = "http://www.hmdb.ca/unearth/q?"
+    dict_url = {"utf8":"✓","query":query,"searcher":searcher}
     
     api_request = urllib.parse.urlencode(dict_url)
 
-    api_request = main_url + api_request
+    return main_url + api_request
 
-    xml = urllib.request.urlopen(api_request).read()
 
-    def find_HMDB(xml):
-        import re
-        xml = str(xml)
-        all_hmdb = (i.end() for i in re.finditer("HMDB",xml))
-        all_hmdb = list( set ( [ f"HMDB{xml[i:i+7]}" for i in all_hmdb if xml[i:i+7].isdigit()  ] ) )
-        return all_hmdb
+def _find_HMDB(xml):
+    return ids.extract(xml, "HMDB")
+
+
+def Search(query,searcher):
+    """
+
+    Searching for query on small molecule metabolites found in the human body from The Human Metabolome Database (HMDB)
+
+    Args:
+
+        query (str): a query string
+
+        searcher (str): searcher to use from ( ["metabolites","diseases","pathways","proteins","reactions"] )
+
+    Returns:
+
+        list of HMDB IDs
+
+    Raises:
+
+        TypeError if argument (query) is not a string
+
+        TypeError if argument (searcher) is not a string
 
-    HMDB_ID = find_HMDB(xml)
+    Example:
+    
+        data = Search("Dehydroepiandrosterone","metabolites")
+        print (data)
+
+    """
+    
+    api_request = _search_url(query,searcher)
+
+    xml = transport.get(api_request)
+
+    HMDB_ID = _find_HMDB(xml)
 
     return HMDB_ID
 
 
-def ChemQuery(start=100,end=200,search_type="molecular",filters=list()):
+def ChemQuery(start=100,end=200,search_type="molecular",filters=list(),concurrency=4):
     """
 
     Search by molecular weight for small molecule metabolites found in the human body from The Human Metabolome Database (HMDB)
@@ -811,6 +1057,8 @@ def ChemQuery(start=100,end=200,search_type="molecular",filters=list()):
 
         filters (list): list of keywords to filter with metabolite status (quantified, detected, or/and expected)
 
+        concurrency (int): default = 4, number of result pages fetched ahead at the same time
+
     Returns:
 
         Data frame contains the ChemQuery by molecular weight search result of metabolites from HMDB
@@ -860,36 +1108,23 @@ def ChemQuery(start=100,end=200,search_type="molecular",filters=list()):
             api_filters = f"filters[status][{i_filter}]=1"
             api_request = f"{api_request}&{api_filters}"
 
-    def find_HMDB(xml):
-        import re
-        xml = str(xml)
-        all_hmdb = (i.end() for i in re.finditer("HMDB",xml))
-        all_hmdb = list( set ( [ f"HMDB{xml[i:i+7]}" for i in all_hmdb if xml[i:i+7].isdigit()  ] ) )
-        return all_hmdb
-
-    page = 0
-    all_hmdb_id = []
-    while True:
-        page = page + 1
-        api_request = f"{api_request}&page={page}"
-        xml = urllib.request.urlopen(api_request).read()
-        final_HMDB = find_HMDB(xml)
-        if len(final_HMDB) != 0:
-            all_hmdb_id = all_hmdb_id + [ i for i in  find_HMDB(xml)] 
-        if len(final_HMDB) == 0:
-            break
+    #the next pages are fetched ahead until the first page without IDs
+    def read_page(page):
+        return ids.extract(transport.get(f"{api_request}&page={page}"), "HMDB")
+
+    all_hmdb_id = [ i for page_ids in parallel.paginate(read_page, concurrency) for i in page_ids ]
 
     return Geninfo(all_hmdb_id)
 
 
-def LCMS(masses,mode,adducts,tolerance,tolerance_unit):
+def iLCMS(masses,mode,adducts,tolerance,tolerance_unit):
     """
 
-    Advanced Mass Spectrum search
+    Advanced Mass Spectrum search, yielding the results of each adduct as soon as they are parsed
 
     Args:
 
-        masses (list): a query Masses (Da) maximum 700 query masses per request
+        masses (list): a query Masses (Da) maximum 700 query masses per request with the web backend (no limit with the local backend)
 
         mode (str): Ion Mode (positive, negative, or neutral)
 
@@ -901,7 +1136,7 @@ def LCMS(masses,mode,adducts,tolerance,tolerance_unit):
 
     Returns:
 
-        Data frame object contains information retrieved from HMDB about metabolites returned from the Mass Spectrum search
+        A generator object for the Data frame(s) of the Mass Spectrum search, one for each adduct request (one for all with the local backend)
 
     Raises:
 
@@ -916,16 +1151,16 @@ def LCMS(masses,mode,adducts,tolerance,tolerance_unit):
         TypeError if argument (tolerance_unit) is not a string from ("Da","ppm")
 
     Example:
-    
-        result = LCMS(masses=[300,400],mode="positive",adducts=["M+H","M+H-H2O"],tolerance=0.5,tolerance_unit="Da")
-        print (result)
-   
+
+        for data in iLCMS(masses=[300,400],mode="positive",adducts=["M+H","M+H-H2O"],tolerance=0.5,tolerance_unit="Da"):
+            print (data)
+
     """
     
     #make sure that masses is fine to go
     if type(masses) != list or len(masses) == 0:
         raise TypeError ("masses argument must be a list of length more than zero")
-    if len(masses) > 700:
+    if len(masses) > 700 and Record.store is None:
         raise TypeError ("maximum 700 query masses per request")
     #make sure that mode is fine to go
     opp_mode = ["positive","negative","neutral"]
@@ -943,6 +1178,10 @@ def LCMS(masses,mode,adducts,tolerance,tolerance_unit):
     if type(tolerance_unit) != str or tolerance_unit not in opp_unit:
         raise TypeError ("tolerance_unit argument should be string (Da or ppm)")
 
+    #match the masses against the local compounds when the local backend is set (see set_backend)
+    if Record.store is not None:
+        return iter([Record.store.mass_index().search(masses, mode, adducts, tolerance, tolerance_unit)])
+
     #generate the api url
     main_url= "http://www.hmdb.ca/spectra/ms/search?"
     dict_url= {"utf8":"✓","commit":"Search","database":"HMDB","ms_search_ion_mode":mode,"tolerance":tolerance,"tolerance_units":tolerance_unit}
@@ -953,23 +1192,66 @@ def LCMS(masses,mode,adducts,tolerance,tolerance_unit):
 
     api_request = urllib.parse.urlencode(dict_url)
     api_request = main_url + api_request
-    #for adducts
-    all_tables = []
-    for api_adducts in adducts:
-        api_adducts = api_adducts.replace("+","%2B")
-        api_adducts = api_adducts.replace("-","%2D")
-        api_request = f"{api_request}&adduct_type={api_adducts}"
-        tables = pd.read_html(api_request)
-        all_tables = all_tables + tables
+    #one request for each adduct, the tables are yielded as they are parsed
+    def read_adducts():
+        for api_adducts in adducts:
+            api_adducts = api_adducts.replace("+","%2B")
+            api_adducts = api_adducts.replace("-","%2D")
+            for tables in transport.read_html(f"{api_request}&adduct_type={api_adducts}"):
+                yield tables
+
+    return read_adducts()
+
+
+def LCMS(masses,mode,adducts,tolerance,tolerance_unit):
+    """
+
+    Advanced Mass Spectrum search
+
+    Args:
+
+        masses (list): a query Masses (Da) maximum 700 query masses per request with the web backend (no limit with the local backend)
+
+        mode (str): Ion Mode (positive, negative, or neutral)
+
+        adducts (list): Adduct Type (e.g. M+H, M+H-H2O)
+
+        tolerance (int): Molecular Weight Tolerance ± 
+
+        tolerance_unit (str): tolerance unit (Da or ppm)
+
+    Returns:
+
+        Data frame object contains information retrieved from HMDB about metabolites returned from the Mass Spectrum search
+
+    Raises:
+
+        TypeError if argument (masses) is not a list of length more than zero
+
+        TypeError if argument (mode) is not a string from ("positive","negative","neutral")
+
+        TypeError if argument (adducts) is not a list
+
+        TypeError if argument (tolerance) is not a number
+
+        TypeError if argument (tolerance_unit) is not a string from ("Da","ppm")
+
+    Example:
     
-    all_tables_all= pd.DataFrame()
-    for i_range in range ( len(all_tables) ):
+        result = LCMS(masses=[300,400],mode="positive",adducts=["M+H","M+H-H2O"],tolerance=0.5,tolerance_unit="Da")
+        print (result)
+   
+    """
 
-        all_tables_all = all_tables_all.append(all_tables[i_range], ignore_index=True, sort = False) 
+    all_tables = list(iLCMS(masses,mode,adducts,tolerance,tolerance_unit))
+    if len(all_tables) == 0:
+        return pd.DataFrame()
 
+    all_tables_all = pd.concat(all_tables, ignore_index=True, sort = False)
     all_tables_all.sort_values(by=['Adduct','Monoisotopic Mass'],ascending=True,inplace=True)
+
     return all_tables_all
-    
+
 
 def LCMSMS(p_ion_mass,p_ion_tolerance,parent_ion_mass_tolerance_units,ion_mode,cid,peaks,mz_tolerance,mz_tolerance_units,predicted="False"):
     """
@@ -1034,9 +1316,336 @@ def LCMSMS(p_ion_mass,p_ion_tolerance,parent_ion_mass_tolerance_units,ion_mode,c
     api_request = f"{api_request}&peaks={peaks}"
     api_request = main_url + api_request
 
-    tables = pd.read_html(api_request)
+    tables = transport.read_html(api_request)
     tables = tables[0].drop(["Spectral Display Tools","Structure"],axis=1)
 
     return tables
 
 
+def afetch_all(accessions, concurrency=8):
+    """
+
+    Async counterpart of fetch_all, the HMDB pages are downloaded without blocking the event loop
+
+    Args:
+
+        accessions (list): list of HMDB ID
+
+        concurrency (int): default = 8, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        An async generator object for Record(s), one for each HMDB ID
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        async for record in afetch_all(["HMDB0000001","HMDB0000002","HMDB0000005"]):
+            print (record.Geninfo)
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("afetch_all takes list as an argument")
+
+    return records.afetch_all(Record, accessions, concurrency)
+
+
+async def aGeninfo(accessions, concurrency=8):
+    """
+
+    Async counterpart of Geninfo, the HMDB pages are downloaded without blocking the event loop
+
+    Args:
+
+        accessions (list): list of HMDB ID and/or Record
+
+        concurrency (int): default = 8, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        An async generator object for Data frame(s), the same as Geninfo
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        async for i_data in aGeninfo(["HMDB0000001","HMDB0000002","HMDB0000005"]):
+            print (i_data.head())
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("aGeninfo takes list as an argument")
+
+    async for record in records.afetch_all(Record, accessions, concurrency, ["Geninfo"]):
+        yield record.Geninfo
+
+
+async def aSynonymsData(accessions, concurrency=8):
+    """
+
+    Async counterpart of SynonymsData, the HMDB pages are downloaded without blocking the event loop
+
+    Args:
+
+        accessions (list): list of HMDB ID and/or Record
+
+        concurrency (int): default = 8, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        An async generator object for Data frame(s), the same as SynonymsData
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        async for i_data in aSynonymsData(["HMDB0000001","HMDB0000002","HMDB0000005"]):
+            print (i_data.head())
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("aSynonymsData takes list as an argument")
+
+    async for record in records.afetch_all(Record, accessions, concurrency, ["SynonymsData"]):
+        yield record.SynonymsData
+
+
+async def aExpProp(accessions, concurrency=8):
+    """
+
+    Async counterpart of ExpProp, the HMDB pages are downloaded without blocking the event loop
+
+    Args:
+
+        accessions (list): list of HMDB ID and/or Record
+
+        concurrency (int): default = 8, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        An async generator object for Data frame(s), the same as ExpProp
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        async for i_data in aExpProp(["HMDB0000001","HMDB0000002","HMDB0000005"]):
+            print (i_data.head())
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("aExpProp takes list as an argument")
+
+    async for record in records.afetch_all(Record, accessions, concurrency, ["ExpProp"]):
+        yield record.ExpProp
+
+
+async def aPredProp(accessions, concurrency=8):
+    """
+
+    Async counterpart of PredProp, the HMDB pages are downloaded without blocking the event loop
+
+    Args:
+
+        accessions (list): list of HMDB ID and/or Record
+
+        concurrency (int): default = 8, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        An async generator object for Data frame(s), the same as PredProp
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        async for i_data in aPredProp(["HMDB0000001","HMDB0000002","HMDB0000005"]):
+            print (i_data.head())
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("aPredProp takes list as an argument")
+
+    async for record in records.afetch_all(Record, accessions, concurrency, ["PredProp"]):
+        yield record.PredProp
+
+
+async def aSpectra(accessions, concurrency=8):
+    """
+
+    Async counterpart of Spectra, the HMDB pages are downloaded without blocking the event loop
+
+    Args:
+
+        accessions (list): list of HMDB ID and/or Record
+
+        concurrency (int): default = 8, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        An async generator object for Data frame(s), the same as Spectra
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        async for i_data in aSpectra(["HMDB0000001","HMDB0000002","HMDB0000005"]):
+            print (i_data.head())
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("aSpectra takes list as an argument")
+
+    async for record in records.afetch_all(Record, accessions, concurrency, ["Spectra"]):
+        yield record.Spectra
+
+
+async def aNConcsData(accessions, concurrency=8):
+    """
+
+    Async counterpart of NConcsData, the HMDB pages are downloaded without blocking the event loop
+
+    Args:
+
+        accessions (list): list of HMDB ID and/or Record
+
+        concurrency (int): default = 8, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        An async generator object for Data frame(s), the same as NConcsData
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        async for i_data in aNConcsData(["HMDB0000001","HMDB0000002","HMDB0000005"]):
+            print (i_data.head())
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("aNConcsData takes list as an argument")
+
+    async for record in records.afetch_all(Record, accessions, concurrency, ["NConcsData"]):
+        yield record.NConcsData
+
+
+async def aAConcsData(accessions, concurrency=8):
+    """
+
+    Async counterpart of AConcsData, the HMDB pages are downloaded without blocking the event loop
+
+    Args:
+
+        accessions (list): list of HMDB ID and/or Record
+
+        concurrency (int): default = 8, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        An async generator object for Data frame(s), the same as AConcsData
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        async for i_data in aAConcsData(["HMDB0000001","HMDB0000002","HMDB0000005"]):
+            print (i_data.head())
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("aAConcsData takes list as an argument")
+
+    async for record in records.afetch_all(Record, accessions, concurrency, ["AConcsData"]):
+        yield record.AConcsData
+
+
+async def aPathways(accessions, concurrency=8):
+    """
+
+    Async counterpart of Pathways, the HMDB pages are downloaded without blocking the event loop
+
+    Args:
+
+        accessions (list): list of HMDB ID and/or Record
+
+        concurrency (int): default = 8, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        An async generator object for Data frame(s), the same as Pathways
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        async for i_data in aPathways(["HMDB0000001","HMDB0000002","HMDB0000005"]):
+            print (i_data.head())
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("aPathways takes list as an argument")
+
+    async for record in records.afetch_all(Record, accessions, concurrency, ["Pathways"]):
+        yield record.Pathways
+
+
+async def aSearch(query,searcher):
+    """
+
+    Async counterpart of Search, the search page is downloaded without blocking the event loop
+
+    Args:
+
+        query (str): a query string
+
+        searcher (str): searcher to use from ( ["metabolites","diseases","pathways","proteins","reactions"] )
+
+    Returns:
+
+        list of HMDB IDs
+
+    Raises:
+
+        TypeError if argument (query) is not a string
+
+        TypeError if argument (searcher) is not a string
+
+    Example:
+    
+        data = await aSearch("Dehydroepiandrosterone","metabolites")
+        print (data)
+
+    """
+
+    xml = await aio.get(_search_url(query,searcher))
+
+    return _find_HMDB(xml)
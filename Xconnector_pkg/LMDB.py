@@ -1,37 +1,202 @@
 import urllib
-import urllib.request
-import pandas as pd
-from pandas import DataFrame
+import urllib.parse
+from . import ids, images, local, parallel, records, throttle, transport
+from .lazy import aio, pd
 
-def Geninfo(accessions):
+
+class Record(records.Record):
 
     """
 
-    Retrieve information about small molecule metabolites found in the human body from The Livestock Metabolome Database (LMDB)
+    One metabolite page from The Livestock Metabolome Database (LMDB), downloaded and parsed only once
+
+    Args:
+
+        accession (str): LMDB ID
+
+    Raises:
+
+        TypeError if argument (accession) is not a string
+
+    Note:
+
+        The page is fetched on first use, and every section (Geninfo, AccData, SynonymsData, ExpProp, PredProp, Spectra and ConcsData) is built lazily from that one fetch and then kept.
+        A Record can be passed anywhere a list of LMDB IDs is accepted by those functions.
+
+    Example:
+
+        record = Record("LMDB00001")
+        print (record.Geninfo)
+        print (record.ConcsData)
+
+    """
+
+    main_url = "http://lmdb.ca/metabolites/"
+
+    Geninfo = property(lambda self: self._section("Geninfo", _Geninfo))
+    AccData = property(lambda self: self._section("AccData", _AccData))
+    SynonymsData = property(lambda self: self._section("SynonymsData", _SynonymsData))
+    ExpProp = property(lambda self: self._section("ExpProp", _ExpProp))
+    PredProp = property(lambda self: self._section("PredProp", _PredProp))
+    Spectra = property(lambda self: self._section("Spectra", _Spectra))
+    ConcsData = property(lambda self: self._section("ConcsData", _ConcsData))
+
+
+def fetch_all(accessions, concurrency=1):
+
+    """
+
+    Download and parse the LMDB page of each metabolite once, to serve all of its sections from that one fetch
 
     Args:
 
-        accessions (list): list of LMDB ID 
+        accessions (list): list of LMDB ID
+
+        concurrency (int): default = 1, number of pages downloaded at the same time, the results keep the order of accessions
 
     Returns:
 
-        A generator object for Data frame(s) contains general information retrieved from LMDB about metabolites
+        A generator object for Record(s), one for each LMDB ID
 
     Raises:
 
         TypeError if argument (accessions) is not a list
 
+    Example:
+
+        for record in fetch_all(["LMDB00001","LMDB00002","LMDB00003"], concurrency=4):
+            print (record.Geninfo)
+            print (record.ConcsData)
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("fetch_all takes list as an argument")
+
+    return records.fetch_all(Record, accessions, concurrency)
+
+
+def set_backend(backend="web", path=None):
+
+    """
+
+    Choose where the metabolite sections are read from
+
+    Args:
+
+        backend (str): default = "web", either "web" to download the LMDB pages, or "local" to read the store built with build_local
+
+        path (str): path of the local store, needed when backend is "local"
+
+    Raises:
+
+        TypeError if argument (backend) is not "web" or "local"
+
+        TypeError if argument (path) is not a string of a LMDB store when backend is "local"
+
     Note:
 
-        If an accession has no information in LMDB the function will return an empty data frame
+        With the local backend Geninfo, AccData, SynonymsData, ExpProp and PredProp return the same data frames without any download. Spectra and ConcsData are still read from the web.
 
     Example:
 
-        for i_data in Geninfo(["LMDB00001","LMDB00002","LMDB00003"]):
-            print (i_data.head())
+        build_local("lmdb_metabolites.xml", "lmdb.sqlite")
+        set_backend("local", "lmdb.sqlite")
+        for i_data in Geninfo(["LMDB00001"]):
+            print (i_data)
+
+    """
+
+    records.set_backend(Record, backend, path)
+
+
+def set_rate_limit(**kwargs):
+
+    """
+
+    Pace the requests sent to LMDB (e.g. to stay under the rate the server tolerates)
+
+    Args:
+
+        the keyword arguments of throttle.configure (rate, burst, adaptive, concurrency, min_concurrency, max_concurrency, slow, failures, cooldown)
+
+    Raises:
+
+        TypeError if an argument is not one of the settings of throttle.configure
+
+    Note:
+
+        With adaptive=True the number of requests in flight adapts between min_concurrency and max_concurrency:
+        it grows while LMDB answers quickly and is halved after a 429/503 answer or a latency spike.
+
+    Example:
+
+        set_rate_limit(rate=5, burst=5, adaptive=True, max_concurrency=8)
+
+    """
+
+    throttle.configure("LMDB", **kwargs)
+
+
+def _xml_sections(element):
+    # the same data frames as the web sections, built from one metabolite element of the XML dump
+    sections = {
+        "Geninfo": local.xml_geninfo(element, _Geninfo_rows, "Lmdb"),
+        "AccData": local.xml_geninfo(element, ["Lmdb"] + [name for name in local.GENINFO_XML] + list(local.LOCATIONS_XML) + ["Role"], "Lmdb"),
+        "SynonymsData": local.xml_synonyms(element),
+        "ExpProp": local.xml_properties(element, "experimental_properties/property", "Reference"),
+        "PredProp": local.xml_properties(element, "predicted_properties/property", "Source"),
+    }
+    return local.accession(element), local.xml_compound(element), local.drop_empty(sections)
+
+
+def build_local(xml_path, path="lmdb.sqlite"):
+
+    """
+
+    Build the local LMDB store from the official metabolites dump (lmdb_metabolites.xml from lmdb.ca/downloads)
+
+    Args:
+
+        xml_path (str): path of the extracted XML dump
+
+        path (str): default = "lmdb.sqlite", path of the store to write (replaced if it exists)
+
+    Returns:
+
+        int number of metabolites written
+
+    Raises:
+
+        TypeError if argument (xml_path) is not a string
+
+    Note:
+
+        The dump is streamed one metabolite at a time, so the memory used does not grow with its size.
+
+    Example:
+
+        print (build_local("lmdb_metabolites.xml", "lmdb.sqlite"))
 
     """
 
+    if type(xml_path) != str:
+        raise TypeError ("xml_path argument should be a string")
+
+    items = (_xml_sections(element) for element in local.iterparse(xml_path, "metabolite"))
+    return local.build(path, "LMDB", items)
+
+
+#the general information rows of the page
+_Geninfo_rows = ["Version","Status","Creation Date","Update Date","Lmdb","Common Name","Chemical Formula","Average Molecular Weight",
+    "Monoisotopic Molecular Weight","IUPAC Name","Traditional Name","CAS Registry Number",
+    "SMILES","InChI Identifier","InChI Key","Kingdom","Super Class","Class","Sub Class","Direct Parent",
+    "Molecular Framework","Role","State","Cellular Locations","Biospecimen Locations","Tissue Locations",
+    "DrugBank ID","FoodDB ID","Chemspider ID","KEGG Compound ID","ChEBI ID","PubChem Compound"]
+
+
+def _Geninfo(record):
+
     def add_all_df(dfdf_new):
 
     
@@ -42,58 +207,41 @@ def Geninfo(accessions):
 
         return dfdf
 
-    if type(accessions) != list:
-        raise TypeError ("Geninfo takes list as an argument")
-
-    main_url = "http://www.lmdb.ca/metabolites/"
-    for i_acc in accessions:
-        # creating the query search url by accessions
-        api_request = main_url + i_acc
-        # get the data in form of tables
-        try:
-            tables = pd.read_html(api_request)
-            #removing row with no data
-            tables0 = tables[0].iloc[:,0:2]
-            #rename the col 
-            tables0.columns = ["col1", "col2"]
-  
-            #take only the general information
-            take_from_tables0 = ["Version","Status","Creation Date","Update Date","Lmdb","Common Name","Chemical Formula","Average Molecular Weight",
-            "Monoisotopic Molecular Weight","IUPAC Name","Traditional Name","CAS Registry Number",
-            "SMILES","InChI Identifier","InChI Key","Kingdom","Super Class","Class","Sub Class","Direct Parent",
-            "Molecular Framework","Role","State","Cellular Locations","Biospecimen Locations","Tissue Locations",
-            "DrugBank ID","FoodDB ID","Chemspider ID","KEGG Compound ID","ChEBI ID","PubChem Compound"]
-            
-            tables0 = tables0[tables0["col1"].isin(take_from_tables0)]
-            tables0 = add_all_df(tables0)
+    #take only the general information
+    take_from_tables0 = _Geninfo_rows
 
-            yield tables0
+    # get the data in form of tables
+    try:
+        tables = record.fetch()
+        #removing row with no data
+        tables0 = tables[0].iloc[:,0:2]
+        #rename the col 
+        tables0.columns = ["col1", "col2"]
 
-        except:
-            take_from_tables0 = ["Version","Status","Creation Date","Update Date","Lmdb","Common Name","Chemical Formula","Average Molecular Weight",
-            "Monoisotopic Molecular Weight","IUPAC Name","Traditional Name","CAS Registry Number",
-            "SMILES","InChI Identifier","InChI Key","Kingdom","Super Class","Class","Sub Class","Direct Parent",
-            "Molecular Framework","Role","State","Cellular Locations","Biospecimen Locations","Tissue Locations",
-            "DrugBank ID","FoodDB ID","Chemspider ID","KEGG Compound ID","ChEBI ID","PubChem Compound"]
+        tables0 = tables0[tables0["col1"].isin(take_from_tables0)]
+        tables0 = add_all_df(tables0)
 
-            not_found = ["NaN"] * len(take_from_tables0)
-            not_found = dict( zip(take_from_tables0,not_found) )
-            tables0 = pd.DataFrame(data=not_found , index= [0])
+    except Exception:
+        not_found = ["NaN"] * len(take_from_tables0)
+        not_found = dict( zip(take_from_tables0,not_found) )
+        tables0 = pd.DataFrame(data=not_found , index= [0])
 
-            tables0 = tables0.rename(index={0:i_acc })
+        tables0 = tables0.rename(index={0:record.accession })
 
-            yield tables0
+    return tables0
 
 
-def AccData(accessions):
+def Geninfo(accessions, concurrency=1):
 
     """
 
-    Retrieve information about small molecule metabolites found in different livestock species from The Livestock Metabolome Database (LMDB)
+    Retrieve information about small molecule metabolites found in the human body from The Livestock Metabolome Database (LMDB)
 
     Args:
 
-        accessions (list): list of LMDB ID 
+        accessions (list): list of LMDB ID and/or Record
+
+        concurrency (int): default = 1, number of pages downloaded at the same time, the results keep the order of accessions
 
     Returns:
 
@@ -109,10 +257,20 @@ def AccData(accessions):
 
     Example:
 
-        for i_data in AccData(["LMDB00001","LMDB00002","LMDB00003"]):
+        for i_data in Geninfo(["LMDB00001","LMDB00002","LMDB00003"]):
             print (i_data.head())
 
     """
+
+    if type(accessions) != list:
+        raise TypeError ("Geninfo takes list as an argument")
+
+    for record in records.fetch_all(Record, accessions, concurrency):
+        yield record.Geninfo
+
+
+def _AccData(record):
+
     def add_all_df(dfdf_new):
 
         dfdf = dfdf_new.drop(["col1"], 1)
@@ -122,56 +280,99 @@ def AccData(accessions):
 
         return dfdf
 
-    if type(accessions) != list:
-        raise TypeError ("AccData takes list as an argument")
-
-    main_url = "http://lmdb.ca/metabolites/"
-    for i_acc in accessions:
-        # creating the query search url by accessions
-        api_request = main_url + i_acc
-        # get the data in form of tables
+    # get the data in form of tables
+    try:
+        tables = record.fetch()
+    
         try:
-            tables = pd.read_html(api_request)
-        
+            #removing row with no data
+            tables0 = tables[0].iloc[:,0:2]
+            #rename the col 
+            tables0.columns = ["col1", "col2"]
+            #remove thus dataframes from the big dataframe
+            remove_from_tables0 = ["Synonyms","Experimental Properties","Predicted Properties","Spectra"]
+            for i_remove in remove_from_tables0:
+                tables0 = tables0[tables0["col1"] != i_remove]
+            #remove the Concentrations dataframe from the big dataframe
             try:
-                #removing row with no data
-                tables0 = tables[0].iloc[:,0:2]
-                #rename the col 
-                tables0.columns = ["col1", "col2"]
-                #remove thus dataframes from the big dataframe
-                remove_from_tables0 = ["Synonyms","Experimental Properties","Predicted Properties","Spectra"]
-                for i_remove in remove_from_tables0:
-                    tables0 = tables0[tables0["col1"] != i_remove]
-                #remove the Concentrations dataframe from the big dataframe
-                try:
-                    conc = tables0.index[tables0['col1'] == "Concentrations"].tolist()
-                    tables0 = tables0[tables0["col1"] != "Concentrations"]
-                    tables0.drop(index=conc[0],inplace=True)
-                    tables0.drop(index=conc[0]+1,inplace=True)
-                except:
-                    pass
-            except:
+                conc = tables0.index[tables0['col1'] == "Concentrations"].tolist()
+                tables0 = tables0[tables0["col1"] != "Concentrations"]
+                tables0.drop(index=conc[0],inplace=True)
+                tables0.drop(index=conc[0]+1,inplace=True)
+            except Exception:
                 pass
-        
-            tables0 = add_all_df(tables0)
-            tables0 = tables0.loc[:,~tables0.columns.duplicated()]
+        except Exception:
+            pass
+    
+        tables0 = add_all_df(tables0)
+        tables0 = tables0.loc[:,~tables0.columns.duplicated()]
+
+    except Exception:
+        tables0 = pd.DataFrame(data = {"notfound":["NaN"]})
+        tables0 = tables0.rename(index={0: record.accession })
+        tables0.drop(["notfound"], 1 , inplace= True)
+
+    return tables0
+
+
+def AccData(accessions, concurrency=1):
+
+    """
+
+    Retrieve information about small molecule metabolites found in different livestock species from The Livestock Metabolome Database (LMDB)
+
+    Args:
+
+        accessions (list): list of LMDB ID and/or Record
+
+        concurrency (int): default = 1, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        A generator object for Data frame(s) contains general information retrieved from LMDB about metabolites
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Note:
+
+        If an accession has no information in LMDB the function will return an empty data frame
+
+    Example:
+
+        for i_data in AccData(["LMDB00001","LMDB00002","LMDB00003"]):
+            print (i_data.head())
+
+    """
+    if type(accessions) != list:
+        raise TypeError ("AccData takes list as an argument")
 
-        except:
-            tables0 = pd.DataFrame(data = {"notfound":["NaN"]})
-            tables0 = tables0.rename(index={0: i_acc })
-            tables0.drop(["notfound"], 1 , inplace= True)
+    for record in records.fetch_all(Record, accessions, concurrency):
+        yield record.AccData
 
-        yield  tables0
 
+def _SynonymsData(record):
 
-def SynonymsData(accessions):
+    try:
+        tables = record.fetch()
+        tables = tables[1]
+    except Exception:
+        tables = pd.DataFrame(data = {"Value":["NA"], "Source":["NA"]})
+
+    return records.rename_index(tables, record.accession)
+
+
+def SynonymsData(accessions, concurrency=1):
     """
 
     Retrieve synonyms names information about small molecule metabolites found in different livestock species from The Livestock Metabolome Database (LMDB)
 
     Args:
 
-        accessions (list): list of LMDB ID
+        accessions (list): list of LMDB ID and/or Record
+
+        concurrency (int): default = 1, number of pages downloaded at the same time, the results keep the order of accessions
 
     Returns:
 
@@ -192,35 +393,31 @@ def SynonymsData(accessions):
     if type(accessions) != list:
         raise TypeError ("SynonymsData takes list as an argument")
 
-    main_url = "http://lmdb.ca/metabolites/"
-    for i_acc in accessions:
-        # creating the query search url by accessions
-        api_request = main_url + i_acc
-        try:
-            tables = pd.read_html(api_request)
-            tables = tables[1]
-        except:
-            tables = pd.DataFrame(data = {"Value":["NA"], "Source":["NA"]})
+    for record in records.fetch_all(Record, accessions, concurrency):
+        yield record.SynonymsData
+
 
-        # to make the row.names =  to the id 
-        index_name = range(0,len(tables))
-        index_value = f"{i_acc}," *len(index_name)
-        index_value = index_value.split(",")
-        dictionary = dict(zip(index_name, index_value))
-        tables = tables.rename(index= dictionary )
+def _ExpProp(record):
 
+    try:
+        tables = record.fetch()
+        tables = tables[2]
+    except Exception:
+        tables = pd.DataFrame(data = {"Property":["NA"], "Value":["NA"], "Reference":["NA"]    })
 
-        yield tables
+    return records.rename_index(tables, record.accession)
 
 
-def ExpProp(accessions):
+def ExpProp(accessions, concurrency=1):
     """
 
     Retrieve Experimental Properties information about small molecule metabolites found in different livestock species from The Livestock Metabolome Database (LMDB)
 
     Args:
 
-        accessions (list): list of LMDB ID 
+        accessions (list): list of LMDB ID and/or Record
+
+        concurrency (int): default = 1, number of pages downloaded at the same time, the results keep the order of accessions
 
     Returns:
 
@@ -241,34 +438,31 @@ def ExpProp(accessions):
     if type(accessions) != list:
         raise TypeError ("ExpProp takes list as an argument")
 
-    main_url = "http://lmdb.ca/metabolites/"
-    for i_acc in accessions:
-        # creating the query search url by accessions
-        api_request = main_url + i_acc
-        try:
-            tables = pd.read_html(api_request)
-            tables = tables[2]
-        except:
-            tables = pd.DataFrame(data = {"Property":["NA"], "Value":["NA"], "Reference":["NA"]    })
+    for record in records.fetch_all(Record, accessions, concurrency):
+        yield record.ExpProp
+
 
-                
-        # to make the row.names =  to the id 
-        index_name = range(0,len(tables))
-        index_value = f"{i_acc}," *len(index_name)
-        index_value = index_value.split(",")
-        dictionary = dict(zip(index_name, index_value))
-        tables = tables.rename(index= dictionary )
-            
-        yield tables
+def _PredProp(record):
 
-def PredProp(accessions):
+    try:
+        tables = record.fetch()
+        tables = tables[3]
+    except Exception:
+        tables = pd.DataFrame(data = {"Property":["NA"],"Value":["NA"],"Source":["NA"]})
+
+    return records.rename_index(tables, record.accession)
+
+
+def PredProp(accessions, concurrency=1):
     """
 
     Retrieve Predicted Properties information about small molecule metabolites found in different livestock species from The Livestock Metabolome Database (LMDB)
 
     Args:
 
-        accessions (list): list of LMDB ID 
+        accessions (list): list of LMDB ID and/or Record
+
+        concurrency (int): default = 1, number of pages downloaded at the same time, the results keep the order of accessions
 
     Returns:
 
@@ -289,33 +483,31 @@ def PredProp(accessions):
     if type(accessions) != list:
         raise TypeError ("PredProp takes list as an argument")
 
-    main_url = "http://lmdb.ca/metabolites/"
-    for i_acc in accessions:
-        # creating the query search url by accessions
-        api_request = main_url + i_acc
-        try:
-            tables = pd.read_html(api_request)
-            tables = tables[3]
-        except:
-            tables = pd.DataFrame(data = {"Property":["NA"],"Value":["NA"],"Source":["NA"]})
+    for record in records.fetch_all(Record, accessions, concurrency):
+        yield record.PredProp
+
+
+def _Spectra(record):
 
-        # to make the row.names =  to the id 
-        index_name = range(0,len(tables))
-        index_value = f"{i_acc}," *len(index_name)
-        index_value = index_value.split(",")
-        dictionary = dict(zip(index_name, index_value))
-        tables = tables.rename(index= dictionary )
+    try:
+        tables = record.fetch()
+        tables = tables[4].iloc[0:,0:3]
+    except Exception:
+        tables = pd.DataFrame(data = {"Spectrum Type":["NA"],  "Description":["NA"], "Splash Key":["NA"] })
 
-        yield tables
+    return records.rename_index(tables, record.accession)
 
-def Spectra(accessions):
+
+def Spectra(accessions, concurrency=1):
     """
 
     Retrieve Spectra information about small molecule metabolites found in different livestock species from The Livestock Metabolome Database (LMDB)
 
     Args:
 
-        accessions (list): list of LMDB ID 
+        accessions (list): list of LMDB ID and/or Record
+
+        concurrency (int): default = 1, number of pages downloaded at the same time, the results keep the order of accessions
 
     Returns:
 
@@ -336,34 +528,32 @@ def Spectra(accessions):
     if type(accessions) != list:
         raise TypeError ("Spectra takes list as an argument")
 
-    main_url = "http://lmdb.ca/metabolites/"
-    for i_acc in accessions:
-        # creating the query search url by accessions
-        api_request = main_url + i_acc
-        try:
-            tables = pd.read_html(api_request)
-            tables = tables[4].iloc[0:,0:3]
-        except:
-            tables = pd.DataFrame(data = {"Spectrum Type":["NA"],  "Description":["NA"], "Splash Key":["NA"] })
+    for record in records.fetch_all(Record, accessions, concurrency):
+        yield record.Spectra
 
-        # to make the row.names =  to the id 
-        index_name = range(0,len(tables))
-        index_value = f"{i_acc}," *len(index_name)
-        index_value = index_value.split(",")
-        dictionary = dict(zip(index_name, index_value))
-        tables = tables.rename(index= dictionary )
 
-        yield tables
+def _ConcsData(record):
 
+    try:
+        tables = record.fetch()
+        tables = tables[5].iloc[0:,0:6]
+        tables.rename(columns={"Reference": "Pubmed"},inplace=True)
+    except Exception:
+        tables = pd.DataFrame(data = {"Biofluid":["NA"], "Status":["NA"], "Value":["NA"], "Condition":["NA"], "Species":["NA"], "Pubmed":["NA"]})
 
-def ConcsData(accessions):
+    return records.rename_index(tables, record.accession)
+
+
+def ConcsData(accessions, concurrency=1):
     """
 
     Retrieve Concentrations information about small molecule metabolites found in different livestock species from The Livestock Metabolome Database (LMDB)
 
     Args:
 
-        accessions (list): list of LMDB ID 
+        accessions (list): list of LMDB ID and/or Record
+
+        concurrency (int): default = 1, number of pages downloaded at the same time, the results keep the order of accessions
 
     Returns:
 
@@ -384,25 +574,8 @@ def ConcsData(accessions):
     if type(accessions) != list:
         raise TypeError ("ConcsData takes list as an argument")
 
-    main_url = "http://lmdb.ca/metabolites/"
-    for i_acc in accessions:
-        # creating the query search url by accessions
-        api_request = main_url + i_acc
-        try:
-            tables = pd.read_html(api_request)
-            tables = tables[5].iloc[0:,0:6]
-            tables.rename(columns={"Reference": "Pubmed"},inplace=True)
-        except:
-            tables = pd.DataFrame(data = {"Biofluid":["NA"], "Status":["NA"], "Value":["NA"], "Condition":["NA"], "Species":["NA"], "Pubmed":["NA"]})
-
-        # to make the row.names =  to the id 
-        index_name = range(0,len(tables))
-        index_value = f"{i_acc}," *len(index_name)
-        index_value = index_value.split(",")
-        dictionary = dict(zip(index_name, index_value))
-        tables = tables.rename(index= dictionary )
-
-        yield tables
+    for record in records.fetch_all(Record, accessions, concurrency):
+        yield record.ConcsData
 
 
 def BioBro(status,biofluid,metabolite_list=list(),disease_list=list()):
@@ -473,13 +646,13 @@ def BioBro(status,biofluid,metabolite_list=list(),disease_list=list()):
 
     api_request =  urllib.parse.urlencode(dict_url)
     api_request = main_url + api_request
-    tables = pd.read_html(api_request)
+    tables = transport.read_html(api_request)
 
     for i_tables in range(len(tables)):
         yield tables[i_tables] 
 
 
-def structures(accession):
+def structures(accession, out_dir=".", concurrency=1):
     """
 
     Retrieve Structure image of small molecule metabolites found in different livestock species from The Livestock Metabolome Database (LMDB)
@@ -487,33 +660,42 @@ def structures(accession):
 
     Args:
 
-        accessions (str): str of only one LMDB ID 
+        accessions (str or list): str of only one LMDB ID, or list of LMDB IDs to download in out_dir
+
+        out_dir (str): default = ".", directory of the images when accessions is a list
+
+        concurrency (int): default = 1, number of images downloaded at the same time when accessions is a list
 
     Returns:
 
         png image for the metabolite structure
 
+        or for a list, Data frame of the Path, Status and Error of the image of each accession, see images.download
+
     Raises:
 
-        TypeError if argument (accession) is not a string of only one LMDB ID
+        TypeError if argument (accession) is not a string of only one LMDB ID or a list
 
     Example:
 
         structures("LMDB00001")
+        structures(["LMDB00001", "LMDB00002"], "structures", concurrency=8)
    
     """
+    if type(accession) == list:
+        return images.download(accession, out_dir, "LMDB", concurrency)
     if type(accession) != str:
-        raise TypeError ("structures takes string as an argument with only one LMDB ID")
+        raise TypeError ("structures takes string as an argument with only one LMDB ID or a list")
 
     main_url = "http://lmdb.ca/structures/"
     # creating the query search url by accessions to get the image 
     api_request = f"{main_url}{accession}/image.png" 
     image_name = f"{accession}.png"
-    image= urllib.request.urlretrieve(api_request, image_name)
+    image= transport.urlretrieve(api_request, image_name)
 
     return image
 
-def MetaboBro(biofluid=list(),species=list()):
+def iMetaboBro(biofluid=list(),species=list(),concurrency=4):
     """
 
     Browsing metabolites information about small molecule metabolites found in different livestock species from The Livestock Metabolome Database (LMDB)
@@ -523,10 +705,12 @@ def MetaboBro(biofluid=list(),species=list()):
         biofluid (list): list of keywords to filter with biofluid type (quantified, detected, or/and expected)
 
         species (list): list of keywords to filter with species  (bovine, ovine, caprine, equine and/or porcine)
+
+        concurrency (int): default = 4, number of result pages fetched ahead at the same time
         
     Returns:
 
-        Data frame contains the browsing metabolites information of metabolites from LMDB
+        A generator object for Data frame(s), one for each page of the browsing metabolites information of metabolites from LMDB, yielded as soon as it is parsed
 
     Raises:
 
@@ -536,7 +720,8 @@ def MetaboBro(biofluid=list(),species=list()):
 
     Example:
 
-        MetaboBro(biofluid=["urine"], species=["bovine"]) 
+        for data in iMetaboBro(biofluid=["urine"], species=["bovine"]):
+            print (data.head())
 
     """
 
@@ -568,21 +753,48 @@ def MetaboBro(biofluid=list(),species=list()):
             dict_url[i_species] = "1"
     
     
-    all_tables = pd.DataFrame()
-    
-    for page in range(1,10000):
+    #the next pages are fetched ahead until the first empty one
+    def read_page(page):
+        api_request =  urllib.parse.urlencode({**dict_url, "page":page})
+        return transport.read_table(main_url + api_request)
+
+    return parallel.paginate(read_page, concurrency)
+
+
+def MetaboBro(biofluid=list(),species=list(),concurrency=4):
+    """
+
+    Browsing metabolites information about small molecule metabolites found in different livestock species from The Livestock Metabolome Database (LMDB)
+
+    Args:
+
+        biofluid (list): list of keywords to filter with biofluid type (quantified, detected, or/and expected)
+
+        species (list): list of keywords to filter with species  (bovine, ovine, caprine, equine and/or porcine)
+
+        concurrency (int): default = 4, number of result pages fetched ahead at the same time
+        
+    Returns:
+
+        Data frame contains the browsing metabolites information of metabolites from LMDB
+
+    Raises:
+
+        TypeError if argument (biofluid) is not a list and out of this list [other_fluids, urine, milk, plasma, serum, feces or/and ruminal_fluid] 
+
+        TypeError if argument (species) is not a list and out of this list [bovine, ovine, caprine, equine and/or porcine] 
+
+    Example:
+
+        MetaboBro(biofluid=["urine"], species=["bovine"]) 
+
+    """
 
-        dict_url["page"] = page
-        api_request =  urllib.parse.urlencode(dict_url)
-        api_request = main_url + api_request
-        tables = pd.read_html(api_request)
-        tables = tables[0]
-        if len(tables) != 0:
-            all_tables = all_tables.append(tables, ignore_index=True, sort = False) 
-        else:
-            break
+    all_tables = list(iMetaboBro(biofluid, species, concurrency))
+    if len(all_tables) == 0:
+        return pd.DataFrame()
 
-    return all_tables
+    return pd.concat(all_tables, ignore_index=True, sort = False)
 
 
 def ClassBro(status=list(),biofluid=list()):
@@ -643,7 +855,7 @@ def ClassBro(status=list(),biofluid=list()):
 
     api_request =  urllib.parse.urlencode(dict_url)
     api_request = main_url + api_request
-    tables = pd.read_html(api_request)
+    tables = transport.read_html(api_request)
     tables = tables[0]
 
     if len(tables) == 0:
@@ -652,7 +864,7 @@ def ClassBro(status=list(),biofluid=list()):
     else:
         return tables
 
-def ChemQuery(start=100,end=200,search_type="molecular",filters=list()):
+def ChemQuery(start=100,end=200,search_type="molecular",filters=list(),concurrency=4):
     """
 
     Search by molecular weight for small molecule metabolites found in different livestock species from The Livestock Metabolome Database (LMDB)
@@ -667,6 +879,8 @@ def ChemQuery(start=100,end=200,search_type="molecular",filters=list()):
 
         filters (list): list of keywords to filter with metabolite status (quantified, detected, or/and expected)
 
+        concurrency (int): default = 4, number of result pages fetched ahead at the same time
+
     Returns:
 
         Data frame contains the ChemQuery search result of metabolites from LMDB
@@ -716,28 +930,35 @@ def ChemQuery(start=100,end=200,search_type="molecular",filters=list()):
             api_filters = f"filters[status][{i_filter}]=1"
             api_request = f"{api_request}&{api_filters}"
 
-    def find_HMDB(xml):
-        import re
-        xml = str(xml)
-        all_hmdb = (i.end() for i in re.finditer("LMDB",xml))
-        all_hmdb = list( set ( [ f"LMDB{xml[i:i+5]}" for i in all_hmdb if xml[i:i+5].isdigit()  ] ) )
-        return all_hmdb
-
-    page = 0
-    all_hmdb_id = []
-    while True:
-        page = page + 1
-        api_request = f"{api_request}&page={page}"
-        xml = urllib.request.urlopen(api_request).read()
-        final_HMDB = find_HMDB(xml)
-        if len(final_HMDB) != 0:
-            all_hmdb_id = all_hmdb_id + [ i for i in  find_HMDB(xml)] 
-        if len(final_HMDB) == 0:
-            break
+    #the next pages are fetched ahead until the first page without IDs
+    def read_page(page):
+        return ids.extract(transport.get(f"{api_request}&page={page}"), "LMDB")
+
+    all_hmdb_id = [ i for page_ids in parallel.paginate(read_page, concurrency) for i in page_ids ]
 
     return Geninfo(all_hmdb_id)
 
 
+def _txtsearch_url(query):
+
+    if type(query) != str:
+        raise TypeError ("query argument should be a list")
+
+    main_url = "http://lmdb.ca/unearth/q?"
+    dict_url = {"utf8":"✓","query":query,"searcher":"metabolites"}
+
+    api_request = urllib.parse.urlencode(dict_url)
+    api_request = main_url + api_request
+
+    return api_request
+
+
+def _find_LMDB(xml):
+    if b"returned no results" in xml:
+        return False
+    return ids.extract(xml, "LMDB")
+
+
 def txtsearch(query):
     """
 
@@ -761,39 +982,22 @@ def txtsearch(query):
         print (data)
 
     """
-    if type(query) != str:
-        raise TypeError ("query argument should be a list")
+    api_request = _txtsearch_url(query)
+    xml = transport.get(api_request)
 
-    main_url = "http://lmdb.ca/unearth/q?"
-    dict_url = {"utf8":"✓","query":query,"searcher":"metabolites"}
-
-    api_request = urllib.parse.urlencode(dict_url)
-    api_request = main_url + api_request
-    xml = urllib.request.urlopen(api_request).read()
-  
-    def find_LMDB(xml_str):
-        import re
-        xml_str = str(xml_str)
-        if "returned no results" not in xml_str:
-            end_of_lmdb = (lmdb.end() for lmdb in re.finditer("LMDB",xml_str))
-            final_LMDB = list( set( [ f"LMDB{xml_str[end:end+5]}" for end in end_of_lmdb if xml_str[end:end+5].isdigit()] ) )
-            return final_LMDB
-        elif "returned no results" in xml_str:
-            return False
-
-    xml_parse =  find_LMDB(xml)
+    xml_parse =  _find_LMDB(xml)
 
     return xml_parse
 
 
-def LCMS(masses,mode,adducts,tolerance,tolerance_unit):
+def iLCMS(masses,mode,adducts,tolerance,tolerance_unit):
     """
 
-    Advanced Mass Spectrum search
+    Advanced Mass Spectrum search, yielding the results of each adduct as soon as they are parsed
 
     Args:
 
-        masses (list): a query Masses (Da) maximum 700 query masses per request
+        masses (list): a query Masses (Da) maximum 700 query masses per request with the web backend (no limit with the local backend)
 
         mode (str): Ion Mode (positive, negative, or neutral)
 
@@ -805,7 +1009,7 @@ def LCMS(masses,mode,adducts,tolerance,tolerance_unit):
 
     Returns:
 
-        Data frame object contains information retrieved from LMDB about metabolites returned from the Mass Spectrum search
+        A generator object for the Data frame(s) of the Mass Spectrum search, one for each adduct request (one for all with the local backend)
 
     Raises:
 
@@ -820,16 +1024,16 @@ def LCMS(masses,mode,adducts,tolerance,tolerance_unit):
         TypeError if argument (tolerance_unit) is not a string from ("Da","ppm")
 
     Example:
-    
-        result = LCMS(masses=[300,400],mode="positive",adducts=["M+H","M+H-H2O"],tolerance=0.5,tolerance_unit="Da")
-        print (result)
-   
+
+        for data in iLCMS(masses=[300,400],mode="positive",adducts=["M+H","M+H-H2O"],tolerance=0.5,tolerance_unit="Da"):
+            print (data)
+
     """
     
     #make sure that masses is fine to go
     if type(masses) != list or len(masses) == 0:
         raise TypeError ("masses argument must be a list of length more than zero")
-    if len(masses) > 700:
+    if len(masses) > 700 and Record.store is None:
         raise TypeError ("maximum 700 query masses per request")
     #make sure that mode is fine to go
     opp_mode = ["positive","negative","neutral"]
@@ -847,6 +1051,10 @@ def LCMS(masses,mode,adducts,tolerance,tolerance_unit):
     if type(tolerance_unit) != str or tolerance_unit not in opp_unit:
         raise TypeError ("tolerance_unit argument should be string (Da or ppm)")
 
+    #match the masses against the local compounds when the local backend is set (see set_backend)
+    if Record.store is not None:
+        return iter([Record.store.mass_index().search(masses, mode, adducts, tolerance, tolerance_unit)])
+
     #generate the api url
     main_url="http://lmdb.ca/spectra/ms/search?"
     dict_url= {"utf8":"✓","commit":"Search","database":"LMDB","ms_search_ion_mode":mode,"tolerance":tolerance,"tolerance_units":tolerance_unit}
@@ -857,24 +1065,66 @@ def LCMS(masses,mode,adducts,tolerance,tolerance_unit):
 
     api_request = urllib.parse.urlencode(dict_url)
     api_request = main_url + api_request
-    #for adducts
-    all_tables = []
-    for api_adducts in adducts:
-        api_adducts = api_adducts.replace("+","%2B")
-        api_adducts = api_adducts.replace("-","%2D")
-        api_request = f"{api_request}&adduct_type={api_adducts}"
-        tables = pd.read_html(api_request)
-        all_tables = all_tables + tables
+    #one request for each adduct, the tables are yielded as they are parsed
+    def read_adducts():
+        for api_adducts in adducts:
+            api_adducts = api_adducts.replace("+","%2B")
+            api_adducts = api_adducts.replace("-","%2D")
+            for tables in transport.read_html(f"{api_request}&adduct_type={api_adducts}"):
+                yield tables
+
+    return read_adducts()
+
+
+def LCMS(masses,mode,adducts,tolerance,tolerance_unit):
+    """
+
+    Advanced Mass Spectrum search
+
+    Args:
+
+        masses (list): a query Masses (Da) maximum 700 query masses per request with the web backend (no limit with the local backend)
+
+        mode (str): Ion Mode (positive, negative, or neutral)
+
+        adducts (list): Adduct Type (e.g. M+H, M+H-H2O)
+
+        tolerance (int): Molecular Weight Tolerance ± 
+
+        tolerance_unit (str): tolerance unit (Da or ppm)
+
+    Returns:
+
+        Data frame object contains information retrieved from LMDB about metabolites returned from the Mass Spectrum search
+
+    Raises:
+
+        TypeError if argument (masses) is not a list of length more than zero
+
+        TypeError if argument (mode) is not a string from ("positive","negative","neutral")
+
+        TypeError if argument (adducts) is not a list
+
+        TypeError if argument (tolerance) is not a number
+
+        TypeError if argument (tolerance_unit) is not a string from ("Da","ppm")
+
+    Example:
     
-    all_tables_all= pd.DataFrame()
-    for i_range in range ( len(all_tables) ):
+        result = LCMS(masses=[300,400],mode="positive",adducts=["M+H","M+H-H2O"],tolerance=0.5,tolerance_unit="Da")
+        print (result)
+   
+    """
 
-        all_tables_all = all_tables_all.append(all_tables[i_range], ignore_index=True, sort = False) 
+    all_tables = list(iLCMS(masses,mode,adducts,tolerance,tolerance_unit))
+    if len(all_tables) == 0:
+        return pd.DataFrame()
 
+    all_tables_all = pd.concat(all_tables, ignore_index=True, sort = False)
     all_tables_all.sort_values(by=['Monoisotopic Mass'],ascending=True,inplace=True)
 
     return all_tables_all
-    
+
 
 def LCMSMS(p_ion_mass,p_ion_tolerance,parent_ion_mass_tolerance_units,ion_mode,cid,peaks,mz_tolerance,mz_tolerance_units,predicted="False"):
     """
@@ -939,8 +1189,301 @@ def LCMSMS(p_ion_mass,p_ion_tolerance,parent_ion_mass_tolerance_units,ion_mode,c
     api_request = f"{api_request}&peaks={peaks}"
     api_request = main_url + api_request
 
-    tables = pd.read_html(api_request)
+    tables = transport.read_html(api_request)
     tables = tables[0].drop(["Spectral Display Tools","Structure"],axis=1)
 
     return tables
 
+
+def afetch_all(accessions, concurrency=8):
+    """
+
+    Async counterpart of fetch_all, the LMDB pages are downloaded without blocking the event loop
+
+    Args:
+
+        accessions (list): list of LMDB ID
+
+        concurrency (int): default = 8, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        An async generator object for Record(s), one for each LMDB ID
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        async for record in afetch_all(["LMDB00001","LMDB00002","LMDB00003"]):
+            print (record.Geninfo)
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("afetch_all takes list as an argument")
+
+    return records.afetch_all(Record, accessions, concurrency)
+
+
+async def aGeninfo(accessions, concurrency=8):
+    """
+
+    Async counterpart of Geninfo, the LMDB pages are downloaded without blocking the event loop
+
+    Args:
+
+        accessions (list): list of LMDB ID and/or Record
+
+        concurrency (int): default = 8, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        An async generator object for Data frame(s), the same as Geninfo
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        async for i_data in aGeninfo(["LMDB00001","LMDB00002","LMDB00003"]):
+            print (i_data.head())
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("aGeninfo takes list as an argument")
+
+    async for record in records.afetch_all(Record, accessions, concurrency, ["Geninfo"]):
+        yield record.Geninfo
+
+
+async def aAccData(accessions, concurrency=8):
+    """
+
+    Async counterpart of AccData, the LMDB pages are downloaded without blocking the event loop
+
+    Args:
+
+        accessions (list): list of LMDB ID and/or Record
+
+        concurrency (int): default = 8, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        An async generator object for Data frame(s), the same as AccData
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        async for i_data in aAccData(["LMDB00001","LMDB00002","LMDB00003"]):
+            print (i_data.head())
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("aAccData takes list as an argument")
+
+    async for record in records.afetch_all(Record, accessions, concurrency, ["AccData"]):
+        yield record.AccData
+
+
+async def aSynonymsData(accessions, concurrency=8):
+    """
+
+    Async counterpart of SynonymsData, the LMDB pages are downloaded without blocking the event loop
+
+    Args:
+
+        accessions (list): list of LMDB ID and/or Record
+
+        concurrency (int): default = 8, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        An async generator object for Data frame(s), the same as SynonymsData
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        async for i_data in aSynonymsData(["LMDB00001","LMDB00002","LMDB00003"]):
+            print (i_data.head())
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("aSynonymsData takes list as an argument")
+
+    async for record in records.afetch_all(Record, accessions, concurrency, ["SynonymsData"]):
+        yield record.SynonymsData
+
+
+async def aExpProp(accessions, concurrency=8):
+    """
+
+    Async counterpart of ExpProp, the LMDB pages are downloaded without blocking the event loop
+
+    Args:
+
+        accessions (list): list of LMDB ID and/or Record
+
+        concurrency (int): default = 8, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        An async generator object for Data frame(s), the same as ExpProp
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        async for i_data in aExpProp(["LMDB00001","LMDB00002","LMDB00003"]):
+            print (i_data.head())
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("aExpProp takes list as an argument")
+
+    async for record in records.afetch_all(Record, accessions, concurrency, ["ExpProp"]):
+        yield record.ExpProp
+
+
+async def aPredProp(accessions, concurrency=8):
+    """
+
+    Async counterpart of PredProp, the LMDB pages are downloaded without blocking the event loop
+
+    Args:
+
+        accessions (list): list of LMDB ID and/or Record
+
+        concurrency (int): default = 8, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        An async generator object for Data frame(s), the same as PredProp
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        async for i_data in aPredProp(["LMDB00001","LMDB00002","LMDB00003"]):
+            print (i_data.head())
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("aPredProp takes list as an argument")
+
+    async for record in records.afetch_all(Record, accessions, concurrency, ["PredProp"]):
+        yield record.PredProp
+
+
+async def aSpectra(accessions, concurrency=8):
+    """
+
+    Async counterpart of Spectra, the LMDB pages are downloaded without blocking the event loop
+
+    Args:
+
+        accessions (list): list of LMDB ID and/or Record
+
+        concurrency (int): default = 8, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        An async generator object for Data frame(s), the same as Spectra
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        async for i_data in aSpectra(["LMDB00001","LMDB00002","LMDB00003"]):
+            print (i_data.head())
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("aSpectra takes list as an argument")
+
+    async for record in records.afetch_all(Record, accessions, concurrency, ["Spectra"]):
+        yield record.Spectra
+
+
+async def aConcsData(accessions, concurrency=8):
+    """
+
+    Async counterpart of ConcsData, the LMDB pages are downloaded without blocking the event loop
+
+    Args:
+
+        accessions (list): list of LMDB ID and/or Record
+
+        concurrency (int): default = 8, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        An async generator object for Data frame(s), the same as ConcsData
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        async for i_data in aConcsData(["LMDB00001","LMDB00002","LMDB00003"]):
+            print (i_data.head())
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("aConcsData takes list as an argument")
+
+    async for record in records.afetch_all(Record, accessions, concurrency, ["ConcsData"]):
+        yield record.ConcsData
+
+
+async def atxtsearch(query):
+    """
+
+    Async counterpart of txtsearch, the search page is downloaded without blocking the event loop.
+
+    Advanced searching using a powerful search engine based on the Lucene query language. for more information see: http://lmdb.ca/textquery
+
+    Args:
+
+        query (str): a query string
+
+    Returns:
+
+        A generator object for Data frame(s) contains information retrieved from LMDB about metabolites
+
+    Raises:
+
+        TypeError if argument (query) is not a string
+
+    Example:
+    
+        data = await atxtsearch("(histidine OR poultry) AND NOT glycolylneuraminic")
+        print (data)
+
+    """
+
+    xml = await aio.get(_txtsearch_url(query))
+
+    return _find_LMDB(xml)
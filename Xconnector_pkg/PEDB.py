@@ -1,8 +1,46 @@
 import urllib
 import urllib.request
-import pandas as pd
-from pandas import DataFrame
-import numpy as np 
+
+from . import tables
+from .lazy import np
+
+
+# the tables and their identifier columns
+_TABLES = {
+    "metabolites": ("DB//Polyphenol_Metabolites.csv", ["id","pubchem_compound_id","formula","name"]),
+    "classification": ("DB//polyphenol_classification.csv", ["compound_id","compound_name"]),
+    "composition": ("DB//Polyphenols_having_composition_data.csv", ["id","pubchem_compound_id","formula","name"]),
+}
+
+
+# each table is read once, with its identifier columns indexed
+def _metabolites():
+    return tables.table(*_TABLES["metabolites"], dtype=str)
+
+def _classification():
+    return tables.table(*_TABLES["classification"], dtype=str)
+
+def _composition():
+    return tables.table(*_TABLES["composition"], dtype=str)
+
+def build_tables():
+
+    """
+
+    Convert the PolyphenolExplorer CSV files of DB/ into memory-mapped NumPy files, loaded instead of the CSV files from then on
+
+    Returns:
+
+        list of the directories written
+
+    Example:
+
+        build_tables()
+        df = GetInfo(["C28H33O16"], "formula")
+
+    """
+
+    return [tables.build(path, columns, dtype=str) for path, columns in _TABLES.values()]
 
 
 def GetInfo(accessions, identifier):
@@ -34,41 +72,113 @@ def GetInfo(accessions, identifier):
     if type(accessions) != list:
         raise TypeError ("GetInfo takes accessions as a list as an argument")
 
-    df_db = pd.read_csv("DB//Polyphenol_Metabolites.csv", dtype=str)
-
-    if identifier == "pubchem_compound_id":
-        #df_db["pubchem_compound_id"]= df_db["pubchem_compound_id"].apply(str)
-        df_db = df_db.loc[df_db["pubchem_compound_id"].isin(accessions)]
-        return(df_db)
-
-    if identifier == "formula":
-        #df_db["formula"]= df_db["formula"].apply(str)
+    if identifier not in ("pubchem_compound_id", "formula", "name"):
+        return None
 
-        df_db = df_db.loc[df_db["formula"].isin(accessions)]
-        return(df_db)
-
-    if identifier == "name":
-        #df_db["name"]= df_db["name"].apply(str)
-
-        df_db = df_db.loc[df_db["name"].isin(accessions)]
-        return(df_db)
+    df_db = _metabolites().lookup(identifier, accessions)
+    return(df_db)
 
 def pc_getinfo(GetInfo_df):
     id_list = list(set(GetInfo_df["id"].tolist())) 
-    pc_df = pd.read_csv("DB//polyphenol_classification.csv", dtype=str)
-
-    pc_df = pc_df.loc[pc_df["compound_id"].isin(id_list)]
+    pc_df = _classification().lookup("compound_id", id_list)
 
     return(pc_df)
 
 def pcd_getinfo(GetInfo_df):
     id_list = list(set(GetInfo_df["id"].tolist())) 
-    pcd_df = pd.read_csv("DB//Polyphenols_having_composition_data.csv", dtype=str)
-
-    pcd_df = pcd_df.loc[pcd_df["id"].isin(id_list)]
+    pcd_df = _composition().lookup("id", id_list)
 
     return(pcd_df)
 
 
+class Query:
+
+    """
+
+    The three PolyphenolExplorer tables kept in memory, with their id indexes and the metabolite, classification and composition
+    tables joined once, for lookups of many compounds in one call
+
+    Note:
+
+        The joined view is a left join: a metabolite has one row for each pair of its classification and composition rows
+        (so it is repeated when it has several of them), or one row with missing values if it has none. The rows of a metabolite
+        are next to each other, in the order of Polyphenol_Metabolites.csv, with the classification columns
+        (class, subclass, compound_name, compound_id) and the composition columns prefixed by "composition_".
+
+    Example:
+
+        query = Query()
+        print (query.joined(["C28H33O16","C22H23O11"], "formula"))
+
+    """
+
+    def __init__(self):
+
+        self.metabolites = _metabolites()
+        self.classification = _classification()
+        self.composition = _composition()
+
+        composition = self.composition.frame.add_prefix("composition_")
+        view = self.metabolites.frame.reset_index(drop=True)
+        view.insert(0, "row", np.arange(len(view)))
+        view = view.merge(self.classification.frame, how="left", left_on="id", right_on="compound_id")
+        view = view.merge(composition, how="left", left_on="id", right_on="composition_id")
+        # a left merge keeps the order of the metabolites, so the rows of metabolite i start at offsets[i]
+        counts = np.bincount(view.pop("row").to_numpy(), minlength=len(self.metabolites.frame))
+        self.view = view
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def __repr__(self):
+        return f"Query({len(self.offsets) - 1} metabolites, {len(self.view)} joined rows)"
+
+    def _view_rows(self, positions):
+        # expand metabolite positions to the positions of their joined rows
+        starts, ends = self.offsets[positions], self.offsets[positions + 1]
+        counts = ends - starts
+        return np.repeat(starts, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    def joined(self, accessions, identifier):
+        """
+
+        Get the joined metabolite, classification and composition rows of many compounds
+
+        Args:
+
+            accessions (list): pubchem_compound_id, name, formula or id values
+
+            identifier (string): pubchem_compound_id, formula, name or id
+
+        Returns:
+
+            Data frame of the joined rows of the matching metabolites (one or more rows each, see Query), in the order of the metabolites table
+
+        Raises:
+
+            TypeError if argument (accessions) is not a list or (identifier) is not one of the above
+
+        """
+
+        if type(accessions) != list:
+            raise TypeError ("joined takes accessions as a list as an argument")
+        if identifier not in ("pubchem_compound_id", "formula", "name", "id"):
+            raise TypeError ("identifier argument should be pubchem_compound_id, formula, name or id")
+
+        positions = self.metabolites.positions(identifier, accessions)
+        return self.view.take(self._view_rows(positions)).reset_index(drop=True)
+
+    def classes(self, ids):
+        """
+
+        Get the classification rows of many metabolite ids (like pc_getinfo)
+
+        """
+        return self.classification.lookup("compound_id", ids)
+
+    def compositions(self, ids):
+        """
+
+        Get the composition rows of many metabolite ids (like pcd_getinfo)
 
+        """
+        return self.composition.lookup("id", ids)
 
@@ -1,36 +1,257 @@
 import urllib
-import urllib.request
-import pandas as pd 
-from pandas import DataFrame
+import urllib.parse
+from . import ids, images, local, parallel, records, throttle, transport
+from .lazy import aio, pd
+
+
+class Record(records.Record):
 
-def Geninfo(accessions):
     """
 
-    Retrieve information about combines detailed toxin data with comprehensive toxin target information from The Toxin and Toxin Target Database (T3DB).
+    One toxin page from The Toxin and Toxin Target Database (T3DB), downloaded and parsed only once
 
     Args:
 
-        accessions (list): list of T3DP ID 
+        accession (str): T3DB ID
+
+    Raises:
+
+        TypeError if argument (accession) is not a string
+
+    Note:
+
+        The page is fetched on first use, and every section (Geninfo, ExpProp and PredProp) is built lazily from that one fetch and then kept.
+        A Record can be passed anywhere a list of T3DB IDs is accepted by those functions.
+
+    Example:
+
+        record = Record("T3D0001")
+        print (record.Geninfo)
+        print (record.PredProp)
+
+    """
+
+    main_url = "http://www.t3db.ca/toxins/"
+
+    def _parse(self, page):
+        # some tables can only be parsed when the first row is taken as the header
+        return transport.parse_tables(page, fallback={"header": 0})
+
+    Geninfo = property(lambda self: self._section("Geninfo", _Geninfo))
+    ExpProp = property(lambda self: self._section("ExpProp", _ExpProp))
+    PredProp = property(lambda self: self._section("PredProp", _PredProp))
+
+
+def fetch_all(accessions, concurrency=1):
+
+    """
+
+    Download and parse the T3DB page of each toxin once, to serve all of its sections from that one fetch
+
+    Args:
+
+        accessions (list): list of T3DB ID
+
+        concurrency (int): default = 1, number of pages downloaded at the same time, the results keep the order of accessions
 
     Returns:
 
-        A generator Data frame(s) contains general information retrieved from T3DB about toxins returned from the search
+        A generator object for Record(s), one for each T3DB ID
 
     Raises:
 
         TypeError if argument (accessions) is not a list
 
+    Example:
+
+        for record in fetch_all(["T3D0001","T3D0002"], concurrency=4):
+            print (record.Geninfo)
+            print (record.PredProp)
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("fetch_all takes list as an argument")
+
+    return records.fetch_all(Record, accessions, concurrency)
+
+
+def set_backend(backend="web", path=None):
+
+    """
+
+    Choose where the toxin sections are read from
+
+    Args:
+
+        backend (str): default = "web", either "web" to download the T3DB pages, or "local" to read the store built with build_local
+
+        path (str): path of the local store, needed when backend is "local"
+
+    Raises:
+
+        TypeError if argument (backend) is not "web" or "local"
+
+        TypeError if argument (path) is not a string of a T3DB store when backend is "local"
+
     Note:
 
-        If an accession has no information in T3DP the function will return an empty data frame
+        With the local backend Geninfo, ExpProp and PredProp return the same data frames without any download.
 
     Example:
 
-        for data in Geninfo(["T3D0001","T3D0002"]):
-            print (data)
+        build_local("toxins.xml", "t3db.sqlite")
+        set_backend("local", "t3db.sqlite")
+        for i_data in Geninfo(["T3D0001"]):
+            print (i_data)
 
     """
 
+    records.set_backend(Record, backend, path)
+
+
+def set_rate_limit(**kwargs):
+
+    """
+
+    Pace the requests sent to T3DB (e.g. to stay under the rate the server tolerates)
+
+    Args:
+
+        the keyword arguments of throttle.configure (rate, burst, adaptive, concurrency, min_concurrency, max_concurrency, slow, failures, cooldown)
+
+    Raises:
+
+        TypeError if an argument is not one of the settings of throttle.configure
+
+    Note:
+
+        With adaptive=True the number of requests in flight adapts between min_concurrency and max_concurrency:
+        it grows while T3DB answers quickly and is halved after a 429/503 answer or a latency spike.
+
+    Example:
+
+        set_rate_limit(rate=5, burst=5, adaptive=True, max_concurrency=8)
+
+    """
+
+    throttle.configure("T3DB", **kwargs)
+
+
+def structures(accessions, out_dir=".", concurrency=1):
+    """
+
+    Download the structure images of metabolites from The Toxin and Toxin Target Database (T3DB)
+
+    Args:
+
+        accessions (list): list of T3DB IDs
+
+        out_dir (str): default = ".", directory of the images, one file <accession>.png per accession
+
+        concurrency (int): default = 1, number of images downloaded at the same time
+
+    Returns:
+
+        Data frame of the Path, Status and Error of the image of each accession, see images.download
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        structures(["T3D0001", "T3D0002"], "structures", concurrency=8)
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("structures takes list as an argument")
+
+    return images.download(accessions, out_dir, "T3DB", concurrency)
+
+
+def _xml_sections(element):
+    # the same data frames as the web sections, built from one toxin element of the XML dump
+    sections = {
+        "Geninfo": local.xml_geninfo(element, _Geninfo_rows, "Accession Number"),
+        "ExpProp": local.xml_properties(element, "experimental_properties/property", "Reference"),
+        "PredProp": local.xml_properties(element, "predicted_properties/property", "Source"),
+    }
+    return local.accession(element), local.xml_compound(element), local.drop_empty(sections)
+
+
+# where the general information rows of the page are in the columns of the CSV dump
+_GENINFO_CSV = {"Accession Number":"T3DB ID","Common Name":"Name","Description":"Description","Chemical Formula":"Formula",
+    "Average Molecular Weight":"Weight","Monoisotopic Molecular Weight":"Monoisotopic Mass","IUPAC Name":"IUPAC",
+    "Traditional Name":"Traditional IUPAC","CAS Registry Number":"CAS","SMILES":"SMILES","InChI Identifier":"InChI",
+    "InChI Key":"InChIKey","DrugBank ID":"Drugbank ID","Chemspider ID":"ChemSpider ID","KEGG Compound ID":"KEGG ID",
+    "ChEBI ID":"ChEBI ID","PubChem Compound":"PubChem ID"}
+
+
+def _csv_sections(csv_path):
+    # the CSV dump only has the general information, read by chunks to keep the memory bounded
+    for chunk in pd.read_csv(csv_path, dtype=str, chunksize=1000):
+        chunk = chunk.fillna("Not Available")
+        columns = [name for name in _Geninfo_rows if _GENINFO_CSV.get(name) in chunk.columns]
+        for _, row in chunk.iterrows():
+            geninfo = pd.DataFrame([[row[_GENINFO_CSV[name]] for name in columns]], columns=columns)
+            compound = {"name": row.get("Name"), "formula": row.get("Formula"), "average_mass": row.get("Weight"),
+                "mono_mass": row.get("Monoisotopic Mass")}
+            yield row["T3DB ID"], compound, {"Geninfo": geninfo}
+
+
+def build_local(dump_path, path="t3db.sqlite"):
+
+    """
+
+    Build the local T3DB store from the official toxins dump (toxins.xml or toxins.csv from t3db.ca/downloads)
+
+    Args:
+
+        dump_path (str): path of the extracted XML or CSV dump
+
+        path (str): default = "t3db.sqlite", path of the store to write (replaced if it exists)
+
+    Returns:
+
+        int number of toxins written
+
+    Raises:
+
+        TypeError if argument (dump_path) is not a string
+
+    Note:
+
+        The dump is streamed one toxin at a time, so the memory used does not grow with its size.
+        The CSV dump only has the general information, ExpProp and PredProp are then still read from the web.
+
+    Example:
+
+        print (build_local("toxins.xml", "t3db.sqlite"))
+
+    """
+
+    if type(dump_path) != str:
+        raise TypeError ("dump_path argument should be a string")
+
+    if dump_path.lower().endswith(".csv"):
+        items = _csv_sections(dump_path)
+    else:
+        items = (_xml_sections(element) for element in local.iterparse(dump_path, "compound"))
+    return local.build(path, "T3DB", items)
+
+
+#the general information rows of the page
+_Geninfo_rows = ["Version","Status","Creation Date","Update Date","Accession Number","Common Name","Chemical Formula","Average Molecular Weight",
+    "Monoisotopic Molecular Weight","IUPAC Name","Traditional Name","CAS Registry Number",
+    "SMILES","InChI Identifier","InChI Key","Kingdom","Super Class","Class","Sub Class","Direct Parent",
+    "Molecular Framework","Role","State","Cellular Locations","Biospecimen Locations","Tissue Locations",
+    "DrugBank ID","FoodDB ID","Chemspider ID","KEGG Compound ID","ChEBI ID","PubChem Compound"]
+
+
+def _Geninfo(record):
+
     def add_all_df(dfdf_new):
 
     
@@ -41,52 +262,68 @@ def Geninfo(accessions):
 
         return dfdf
 
+    #take only the general information
+    take_from_tables0 = _Geninfo_rows
+
+    # get the data in form of tables
+    try:
+        tables = record.fetch()
+        #removing row with no data
+        tables0 = tables[0].iloc[:,0:2]
+        #rename the col 
+        tables0.columns = ["col1", "col2"]
+
+        tables0 = tables0[tables0["col1"].isin(take_from_tables0)]
+        tables0 = add_all_df(tables0)
+        tables0 = tables0.loc[:,~tables0.columns.duplicated()]
+
+    except Exception:
+        not_found = ["NaN"] * len(take_from_tables0)
+        not_found = dict( zip(take_from_tables0,not_found) )
+        tables0 = pd.DataFrame(data=not_found , index= [0])
+
+        tables0 = tables0.rename(index={0:record.accession })
+
+    return tables0
+
+
+def Geninfo(accessions, concurrency=1):
+    """
+
+    Retrieve information about combines detailed toxin data with comprehensive toxin target information from The Toxin and Toxin Target Database (T3DB).
+
+    Args:
+
+        accessions (list): list of T3DP ID and/or Record
+
+        concurrency (int): default = 1, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        A generator Data frame(s) contains general information retrieved from T3DB about toxins returned from the search
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Note:
+
+        If an accession has no information in T3DP the function will return an empty data frame
+
+    Example:
+
+        for data in Geninfo(["T3D0001","T3D0002"]):
+            print (data)
+
+    """
+
     if type(accessions) != list:
         raise TypeError ("Geninfo takes list as an argument")
 
-    main_url = "http://www.t3db.ca/toxins/"
-    for i_acc in accessions:
-        # creating the query search url by accessions
-        api_request = main_url + i_acc
-        # get the data in form of tables
-        try:
-            try:
-                tables = pd.read_html(api_request)
-            except:
-                tables =pd.read_html(api_request, header= 0 )
-            #removing row with no data
-            tables0 = tables[0].iloc[:,0:2]
-            #rename the col 
-            tables0.columns = ["col1", "col2"]
-  
-            #take only the general information
-            take_from_tables0 = ["Version","Status","Creation Date","Update Date","Accession Number","Common Name","Chemical Formula","Average Molecular Weight",
-            "Monoisotopic Molecular Weight","IUPAC Name","Traditional Name","CAS Registry Number",
-            "SMILES","InChI Identifier","InChI Key","Kingdom","Super Class","Class","Sub Class","Direct Parent",
-            "Molecular Framework","Role","State","Cellular Locations","Biospecimen Locations","Tissue Locations",
-            "DrugBank ID","FoodDB ID","Chemspider ID","KEGG Compound ID","ChEBI ID","PubChem Compound"]
-            
-            tables0 = tables0[tables0["col1"].isin(take_from_tables0)]
-            tables0 = add_all_df(tables0)
-            tables0 = tables0.loc[:,~tables0.columns.duplicated()]
-
-            yield tables0
-        except:
-            take_from_tables0 = ["Version","Status","Creation Date","Update Date","Accession Number","Common Name","Chemical Formula","Average Molecular Weight",
-            "Monoisotopic Molecular Weight","IUPAC Name","Traditional Name","CAS Registry Number",
-            "SMILES","InChI Identifier","InChI Key","Kingdom","Super Class","Class","Sub Class","Direct Parent",
-            "Molecular Framework","Role","State","Cellular Locations","Biospecimen Locations","Tissue Locations",
-            "DrugBank ID","FoodDB ID","Chemspider ID","KEGG Compound ID","ChEBI ID","PubChem Compound"]
-            
-            not_found = ["NaN"] * len(take_from_tables0)
-            not_found = dict( zip(take_from_tables0,not_found) )
-            tables0 = pd.DataFrame(data=not_found , index= [0])
-
-            tables0 = tables0.rename(index={0:i_acc })
-
-            yield tables0
-
-def BroCat(category=list()):
+    for record in records.fetch_all(Record, accessions, concurrency):
+        yield record.Geninfo
+
+def iBroCat(category=list(),concurrency=4):
     """
     Browsing information about combines detailed toxin data with comprehensive toxin target information.
 
@@ -94,9 +331,11 @@ def BroCat(category=list()):
 
         category (list): Filter by toxin category ["airborne_pollutant","animal_toxin","bacterial_toxin","cigarette_toxin","drug","food_toxin","household_toxin","industrial_workplace_toxin","natural_toxin","pesticide","plant_toxin","pollutant","polychlorinated_biphenyl","protein","synthetic_toxin","uremic_toxin"]
 
+        concurrency (int): default = 4, number of result pages fetched ahead at the same time
+
     Returns:
 
-        Data frame(s) contains general information retrieved from T3DB about toxins returned from the search
+        A generator object for Data frame(s), one for each page of the toxins returned from the search, yielded as soon as it is parsed
 
     Raises:
 
@@ -104,8 +343,8 @@ def BroCat(category=list()):
     
     Example:
 
-        data = BroCat(["protein"])
-        print (data.head())
+        for data in iBroCat(["protein"]):
+            print (data.head())
 
     """
 
@@ -129,24 +368,46 @@ def BroCat(category=list()):
     api_request = urllib.parse.urlencode(dict_url)
     old_api_request =  main_url + api_request 
 
-    page = 0
-    tables_all = DataFrame()
-    while True:
-        api_request = old_api_request
-        page = page + 1
-        api_request = f"{api_request}&page={page}"
-        tables = pd.read_html(api_request)
-        tables = tables[0]
-        print (tables)
-        if len(tables) != 0:
-            tables_all = tables_all.append(tables, ignore_index=True, sort = False)
-        else:
-            break
-    tables_all.drop(["Structure"],1,inplace=True)
+    #the next pages are fetched ahead until the first empty one
+    def read_page(page):
+        return transport.read_table(f"{old_api_request}&page={page}")
+
+    return (tables.drop(["Structure"], axis=1, errors="ignore") for tables in parallel.paginate(read_page, concurrency))
+
+
+def BroCat(category=list(),concurrency=4):
+    """
+    Browsing information about combines detailed toxin data with comprehensive toxin target information.
+
+    Args:
+
+        category (list): Filter by toxin category ["airborne_pollutant","animal_toxin","bacterial_toxin","cigarette_toxin","drug","food_toxin","household_toxin","industrial_workplace_toxin","natural_toxin","pesticide","plant_toxin","pollutant","polychlorinated_biphenyl","protein","synthetic_toxin","uremic_toxin"]
+
+        concurrency (int): default = 4, number of result pages fetched ahead at the same time
+
+    Returns:
+
+        Data frame(s) contains general information retrieved from T3DB about toxins returned from the search
+
+    Raises:
+
+        TypeError if argument (category) is not a list
+    
+    Example:
+
+        data = BroCat(["protein"])
+        print (data.head())
+
+    """
+
+    tables_all = list(iBroCat(category, concurrency))
+    if len(tables_all) == 0:
+        return pd.DataFrame()
 
-    return tables_all
+    return pd.concat(tables_all, ignore_index=True, sort = False)
 
-def ChemQuery(start=100,end=200,search_type="molecular"):
+
+def ChemQuery(start=100,end=200,search_type="molecular",concurrency=4):
     """
 
     Search by molecular weight for toxin data with comprehensive toxin target information in T3DB
@@ -160,6 +421,8 @@ def ChemQuery(start=100,end=200,search_type="molecular"):
         search_type: default = "molecular", either by the Molecular weight / Average mass (molecular) or by the Monoisotopic mass (monoisotopic)
 
 
+        concurrency (int): default = 4, number of result pages fetched ahead at the same time
+
     Returns:
 
         Data frame contains the ChemQuery by molecular weight search result of metabolites from T3DB
@@ -198,29 +461,33 @@ def ChemQuery(start=100,end=200,search_type="molecular"):
     old_api_request = main_url + api_request
 
 
-    def find_T3D(xml):
-        import re
-        xml = str(xml)
-        all_T3D = (i.end() for i in re.finditer("T3D",xml))
-        all_T3D = list( set ( [ f"T3D{xml[i:i+4]}" for i in all_T3D if xml[i:i+4].isdigit()  ] ) )
-        return all_T3D
-
-    page = 0
-    all_T3D_id = []
-    while True:
-        api_request = old_api_request
-        page = page + 1
-        api_request = f"{api_request}&page={page}"
-        xml = urllib.request.urlopen(api_request).read()
-        final_T3D = find_T3D(xml)
-        if len(final_T3D) != 0:
-            all_T3D_id = all_T3D_id + [ i for i in  final_T3D] 
-        if len(final_T3D) == 0:
-            break
+    #the next pages are fetched ahead until the first page without IDs
+    def read_page(page):
+        return ids.extract(transport.get(f"{old_api_request}&page={page}"), "T3DB")
+
+    all_T3D_id = [ i for page_ids in parallel.paginate(read_page, concurrency) for i in page_ids ]
  
     return Geninfo(all_T3D_id)
 
-def txtsearch(query):
+def _txtsearch_url(query):
+
+    if type(query) != str:
+        raise TypeError ("query argument should be a list")
+
+    main_url = "http://www.t3db.ca/unearth/q?"
+    dict_url = {"utf8":"✓","query":query,"searcher":"compounds"}
+
+    api_request = urllib.parse.urlencode(dict_url)
+    return main_url + api_request
+
+
+def _find_T3d(xml):
+    if b"returned no results" in xml:
+        return []
+    return ids.extract(xml, "T3DB")
+
+
+def txtsearch(query,concurrency=4):
     """
 
     Advanced searching using a powerful search engine based on the Lucene query language. for more information see: http://www.t3db.ca/text_query
@@ -229,6 +496,8 @@ def txtsearch(query):
 
         query (str): a query string
 
+        concurrency (int): default = 4, number of result pages fetched ahead at the same time
+
     Returns:
 
         A generator object for Data frame(s) contains information retrieved from T3DB about toxins
@@ -243,49 +512,25 @@ def txtsearch(query):
 
 
     """
-    if type(query) != str:
-        raise TypeError ("query argument should be a list")
+    old_api_request = _txtsearch_url(query)
 
-    main_url = "http://www.t3db.ca/unearth/q?"
-    dict_url = {"utf8":"✓","query":query,"searcher":"compounds"}
+    #the next pages are fetched ahead until the first page without IDs
+    def read_page(page):
+        return _find_T3d(transport.get(f"{old_api_request}&page={page}"))
 
-    api_request = urllib.parse.urlencode(dict_url)
-    old_api_request = main_url + api_request
-    def find_T3d(xml_url):
-        xml = urllib.request.urlopen(xml_url).read()
-        import re
-        xml_str = str(xml)
-        if "returned no results" not in xml_str:
-            end_of_lmdb = (lmdb.end() for lmdb in re.finditer("T3D",xml_str))
-            final_T3D = list( set( [ f"T3D{xml_str[end:end+4]}" for end in end_of_lmdb if xml_str[end:end+4].isdigit()] ) )
-            return final_T3D
-        elif "returned no results" in xml_str:
-            final_T3D = []
-            return final_T3D
-
-    page = 0
-    final_T3D_all = []
-    while True:
-        page = page +1
-        api_request = old_api_request
-        api_request = f"{api_request}&page={page}"
-        final_T3D = find_T3d(api_request)
-        if len(final_T3D) != 0:
-            final_T3D_all = final_T3D_all + [i for i in final_T3D]
-        elif len(final_T3D) == 0:
-            break
+    final_T3D_all = [ i for page_ids in parallel.paginate(read_page, concurrency) for i in page_ids ]
 
     return final_T3D_all
 
 
-def LCMS(masses,mode,adducts,tolerance,tolerance_unit):
+def iLCMS(masses,mode,adducts,tolerance,tolerance_unit):
     """
 
-    Advanced Mass Spectrum search
+    Advanced Mass Spectrum search, yielding the results of each adduct as soon as they are parsed
 
     Args:
 
-        masses (list): a query Masses (Da) maximum 700 query masses per request
+        masses (list): a query Masses (Da) maximum 700 query masses per request with the web backend (no limit with the local backend)
 
         mode (str): Ion Mode (positive, negative, or neutral)
 
@@ -297,7 +542,7 @@ def LCMS(masses,mode,adducts,tolerance,tolerance_unit):
 
     Returns:
 
-        Data frame object contains information retrieved from T3DB about toxins returned from the Mass Spectrum search
+        A generator object for the Data frame(s) of the Mass Spectrum search, one for each adduct request (one for all with the local backend)
 
     Raises:
 
@@ -312,16 +557,16 @@ def LCMS(masses,mode,adducts,tolerance,tolerance_unit):
         TypeError if argument (tolerance_unit) is not a string from ("Da","ppm")
 
     Example:
-    
-        result = LCMS(masses=[300,400],mode="positive",adducts=["M+H","M+H-H2O"],tolerance=0.5,tolerance_unit="Da")
-        print (result)
-   
+
+        for data in iLCMS(masses=[300,400],mode="positive",adducts=["M+H","M+H-H2O"],tolerance=0.5,tolerance_unit="Da"):
+            print (data)
+
     """
     
     #make sure that masses is fine to go
     if type(masses) != list or len(masses) == 0:
         raise TypeError ("masses argument must be a list of length more than zero")
-    if len(masses) > 700:
+    if len(masses) > 700 and Record.store is None:
         raise TypeError ("maximum 700 query masses per request")
     #make sure that mode is fine to go
     opp_mode = ["positive","negative","neutral"]
@@ -339,6 +584,10 @@ def LCMS(masses,mode,adducts,tolerance,tolerance_unit):
     if type(tolerance_unit) != str or tolerance_unit not in opp_unit:
         raise TypeError ("tolerance_unit argument should be string (Da or ppm)")
 
+    #match the masses against the local compounds when the local backend is set (see set_backend)
+    if Record.store is not None:
+        return iter([Record.store.mass_index().search(masses, mode, adducts, tolerance, tolerance_unit)])
+
     #generate the api url
     main_url= "http://www.t3db.ca/spectra/ms/search?"
     dict_url= {"utf8":"✓","commit":"Search","database":"HMDB","ms_search_ion_mode":mode,"tolerance":tolerance,"tolerance_units":tolerance_unit}
@@ -349,24 +598,67 @@ def LCMS(masses,mode,adducts,tolerance,tolerance_unit):
 
     api_request = urllib.parse.urlencode(dict_url)
     api_request = main_url + api_request
-    #for adducts
-    all_tables = []
-    for api_adducts in adducts:
-        api_adducts = api_adducts.replace("+","%2B")
-        api_adducts = api_adducts.replace("-","%2D")
-        api_request = f"{api_request}&adduct_type={api_adducts}"
-        tables = pd.read_html(api_request)
-        all_tables = all_tables + tables
-    all_tables_all= pd.DataFrame()
+    #one request for each adduct, the tables are yielded as they are parsed
+    def read_adducts():
+        for api_adducts in adducts:
+            api_adducts = api_adducts.replace("+","%2B")
+            api_adducts = api_adducts.replace("-","%2D")
+            for tables in transport.read_html(f"{api_request}&adduct_type={api_adducts}"):
+                yield tables
 
-    for i_range in range ( len(all_tables) ):
+    return read_adducts()
 
-        all_tables_all = all_tables_all.append(all_tables[i_range], ignore_index=True, sort = False) 
 
-    all_tables_all.sort_values(by=['Adduct','Monoisotopic Mass'],ascending=True,inplace=True)
+def LCMS(masses,mode,adducts,tolerance,tolerance_unit):
+    """
+
+    Advanced Mass Spectrum search
+
+    Args:
+
+        masses (list): a query Masses (Da) maximum 700 query masses per request with the web backend (no limit with the local backend)
+
+        mode (str): Ion Mode (positive, negative, or neutral)
+
+        adducts (list): Adduct Type (e.g. M+H, M+H-H2O)
+
+        tolerance (int): Molecular Weight Tolerance ± 
+
+        tolerance_unit (str): tolerance unit (Da or ppm)
+
+    Returns:
+
+        Data frame object contains information retrieved from T3DB about toxins returned from the Mass Spectrum search
+
+    Raises:
+
+        TypeError if argument (masses) is not a list of length more than zero
+
+        TypeError if argument (mode) is not a string from ("positive","negative","neutral")
+
+        TypeError if argument (adducts) is not a list
+
+        TypeError if argument (tolerance) is not a number
+
+        TypeError if argument (tolerance_unit) is not a string from ("Da","ppm")
+
+    Example:
     
+        result = LCMS(masses=[300,400],mode="positive",adducts=["M+H","M+H-H2O"],tolerance=0.5,tolerance_unit="Da")
+        print (result)
+   
+    """
+
+    all_tables = list(iLCMS(masses,mode,adducts,tolerance,tolerance_unit))
+    if len(all_tables) == 0:
+        return pd.DataFrame()
+
+    all_tables_all = pd.concat(all_tables, ignore_index=True, sort = False)
+    all_tables_all.sort_values(by=['Adduct','Monoisotopic Mass'],ascending=True,inplace=True)
+
     return all_tables_all
-    
+
+
 def LCMSMS(p_ion_mass,p_ion_tolerance,parent_ion_mass_tolerance_units,ion_mode,cid,peaks,mz_tolerance,mz_tolerance_units,predicted=False):
     """
 
@@ -430,12 +722,24 @@ def LCMSMS(p_ion_mass,p_ion_tolerance,parent_ion_mass_tolerance_units,ion_mode,c
     api_request = f"{api_request}&peaks={peaks}"
     api_request = main_url + api_request
 
-    tables = pd.read_html(api_request)
+    tables = transport.read_html(api_request)
     tables = tables[0].drop(["Spectral Display Tools","Structure"],axis=1)
 
     return tables
 
-def ExpProp(accessions):
+
+def _ExpProp(record):
+
+    try:
+        tables = record.fetch()
+        tables = tables[2]
+    except Exception:
+        tables = pd.DataFrame(data = {"Property":["NA"], "Value":["NA"], "Reference":["NA"]    })
+
+    return records.rename_index(tables, record.accession)
+
+
+def ExpProp(accessions, concurrency=1):
 
     """
 
@@ -443,7 +747,9 @@ def ExpProp(accessions):
 
     Args:
 
-        accessions (list): list of T3DB ID
+        accessions (list): list of T3DB ID and/or Record
+
+        concurrency (int): default = 1, number of pages downloaded at the same time, the results keep the order of accessions
 
     Returns:
 
@@ -464,26 +770,22 @@ def ExpProp(accessions):
     if type(accessions) != list:
         raise TypeError ("SynonymsData takes list as an argument")
 
-    main_url = "http://www.t3db.ca/toxins/"
-    for i_acc in accessions:
-        # creating the query search url by accessions
-        api_request = main_url + i_acc
-        try:
-            tables = pd.read_html(api_request)
-            tables = tables[2]
-        except:
-            tables = pd.DataFrame(data = {"Property":["NA"], "Value":["NA"], "Reference":["NA"]    })
+    for record in records.fetch_all(Record, accessions, concurrency):
+        yield record.ExpProp
+
 
-        # to make the row.names =  to the id 
-        index_name = range(0,len(tables))
-        index_value = f"{i_acc}," *len(index_name)
-        index_value = index_value.split(",")
-        dictionary = dict(zip(index_name, index_value))
-        tables = tables.rename(index= dictionary )
-            
-        yield tables
+def _PredProp(record):
 
-def PredProp(accessions):
+    try:
+        tables = record.fetch()
+        tables = tables[3]
+    except Exception:
+        tables = pd.DataFrame(data = {"Property":["NA"],"Value":["NA"],"Source":["NA"]})
+
+    return records.rename_index(tables, record.accession)
+
+
+def PredProp(accessions, concurrency=1):
 
     """
 
@@ -491,7 +793,9 @@ def PredProp(accessions):
 
     Args:
 
-        accessions (list): list of HMDB ID
+        accessions (list): list of T3DB ID and/or Record
+
+        concurrency (int): default = 1, number of pages downloaded at the same time, the results keep the order of accessions
 
     Returns:
 
@@ -512,22 +816,174 @@ def PredProp(accessions):
     if type(accessions) != list:
         raise TypeError ("PredProp takes list as an argument")
 
-    main_url = "http://www.t3db.ca/toxins/"
-    for i_acc in accessions:
-        # creating the query search url by accessions
-        api_request = main_url + i_acc
-        try:
-            tables = pd.read_html(api_request)
-            tables = tables[3]
-        except:
-            tables = pd.DataFrame(data = {"Property":["NA"],"Value":["NA"],"Source":["NA"]})
-
-        # to make the row.names =  to the id 
-        index_name = range(0,len(tables))
-        index_value = f"{i_acc}," *len(index_name)
-        index_value = index_value.split(",")
-        dictionary = dict(zip(index_name, index_value))
-        tables = tables.rename(index= dictionary )
-
-        yield tables
+    for record in records.fetch_all(Record, accessions, concurrency):
+        yield record.PredProp
+
+
+def afetch_all(accessions, concurrency=8):
+    """
+
+    Async counterpart of fetch_all, the T3DB pages are downloaded without blocking the event loop
+
+    Args:
+
+        accessions (list): list of T3DB ID
+
+        concurrency (int): default = 8, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        An async generator object for Record(s), one for each T3DB ID
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        async for record in afetch_all(["T3D0001","T3D0002"]):
+            print (record.Geninfo)
+
+    """
 
+    if type(accessions) != list:
+        raise TypeError ("afetch_all takes list as an argument")
+
+    return records.afetch_all(Record, accessions, concurrency)
+
+
+async def aGeninfo(accessions, concurrency=8):
+    """
+
+    Async counterpart of Geninfo, the T3DB pages are downloaded without blocking the event loop
+
+    Args:
+
+        accessions (list): list of T3DB ID and/or Record
+
+        concurrency (int): default = 8, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        An async generator object for Data frame(s), the same as Geninfo
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        async for i_data in aGeninfo(["T3D0001","T3D0002"]):
+            print (i_data.head())
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("aGeninfo takes list as an argument")
+
+    async for record in records.afetch_all(Record, accessions, concurrency, ["Geninfo"]):
+        yield record.Geninfo
+
+
+async def aExpProp(accessions, concurrency=8):
+    """
+
+    Async counterpart of ExpProp, the T3DB pages are downloaded without blocking the event loop
+
+    Args:
+
+        accessions (list): list of T3DB ID and/or Record
+
+        concurrency (int): default = 8, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        An async generator object for Data frame(s), the same as ExpProp
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        async for i_data in aExpProp(["T3D0001","T3D0002"]):
+            print (i_data.head())
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("aExpProp takes list as an argument")
+
+    async for record in records.afetch_all(Record, accessions, concurrency, ["ExpProp"]):
+        yield record.ExpProp
+
+
+async def aPredProp(accessions, concurrency=8):
+    """
+
+    Async counterpart of PredProp, the T3DB pages are downloaded without blocking the event loop
+
+    Args:
+
+        accessions (list): list of T3DB ID and/or Record
+
+        concurrency (int): default = 8, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        An async generator object for Data frame(s), the same as PredProp
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        async for i_data in aPredProp(["T3D0001","T3D0002"]):
+            print (i_data.head())
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("aPredProp takes list as an argument")
+
+    async for record in records.afetch_all(Record, accessions, concurrency, ["PredProp"]):
+        yield record.PredProp
+
+
+async def atxtsearch(query,concurrency=4):
+    """
+
+    Async counterpart of txtsearch, the result pages are downloaded without blocking the event loop.
+
+    Advanced searching using a powerful search engine based on the Lucene query language. for more information see: http://www.t3db.ca/text_query
+
+    Args:
+
+        query (str): a query string
+
+        concurrency (int): default = 4, number of result pages fetched ahead at the same time
+
+    Returns:
+
+        A generator object for Data frame(s) contains information retrieved from T3DB about toxins
+
+    Raises:
+
+        TypeError if argument (query) is not a string
+
+    Example:
+    
+        print ( await atxtsearch("arsenic AND metalloid") )
+
+
+    """
+
+    old_api_request = _txtsearch_url(query)
+
+    async def read_page(page):
+        return _find_T3d(await aio.get(f"{old_api_request}&page={page}"))
+
+    final_T3D_all = [ i async for page_ids in aio.paginate(read_page, concurrency) for i in page_ids ]
+
+    return final_T3D_all
@@ -1,7 +1,189 @@
 import urllib
-import urllib.request
-import pandas as pd 
-from pandas import DataFrame
+import urllib.parse
+from . import ids, images, local, parallel, records, throttle, transport
+from .lazy import aio, pd
+
+
+class Record(records.Record):
+
+    """
+
+    One compound page from The Yeast Metabolome Database (YMDB), downloaded and parsed only once
+
+    Args:
+
+        accession (str): YMDB ID
+
+    Raises:
+
+        TypeError if argument (accession) is not a string
+
+    Note:
+
+        The page is fetched on first use, and every section (Geninfo, ExpProp and PredProp) is built lazily from that one fetch and then kept.
+        A Record can be passed anywhere a list of YMDB IDs is accepted by those functions.
+
+    Example:
+
+        record = Record("YMDB00001")
+        print (record.Geninfo)
+        print (record.PredProp)
+
+    """
+
+    main_url = "http://www.ymdb.ca/compounds/"
+
+    def _parse(self, page):
+        # some tables can only be parsed when the first row is taken as the header
+        return transport.parse_tables(page, fallback={"header": 0})
+
+    Geninfo = property(lambda self: self._section("Geninfo", _Geninfo))
+    ExpProp = property(lambda self: self._section("ExpProp", _ExpProp))
+    PredProp = property(lambda self: self._section("PredProp", _PredProp))
+
+
+def fetch_all(accessions, concurrency=1):
+
+    """
+
+    Download and parse the YMDB page of each compound once, to serve all of its sections from that one fetch
+
+    Args:
+
+        accessions (list): list of YMDB ID
+
+        concurrency (int): default = 1, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        A generator object for Record(s), one for each YMDB ID
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        for record in fetch_all(["YMDB00001","YMDB00002"], concurrency=4):
+            print (record.Geninfo)
+            print (record.PredProp)
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("fetch_all takes list as an argument")
+
+    return records.fetch_all(Record, accessions, concurrency)
+
+
+def set_backend(backend="web", path=None):
+
+    """
+
+    Choose where the compound sections are read from
+
+    Args:
+
+        backend (str): default = "web", either "web" to download the YMDB pages, or "local" to read the store built with build_local
+
+        path (str): path of the local store, needed when backend is "local"
+
+    Raises:
+
+        TypeError if argument (backend) is not "web" or "local"
+
+        TypeError if argument (path) is not a string of a YMDB store when backend is "local"
+
+    Note:
+
+        With the local backend Geninfo, ExpProp and PredProp return the same data frames without any download.
+
+    Example:
+
+        build_local("ymdb.xml", "ymdb.sqlite")
+        set_backend("local", "ymdb.sqlite")
+        for i_data in Geninfo(["YMDB00001"]):
+            print (i_data)
+
+    """
+
+    records.set_backend(Record, backend, path)
+
+
+def set_rate_limit(**kwargs):
+
+    """
+
+    Pace the requests sent to YMDB (e.g. to stay under the rate the server tolerates)
+
+    Args:
+
+        the keyword arguments of throttle.configure (rate, burst, adaptive, concurrency, min_concurrency, max_concurrency, slow, failures, cooldown)
+
+    Raises:
+
+        TypeError if an argument is not one of the settings of throttle.configure
+
+    Note:
+
+        With adaptive=True the number of requests in flight adapts between min_concurrency and max_concurrency:
+        it grows while YMDB answers quickly and is halved after a 429/503 answer or a latency spike.
+
+    Example:
+
+        set_rate_limit(rate=5, burst=5, adaptive=True, max_concurrency=8)
+
+    """
+
+    throttle.configure("YMDB", **kwargs)
+
+
+def _xml_sections(element):
+    # the same data frames as the web sections, built from one compound element of the XML dump
+    sections = {
+        "Geninfo": local.xml_geninfo(element, _Geninfo_rows, "YMDB ID"),
+        "ExpProp": local.xml_properties(element, "experimental_properties/property", "Reference"),
+        "PredProp": local.xml_properties(element, "predicted_properties/property", "Source"),
+    }
+    return local.accession(element), local.xml_compound(element), local.drop_empty(sections)
+
+
+def build_local(xml_path, path="ymdb.sqlite"):
+
+    """
+
+    Build the local YMDB store from the official compounds dump (ymdb.xml from ymdb.ca/downloads)
+
+    Args:
+
+        xml_path (str): path of the extracted XML dump
+
+        path (str): default = "ymdb.sqlite", path of the store to write (replaced if it exists)
+
+    Returns:
+
+        int number of compounds written
+
+    Raises:
+
+        TypeError if argument (xml_path) is not a string
+
+    Note:
+
+        The dump is streamed one compound at a time, so the memory used does not grow with its size.
+
+    Example:
+
+        print (build_local("ymdb.xml", "ymdb.sqlite"))
+
+    """
+
+    if type(xml_path) != str:
+        raise TypeError ("xml_path argument should be a string")
+
+    items = (_xml_sections(element) for element in local.iterparse(xml_path, "compound"))
+    return local.build(path, "YMDB", items)
+
 
 def BroComp(strain=list(),status=list(),compounds=list(),proteins=list(),pathways=list(),reactions=list()):
 
@@ -103,7 +285,7 @@ def BroComp(strain=list(),status=list(),compounds=list(),proteins=list(),pathway
     api_request = urllib.parse.urlencode(dict_url)
     api_request = main_url + api_request
 
-    tables = pd.read_html(api_request)
+    tables = transport.read_html(api_request)
     tables = tables[0].drop(["Structure"],1)
 
     def formula(form):
@@ -124,7 +306,7 @@ def BroComp(strain=list(),status=list(),compounds=list(),proteins=list(),pathway
 
     return tables
 
-def structures(accession):
+def structures(accession, out_dir=".", concurrency=1):
 
     """
 
@@ -133,39 +315,95 @@ def structures(accession):
 
     Args:
 
-        accessions (str): str of only one YMDB ID 
+        accessions (str or list): str of only one YMDB ID, or list of YMDB IDs to download in out_dir
+
+        out_dir (str): default = ".", directory of the images when accessions is a list
+
+        concurrency (int): default = 1, number of images downloaded at the same time when accessions is a list
 
     Returns:
 
         png image for the metabolite structure
 
+        or for a list, Data frame of the Path, Status and Error of the image of each accession, see images.download
+
     Raises:
 
-        TypeError if argument (accession) is not a string of only one YMDB ID
+        TypeError if argument (accession) is not a string of only one YMDB ID or a list
 
     Example:
 
         structures("YMDB00001")
+        structures(["YMDB00001", "YMDB00002"], "structures", concurrency=8)
    
     """
 
+    if type(accession) == list:
+        return images.download(accession, out_dir, "YMDB", concurrency)
     if type(accession) != str:
-        raise TypeError ("structures takes string as an argument with only one YMDB ID")
+        raise TypeError ("structures takes string as an argument with only one YMDB ID or a list")
 
     api_request = f"http://www.ymdb.ca/structures/{accession}/image.png"
     image_name = f"{accession}.png"
-    image= urllib.request.urlretrieve(api_request, image_name)
+    image= transport.urlretrieve(api_request, image_name)
 
     return image
 
-def Geninfo(accessions):
+
+#the general information rows of the page
+_Geninfo_rows = ["Version","Status","Creation Date","Update Date","YMDB ID","Common Name","Chemical Formula","Average Molecular Weight",
+    "Monoisotopic Molecular Weight","IUPAC Name","Traditional Name","CAS Registry Number",
+    "SMILES","InChI Identifier","InChI Key","Kingdom","Super Class","Class","Sub Class","Direct Parent",
+    "Molecular Framework","Role","State","Cellular Locations","Biospecimen Locations","Tissue Locations",
+    "DrugBank ID","FoodDB ID","Chemspider ID","KEGG Compound ID","ChEBI ID","PubChem Compound"]
+
+
+def _Geninfo(record):
+
+    def add_all_df(dfdf_new):
+
+
+        dfdf = dfdf_new.drop(["col1"], 1)
+        dfdf = dfdf.transpose()
+        dfdf.columns = list(dfdf_new["col1"])
+        dfdf = dfdf.rename(index={"col2": dfdf["YMDB ID"][0]})
+
+        return dfdf
+
+    #take only the general information
+    take_from_tables0 = _Geninfo_rows
+
+    # get the data in form of tables
+    try:
+        tables = record.fetch()
+        #removing row with no data
+        tables0 = tables[0].iloc[:,0:2]
+        #rename the col 
+        tables0.columns = ["col1", "col2"]
+
+        tables0 = tables0[tables0["col1"].isin(take_from_tables0)]
+        tables0 = add_all_df(tables0)
+
+    except Exception:
+        not_found = ["NaN"] * len(take_from_tables0)
+        not_found = dict( zip(take_from_tables0,not_found) )
+        tables0 = pd.DataFrame(data=not_found , index= [0])
+
+        tables0 = tables0.rename(index={0:record.accession })
+
+    return tables0
+
+
+def Geninfo(accessions, concurrency=1):
     """
 
     Retrieve information about small molecule metabolites found in or produced by Saccharomyces cerevisiae (also known as Baker’s yeast and Brewer’s yeast) (YMDB).
 
     Args:
 
-        accessions (list): list of YMDB ID 
+        accessions (list): list of YMDB ID and/or Record
+
+        concurrency (int): default = 1, number of pages downloaded at the same time, the results keep the order of accessions
 
     Returns:
 
@@ -186,63 +424,13 @@ def Geninfo(accessions):
 
     """
 
-    def add_all_df(dfdf_new):
-
-
-        dfdf = dfdf_new.drop(["col1"], 1)
-        dfdf = dfdf.transpose()
-        dfdf.columns = list(dfdf_new["col1"])
-        dfdf = dfdf.rename(index={"col2": dfdf["YMDB ID"][0]})
-
-        return dfdf
-
     if type(accessions) != list:
         raise TypeError ("Geninfo takes list as an argument")
 
-    main_url = "http://www.ymdb.ca/compounds/"
-    for i_acc in accessions:
-        # creating the query search url by accessions
-        api_request = main_url + i_acc
-        # get the data in form of tables
-        try:
-            try:
-                tables = pd.read_html(api_request)
-            except:
-                tables =pd.read_html(api_request, header= 0 )
-            #removing row with no data
-            tables0 = tables[0].iloc[:,0:2]
-            #rename the col 
-            tables0.columns = ["col1", "col2"]
-  
-            #take only the general information
-            take_from_tables0 = ["Version","Status","Creation Date","Update Date","YMDB ID","Common Name","Chemical Formula","Average Molecular Weight",
-            "Monoisotopic Molecular Weight","IUPAC Name","Traditional Name","CAS Registry Number",
-            "SMILES","InChI Identifier","InChI Key","Kingdom","Super Class","Class","Sub Class","Direct Parent",
-            "Molecular Framework","Role","State","Cellular Locations","Biospecimen Locations","Tissue Locations",
-            "DrugBank ID","FoodDB ID","Chemspider ID","KEGG Compound ID","ChEBI ID","PubChem Compound"]
-            
-            tables0 = tables0[tables0["col1"].isin(take_from_tables0)]
-            #tables0.reset_index(drop = True, inplace=True)
-            tables0 = add_all_df(tables0)
-            yield tables0
-
-        except:
-            take_from_tables0 = ["Version","Status","Creation Date","Update Date","YMDB ID","Common Name","Chemical Formula","Average Molecular Weight",
-            "Monoisotopic Molecular Weight","IUPAC Name","Traditional Name","CAS Registry Number",
-            "SMILES","InChI Identifier","InChI Key","Kingdom","Super Class","Class","Sub Class","Direct Parent",
-            "Molecular Framework","Role","State","Cellular Locations","Biospecimen Locations","Tissue Locations",
-            "DrugBank ID","FoodDB ID","Chemspider ID","KEGG Compound ID","ChEBI ID","PubChem Compound"]
-            
-            not_found = ["NaN"] * len(take_from_tables0)
-            not_found = dict( zip(take_from_tables0,not_found) )
-            tables0 = pd.DataFrame(data=not_found , index= [0])
-
-            tables0 = tables0.rename(index={0:i_acc })
-
-            yield tables0
-
-
-def ChemQuery(start=100,end=200,search_type="molecular"):
+    for record in records.fetch_all(Record, accessions, concurrency):
+        yield record.Geninfo
+
+def ChemQuery(start=100,end=200,search_type="molecular",concurrency=4):
     """
 
     Search by molecular weight for small molecule metabolites found in or produced by Saccharomyces cerevisiae (also known as Baker’s yeast and Brewer’s yeast) (YMDB)
@@ -256,6 +444,8 @@ def ChemQuery(start=100,end=200,search_type="molecular"):
         search_type: default = "molecular", either by the Molecular weight / Average mass (molecular) or by the Monoisotopic mass (monoisotopic)
 
 
+        concurrency (int): default = 4, number of result pages fetched ahead at the same time
+
     Returns:
 
         Data frame contains the ChemQuery by molecular weight search result of metabolites from YMDB
@@ -294,36 +484,22 @@ def ChemQuery(start=100,end=200,search_type="molecular"):
     old_api_request = main_url + api_request
 
 
-    def find_YMDB(xml):
-        import re
-        xml = str(xml)
-        all_YMDB = (i.end() for i in re.finditer("YMDB",xml))
-        all_YMDB = list( set ( [ f"YMDB{xml[i:i+5]}" for i in all_YMDB if xml[i:i+5].isdigit()  ] ) )
-        return all_YMDB
-
-    page = 0
-    all_hmdb_id = []
-    while True:
-        api_request = old_api_request
-        page = page + 1
-        api_request = f"{api_request}&page={page}"
-        xml = urllib.request.urlopen(api_request).read()
-        final_YMDB = find_YMDB(xml)
-        if len(final_YMDB) != 0:
-            all_hmdb_id = all_hmdb_id + [ i for i in  final_YMDB] 
-        if len(final_YMDB) == 0:
-            break
+    #the next pages are fetched ahead until the first page without IDs
+    def read_page(page):
+        return ids.extract(transport.get(f"{old_api_request}&page={page}"), "YMDB")
+
+    all_hmdb_id = [ i for page_ids in parallel.paginate(read_page, concurrency) for i in page_ids ]
     return Geninfo(all_hmdb_id)
 
 
-def LCMS(masses,mode,adducts,tolerance,tolerance_unit):
+def iLCMS(masses,mode,adducts,tolerance,tolerance_unit):
     """
 
-    Advanced Mass Spectrum search
+    Advanced Mass Spectrum search, yielding the results of each adduct as soon as they are parsed
 
     Args:
 
-        masses (list): a query Masses (Da) maximum 700 query masses per request
+        masses (list): a query Masses (Da) maximum 700 query masses per request with the web backend (no limit with the local backend)
 
         mode (str): Ion Mode (positive, negative, or neutral)
 
@@ -335,7 +511,7 @@ def LCMS(masses,mode,adducts,tolerance,tolerance_unit):
 
     Returns:
 
-        Data frame object contains information retrieved from YMDB about metabolites returned from the Mass Spectrum search
+        A generator object for the Data frame(s) of the Mass Spectrum search, one for each adduct request (one for all with the local backend)
 
     Raises:
 
@@ -350,16 +526,16 @@ def LCMS(masses,mode,adducts,tolerance,tolerance_unit):
         TypeError if argument (tolerance_unit) is not a string from ("Da","ppm")
 
     Example:
-    
-        result = LCMS(masses=[300,400],mode="positive",adducts=["M+H","M+H-H2O"],tolerance=0.5,tolerance_unit="Da")
-        print (result)
-   
+
+        for data in iLCMS(masses=[300,400],mode="positive",adducts=["M+H","M+H-H2O"],tolerance=0.5,tolerance_unit="Da"):
+            print (data)
+
     """
     
     #make sure that masses is fine to go
     if type(masses) != list or len(masses) == 0:
         raise TypeError ("masses argument must be a list of length more than zero")
-    if len(masses) > 700:
+    if len(masses) > 700 and Record.store is None:
         raise TypeError ("maximum 700 query masses per request")
     #make sure that mode is fine to go
     opp_mode = ["positive","negative","neutral"]
@@ -377,6 +553,10 @@ def LCMS(masses,mode,adducts,tolerance,tolerance_unit):
     if type(tolerance_unit) != str or tolerance_unit not in opp_unit:
         raise TypeError ("tolerance_unit argument should be string (Da or ppm)")
 
+    #match the masses against the local compounds when the local backend is set (see set_backend)
+    if Record.store is not None:
+        return iter([Record.store.mass_index().search(masses, mode, adducts, tolerance, tolerance_unit)])
+
     #generate the api url
     main_url= "http://www.ymdb.ca/spectra/ms/search?"
     dict_url= {"utf8":"✓","commit":"Search","database":"HMDB","ms_search_ion_mode":mode,"tolerance":tolerance,"tolerance_units":tolerance_unit}
@@ -387,24 +567,66 @@ def LCMS(masses,mode,adducts,tolerance,tolerance_unit):
 
     api_request = urllib.parse.urlencode(dict_url)
     api_request = main_url + api_request
-    #for adducts
-    all_tables = []
-    for api_adducts in adducts:
-        api_adducts = api_adducts.replace("+","%2B")
-        api_adducts = api_adducts.replace("-","%2D")
-        api_request = f"{api_request}&adduct_type={api_adducts}"
-        tables = pd.read_html(api_request)
-        all_tables = all_tables + tables
+    #one request for each adduct, the tables are yielded as they are parsed
+    def read_adducts():
+        for api_adducts in adducts:
+            api_adducts = api_adducts.replace("+","%2B")
+            api_adducts = api_adducts.replace("-","%2D")
+            for tables in transport.read_html(f"{api_request}&adduct_type={api_adducts}"):
+                yield tables
+
+    return read_adducts()
+
+
+def LCMS(masses,mode,adducts,tolerance,tolerance_unit):
+    """
+
+    Advanced Mass Spectrum search
+
+    Args:
+
+        masses (list): a query Masses (Da) maximum 700 query masses per request with the web backend (no limit with the local backend)
+
+        mode (str): Ion Mode (positive, negative, or neutral)
+
+        adducts (list): Adduct Type (e.g. M+H, M+H-H2O)
+
+        tolerance (int): Molecular Weight Tolerance ± 
+
+        tolerance_unit (str): tolerance unit (Da or ppm)
+
+    Returns:
+
+        Data frame object contains information retrieved from YMDB about metabolites returned from the Mass Spectrum search
+
+    Raises:
+
+        TypeError if argument (masses) is not a list of length more than zero
+
+        TypeError if argument (mode) is not a string from ("positive","negative","neutral")
+
+        TypeError if argument (adducts) is not a list
+
+        TypeError if argument (tolerance) is not a number
+
+        TypeError if argument (tolerance_unit) is not a string from ("Da","ppm")
+
+    Example:
     
-    all_tables_all= pd.DataFrame()
-    for i_range in range ( len(all_tables) ):
+        result = LCMS(masses=[300,400],mode="positive",adducts=["M+H","M+H-H2O"],tolerance=0.5,tolerance_unit="Da")
+        print (result)
+   
+    """
 
-        all_tables_all = all_tables_all.append(all_tables[i_range], ignore_index=True, sort = False) 
+    all_tables = list(iLCMS(masses,mode,adducts,tolerance,tolerance_unit))
+    if len(all_tables) == 0:
+        return pd.DataFrame()
 
+    all_tables_all = pd.concat(all_tables, ignore_index=True, sort = False)
     all_tables_all.sort_values(by=['Adduct','Monoisotopic Mass'],ascending=True,inplace=True)
-    
+
     return all_tables_all
-    
+
 
 def LCMSMS(p_ion_mass,p_ion_tolerance,parent_ion_mass_tolerance_units,ion_mode,cid,peaks,mz_tolerance,mz_tolerance_units,predicted="False"):
     """
@@ -469,12 +691,32 @@ def LCMSMS(p_ion_mass,p_ion_tolerance,parent_ion_mass_tolerance_units,ion_mode,c
     api_request = f"{api_request}&peaks={peaks}"
     api_request = main_url + api_request
 
-    tables = pd.read_html(api_request)
+    tables = transport.read_html(api_request)
     tables = tables[0].drop(["Spectral Display Tools","Structure"],axis=1)
 
     return tables
 
 
+def _txtsearch_url(query):
+
+    if type(query) != str:
+        raise TypeError ("query argument should be a list")
+
+    main_url = "http://www.ymdb.ca/unearth/q?"
+    dict_url = {"utf8":"✓","query":query,"searcher":"compounds"}
+
+    api_request = urllib.parse.urlencode(dict_url)
+    api_request = main_url + api_request
+
+    return api_request
+
+
+def _find_YMDB(xml):
+    if b"returned no results" in xml:
+        return False
+    return ids.extract(xml, "YMDB")
+
+
 def txtsearch(query):
     """
 
@@ -498,31 +740,26 @@ def txtsearch(query):
         print (data)
 
     """
-    if type(query) != str:
-        raise TypeError ("query argument should be a list")
+    api_request = _txtsearch_url(query)
+    xml = transport.get(api_request)
 
-    main_url = "http://www.ymdb.ca/unearth/q?"
-    dict_url = {"utf8":"✓","query":query,"searcher":"compounds"}
-
-    api_request = urllib.parse.urlencode(dict_url)
-    api_request = main_url + api_request
-    xml = urllib.request.urlopen(api_request).read()
-  
-    def find_YMDB(xml_str):
-        import re
-        xml_str = str(xml_str)
-        if "returned no results" not in xml_str:
-            end_of_lmdb = (lmdb.end() for lmdb in re.finditer("YMDB",xml_str))
-            final_LMDB = list( set( [ f"YMDB{xml_str[end:end+5]}" for end in end_of_lmdb if xml_str[end:end+5].isdigit()] ) )
-            return final_LMDB
-        elif "returned no results" in xml_str:
-            return False
-
-    xml_parse =  find_YMDB(xml)
+    xml_parse =  _find_YMDB(xml)
 
     return xml_parse
 
-def ExpProp(accessions):
+
+def _ExpProp(record):
+
+    try:
+        tables = record.fetch()
+        tables = tables[1]
+    except Exception:
+        tables = pd.DataFrame(data = {"Property":["NA"], "Value":["NA"], "Reference":["NA"]    })
+
+    return records.rename_index(tables, record.accession)
+
+
+def ExpProp(accessions, concurrency=1):
 
     """
 
@@ -530,7 +767,9 @@ def ExpProp(accessions):
 
     Args:
 
-        accessions (list): list of YMDB ID
+        accessions (list): list of YMDB ID and/or Record
+
+        concurrency (int): default = 1, number of pages downloaded at the same time, the results keep the order of accessions
 
     Returns:
 
@@ -551,26 +790,22 @@ def ExpProp(accessions):
     if type(accessions) != list:
         raise TypeError ("ExpProp takes list as an argument")
 
-    main_url = "http://www.ymdb.ca/compounds/"
-    for i_acc in accessions:
-        # creating the query search url by accessions
-        api_request = main_url + i_acc
-        try:
-            tables = pd.read_html(api_request)
-            tables = tables[1]
-        except:
-            tables = pd.DataFrame(data = {"Property":["NA"], "Value":["NA"], "Reference":["NA"]    })
-
-        # to make the row.names =  to the id 
-        index_name = range(0,len(tables))
-        index_value = f"{i_acc}," *len(index_name)
-        index_value = index_value.split(",")
-        dictionary = dict(zip(index_name, index_value))
-        tables = tables.rename(index= dictionary )
-            
-        yield tables
-   
-def PredProp(accessions):
+    for record in records.fetch_all(Record, accessions, concurrency):
+        yield record.ExpProp
+
+
+def _PredProp(record):
+
+    try:
+        tables = record.fetch()
+        tables = tables[2]
+    except Exception:
+        tables = pd.DataFrame(data = {"Property":["NA"],"Value":["NA"],"Source":["NA"]})
+
+    return records.rename_index(tables, record.accession)
+
+
+def PredProp(accessions, concurrency=1):
 
     """
 
@@ -578,7 +813,9 @@ def PredProp(accessions):
 
     Args:
 
-        accessions (list): list of YMDB ID
+        accessions (list): list of YMDB ID and/or Record
+
+        concurrency (int): default = 1, number of pages downloaded at the same time, the results keep the order of accessions
 
     Returns:
 
@@ -599,21 +836,167 @@ def PredProp(accessions):
     if type(accessions) != list:
         raise TypeError ("PredProp takes list as an argument")
 
-    main_url = "http://www.ymdb.ca/compounds/"
-    for i_acc in accessions:
-        # creating the query search url by accessions
-        api_request = main_url + i_acc
-        try:
-            tables = pd.read_html(api_request)
-            tables = tables[2]
-        except:
-            tables = pd.DataFrame(data = {"Property":["NA"],"Value":["NA"],"Source":["NA"]})
-
-        # to make the row.names =  to the id 
-        index_name = range(0,len(tables))
-        index_value = f"{i_acc}," *len(index_name)
-        index_value = index_value.split(",")
-        dictionary = dict(zip(index_name, index_value))
-        tables = tables.rename(index= dictionary )
-
-        yield tables
+    for record in records.fetch_all(Record, accessions, concurrency):
+        yield record.PredProp
+
+
+def afetch_all(accessions, concurrency=8):
+    """
+
+    Async counterpart of fetch_all, the YMDB pages are downloaded without blocking the event loop
+
+    Args:
+
+        accessions (list): list of YMDB ID
+
+        concurrency (int): default = 8, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        An async generator object for Record(s), one for each YMDB ID
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        async for record in afetch_all(["YMDB00001","YMDB00002"]):
+            print (record.Geninfo)
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("afetch_all takes list as an argument")
+
+    return records.afetch_all(Record, accessions, concurrency)
+
+
+async def aGeninfo(accessions, concurrency=8):
+    """
+
+    Async counterpart of Geninfo, the YMDB pages are downloaded without blocking the event loop
+
+    Args:
+
+        accessions (list): list of YMDB ID and/or Record
+
+        concurrency (int): default = 8, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        An async generator object for Data frame(s), the same as Geninfo
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        async for i_data in aGeninfo(["YMDB00001","YMDB00002"]):
+            print (i_data.head())
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("aGeninfo takes list as an argument")
+
+    async for record in records.afetch_all(Record, accessions, concurrency, ["Geninfo"]):
+        yield record.Geninfo
+
+
+async def aExpProp(accessions, concurrency=8):
+    """
+
+    Async counterpart of ExpProp, the YMDB pages are downloaded without blocking the event loop
+
+    Args:
+
+        accessions (list): list of YMDB ID and/or Record
+
+        concurrency (int): default = 8, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        An async generator object for Data frame(s), the same as ExpProp
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        async for i_data in aExpProp(["YMDB00001","YMDB00002"]):
+            print (i_data.head())
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("aExpProp takes list as an argument")
+
+    async for record in records.afetch_all(Record, accessions, concurrency, ["ExpProp"]):
+        yield record.ExpProp
+
+
+async def aPredProp(accessions, concurrency=8):
+    """
+
+    Async counterpart of PredProp, the YMDB pages are downloaded without blocking the event loop
+
+    Args:
+
+        accessions (list): list of YMDB ID and/or Record
+
+        concurrency (int): default = 8, number of pages downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        An async generator object for Data frame(s), the same as PredProp
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example:
+
+        async for i_data in aPredProp(["YMDB00001","YMDB00002"]):
+            print (i_data.head())
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("aPredProp takes list as an argument")
+
+    async for record in records.afetch_all(Record, accessions, concurrency, ["PredProp"]):
+        yield record.PredProp
+
+
+async def atxtsearch(query):
+    """
+
+    Async counterpart of txtsearch, the search page is downloaded without blocking the event loop.
+
+    Searching using a powerful search engine based on the Lucene query language.
+
+    Args:
+
+        query (str): a query string
+
+    Returns:
+
+        A generator object for Data frame(s) contains information retrieved from LMDB about metabolites
+
+    Raises:
+
+        TypeError if argument (query) is not a string
+
+    Example:
+    
+        data = await atxtsearch('"1-Methylhistidine"')
+        print (data)
+
+    """
+
+    xml = await aio.get(_txtsearch_url(query))
+
+    return _find_YMDB(xml)
@@ -0,0 +1,426 @@
+import asyncio
+import http.client
+import io
+import ssl
+import time
+import urllib.parse
+import weakref
+
+from . import cache, throttle, transport
+
+
+# per_host is the number of requests kept in flight to one host at the same time,
+# the timeouts and the user agent are shared with transport.settings
+settings = {
+    "per_host": 8,
+}
+
+_states = weakref.WeakKeyDictionary()
+
+
+def configure(**kwargs):
+    """
+
+    Change the settings of the asyncio API
+
+    Args:
+
+        per_host (int): number of requests kept in flight to one host at the same time (default = 8)
+
+    Raises:
+
+        TypeError if an argument is not one of the settings above
+
+    Note:
+
+        The timeouts, the pool size and the user agent are set with transport.configure and are shared by both APIs
+
+    Example:
+
+        configure(per_host=16)
+
+    """
+
+    for key in kwargs:
+        if key not in settings:
+            raise TypeError (f"configure got an unexpected argument ({key})")
+    settings.update(kwargs)
+
+
+def _state():
+    # connections and limits belong to the event loop that created them
+    loop = asyncio.get_running_loop()
+    if loop not in _states:
+        _states[loop] = {"pools": {}, "limits": {}}
+    return _states[loop]
+
+
+def _limit(key):
+    limits = _state()["limits"]
+    if key not in limits:
+        limits[key] = asyncio.Semaphore(settings["per_host"])
+    return limits[key]
+
+
+async def _acquire(key):
+    pool = _state()["pools"].get(key)
+    while pool:
+        reader, writer = pool.pop()
+        if not writer.is_closing() and not reader.at_eof():
+            return reader, writer, True
+        writer.close()
+
+    scheme, host, port, proxy = key
+    if proxy is not None:
+        reader, writer = await asyncio.wait_for(_open_proxy(scheme, host, port, proxy), transport.settings["connect_timeout"])
+        return reader, writer, False
+    context = ssl.create_default_context() if scheme == "https" else None
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(host, port, ssl=context, server_hostname=host if context else None),
+        transport.settings["connect_timeout"])
+    return reader, writer, False
+
+
+async def _open_proxy(scheme, host, port, proxy):
+    # like transport: plain http requests go to the proxy, https goes through a CONNECT tunnel
+    proxy_host, proxy_port, proxy_headers = transport._proxy_address(proxy)
+    proxy_context = ssl.create_default_context() if urllib.parse.urlsplit(proxy).scheme == "https" else None
+    # the writer is made once the tunnel is up: loop.start_tls works from Python 3.7, StreamWriter.start_tls needs 3.11
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    protocol = asyncio.StreamReaderProtocol(reader)
+    connection, _ = await loop.create_connection(lambda: protocol, proxy_host, proxy_port, ssl=proxy_context,
+        server_hostname=proxy_host if proxy_context else None)
+    if scheme != "https":
+        return reader, asyncio.StreamWriter(connection, protocol, reader, loop)
+
+    try:
+        connection.write((f"CONNECT {host}:{port} HTTP/1.1\r\nHost: {host}:{port}\r\n"
+            + "".join(f"{name}: {value}\r\n" for name, value in proxy_headers.items())
+            + "\r\n").encode("latin-1"))
+        status, reason, _, _, _ = await _read_response(reader, tunnel=True)
+        if status != 200:
+            raise OSError(f"Tunnel connection failed: {status} {reason}")
+        connection = await loop.start_tls(connection, protocol, ssl.create_default_context(), server_hostname=host)
+    except BaseException:
+        connection.close()
+        raise
+    return reader, asyncio.StreamWriter(connection, protocol, reader, loop)
+
+
+def _release(key, reader, writer):
+    pool = _state()["pools"].setdefault(key, [])
+    if len(pool) < transport.settings["pool_size"]:
+        pool.append((reader, writer))
+    else:
+        writer.close()
+
+
+async def _read_body(reader, headers, status):
+    if status in (204, 304) or 100 <= status < 200:
+        return b"", False
+    if "chunked" in headers.get("Transfer-Encoding", "").lower():
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b";")[0].strip(), 16)
+            if size == 0:
+                # trailers end with an empty line
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                return b"".join(chunks), False
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+    if headers.get("Content-Length") is not None:
+        return await reader.readexactly(int(headers["Content-Length"])), False
+    # no length, the body ends when the server closes the connection
+    return await reader.read(), True
+
+
+async def _read_response(reader, tunnel=False):
+    status_line = await reader.readline()
+    if not status_line:
+        raise http.client.RemoteDisconnected("Remote end closed connection without response")
+    version, status, *reason = status_line.decode("iso-8859-1").split(None, 2)
+    status = int(status)
+
+    raw_headers = b""
+    while True:
+        line = await reader.readline()
+        raw_headers += line
+        if line in (b"\r\n", b"\n", b""):
+            break
+    headers = http.client.parse_headers(io.BytesIO(raw_headers))
+
+    if tunnel and status == 200:
+        # the answer to CONNECT has no body, the tunnel starts after the headers
+        return status, (reason[0].strip() if reason else ""), headers, b"", False
+    body, will_close = await _read_body(reader, headers, status)
+    if version == "HTTP/1.0" or headers.get("Connection", "").lower() == "close":
+        will_close = True
+    return status, (reason[0].strip() if reason else ""), headers, body, will_close
+
+
+async def _request(url, extra_headers=None):
+    parsed = urllib.parse.urlsplit(url)
+    if parsed.scheme not in ("http", "https"):
+        raise ValueError (f"unsupported url ({url})")
+
+    path = parsed.path or "/"
+    if parsed.query:
+        path = f"{path}?{parsed.query}"
+    key = transport._pool_key(parsed)
+    path, proxy_headers = transport._proxy_request(parsed, path, key)
+    request = (f"GET {path} HTTP/1.1\r\n"
+        f"Host: {parsed.netloc}\r\n"
+        "Accept-Encoding: gzip, deflate\r\n"
+        "Connection: keep-alive\r\n"
+        f"User-Agent: {transport.settings['user_agent']}\r\n"
+        + "".join(f"{name}: {value}\r\n" for name, value in {**proxy_headers, **(extra_headers or {})}.items())
+        + "\r\n").encode("latin-1")
+
+    limiter = throttle.host(parsed.hostname)
+    retries = transport.settings["retries"]
+    for attempt in range(retries + 1):
+        wait = limiter.breaker.allow()
+        if wait is not None:
+            raise transport.CircuitOpen(url, wait)
+        try:
+            status, reason, headers, body = await _attempt(limiter, key, request)
+        except (OSError, http.client.HTTPException, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            limiter.breaker.failure()
+            if attempt == retries:
+                raise
+            await asyncio.sleep(transport.backoff(attempt))
+            continue
+
+        # a 429 answer is from a host that works, only slower than asked
+        if status >= 500:
+            limiter.breaker.failure()
+        else:
+            limiter.breaker.success()
+        if status in transport.RETRY_STATUSES and attempt < retries:
+            await asyncio.sleep(transport.backoff(attempt))
+            continue
+        return status, reason, headers, body
+
+
+async def _attempt(limiter, key, request):
+    delay = limiter.delay()
+    if delay > 0:
+        await asyncio.sleep(delay)
+    async with _limit(key):
+        await limiter.controller.aacquire()
+        started, status, headers = time.monotonic(), None, None
+        try:
+            status, reason, headers, body = await _send(key, request)
+            return status, reason, headers, body
+        finally:
+            limiter.controller.release(status, time.monotonic() - started)
+            if status in throttle.THROTTLED:
+                limiter.throttled(throttle.retry_after(headers))
+
+
+async def _send(key, request):
+    while True:
+        reader, writer, reused = await _acquire(key)
+        try:
+            writer.write(request)
+            await writer.drain()
+            status, reason, headers, body, will_close = await asyncio.wait_for(
+                _read_response(reader), transport.settings["read_timeout"])
+        except (http.client.RemoteDisconnected, asyncio.IncompleteReadError, ConnectionResetError, BrokenPipeError):
+            writer.close()
+            # the server closed an idle keep-alive connection, open a new one
+            if reused:
+                continue
+            raise
+        except BaseException:
+            writer.close()
+            raise
+
+        if will_close:
+            writer.close()
+        else:
+            _release(key, reader, writer)
+
+        return status, reason, headers, transport._decode(body, headers.get("Content-Encoding"))
+
+
+async def fetch(url):
+    """
+
+    Download a url without blocking the event loop, following the redirects
+
+    Args:
+
+        url (str): the url to download
+
+    Returns:
+
+        tuple of (headers, body) of the final answer, the body is already decompressed
+
+    Raises:
+
+        transport.NotFound, transport.HTTPError or transport.CircuitOpen like transport.fetch
+
+    Note:
+
+        The failed requests are retried like with transport.fetch.
+        The cache enabled with cache.enable is shared with transport.fetch
+
+    """
+    entry = cache.lookup(url)
+    if entry is not None and entry.is_fresh(cache.ttl_for(url)):
+        return entry.headers, entry.body
+
+    requested, validators = (entry.url, entry.validators()) if entry is not None else (url, {})
+    for _ in range(transport.settings["max_redirects"] + 1):
+        status, reason, headers, body = await _request(requested, validators)
+        if status in (301, 302, 303, 307, 308) and headers.get("Location"):
+            requested = urllib.parse.urljoin(requested, headers["Location"])
+            continue
+        if status == 304 and entry is not None:
+            cache.touch(url)
+            return entry.headers, entry.body
+        if status in transport.NOT_FOUND_STATUSES:
+            raise transport.NotFound(requested, status, reason)
+        if status >= 400:
+            raise transport.HTTPError(requested, status, reason)
+        cache.store(url, requested, headers, body)
+        return headers, body
+
+    raise transport.HTTPError(requested, status, "too many redirects")
+
+
+async def get(url):
+    """
+
+    Download a url without blocking the event loop
+
+    Args:
+
+        url (str): the url to download
+
+    Returns:
+
+        the body of the answer (bytes), already decompressed
+
+    Example:
+
+        page = await get("http://www.hmdb.ca/metabolites/HMDB0000001")
+
+    """
+    return (await fetch(url))[1]
+
+
+async def text(url):
+    """
+
+    Download a url without blocking the event loop and decode it to a string (default utf-8)
+
+    Args:
+
+        url (str): the url to download
+
+    Returns:
+
+        str of the page
+
+    """
+    headers, body = await fetch(url)
+    charset = headers.get_content_charset() or "utf-8"
+    return body.decode(charset, errors="replace")
+
+
+async def run(function, *args):
+    # parsing is CPU work, keep it off the event loop
+    return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+
+async def _requesting(concurrency, coroutine):
+    # every task has its own copy of the context, so the value is only seen by the requests of this one
+    throttle.requested.set(concurrency)
+    return await coroutine
+
+
+async def imap(function, items, concurrency=8):
+    """
+
+    Await a coroutine function on each item with at most concurrency of them running, and yield the results in the order of the items
+
+    Args:
+
+        function (coroutine function): the function to await on each item
+
+        items (iterable): the items, consumed lazily
+
+        concurrency (int): default = 8, number of items processed at the same time
+
+    Returns:
+
+        An async generator object for the results, in the same order as the items
+
+    Raises:
+
+        TypeError if argument (concurrency) is not an integer more than zero
+
+    """
+
+    if type(concurrency) != int or concurrency < 1:
+        raise TypeError ("concurrency argument must be an integer more than zero")
+
+    window = []
+    try:
+        for item in items:
+            # the hosts see the concurrency asked for (see throttle.Controller.seed)
+            window.append(asyncio.ensure_future(_requesting(concurrency, function(item))))
+            # sliding window, wait for the oldest item before starting more
+            if len(window) >= concurrency:
+                yield await window.pop(0)
+        while window:
+            yield await window.pop(0)
+    finally:
+        for task in window:
+            task.cancel()
+
+
+async def paginate(function, concurrency=4, is_empty=lambda result: len(result) == 0):
+    """
+
+    Async counterpart of parallel.paginate, await the pages 1, 2, 3, ... with the next pages fetched ahead,
+    and yield the result of each page in order until the first empty page
+
+    Args:
+
+        function (coroutine function): takes the page number and returns the result of that page
+
+        concurrency (int): default = 4, number of pages fetched at the same time
+
+        is_empty (callable): default = len(result) == 0, tells if a page result marks the end
+
+    Returns:
+
+        An async generator object for the results of the pages before the first empty one
+
+    Raises:
+
+        TypeError if argument (concurrency) is not an integer more than zero
+
+    """
+
+    if type(concurrency) != int or concurrency < 1:
+        raise TypeError ("concurrency argument must be an integer more than zero")
+
+    window = [asyncio.ensure_future(_requesting(concurrency, function(page))) for page in range(1, concurrency + 1)]
+    next_page = concurrency + 1
+    try:
+        while True:
+            result = await window.pop(0)
+            if is_empty(result):
+                return
+            yield result
+            window.append(asyncio.ensure_future(_requesting(concurrency, function(next_page))))
+            next_page += 1
+    finally:
+        for task in window:
+            task.cancel()
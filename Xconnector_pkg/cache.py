@@ -0,0 +1,228 @@
+import http.client
+import io
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+import zlib
+
+
+# the databases served by each host, used to give every database its own time to live
+HOSTS = {
+    "HMDB": ["www.hmdb.ca", "hmdb.ca"],
+    "LMDB": ["lmdb.ca", "www.lmdb.ca"],
+    "YMDB": ["www.ymdb.ca", "ymdb.ca"],
+    "T3DB": ["www.t3db.ca", "t3db.ca"],
+    "ReSpect": ["spectra.psc.riken.jp"],
+}
+
+# the headers kept with a cached page, enough to decode it and to revalidate it
+_KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+settings = {
+    "path": None,
+    "ttl": 7 * 24 * 3600,
+    "ttls": {},
+}
+
+_local = threading.local()
+
+
+class Entry:
+
+    """
+
+    One cached answer
+
+    Args:
+
+        url (str): the url the body was finally downloaded from (after the redirects)
+
+        headers (http.client.HTTPMessage): the kept headers (Content-Type, ETag and Last-Modified)
+
+        body (bytes): the decompressed body
+
+        fetched_at (float): time (seconds since the epoch) of the last download or revalidation
+
+    """
+
+    def __init__(self, url, headers, body, fetched_at):
+        self.url = url
+        self.headers = headers
+        self.body = body
+        self.fetched_at = fetched_at
+
+    def is_fresh(self, ttl):
+        return time.time() - self.fetched_at < ttl
+
+    def validators(self):
+        # headers for a conditional request, the server answers 304 if the page did not change
+        headers = {}
+        if self.headers.get("ETag"):
+            headers["If-None-Match"] = self.headers["ETag"]
+        if self.headers.get("Last-Modified"):
+            headers["If-Modified-Since"] = self.headers["Last-Modified"]
+        return headers
+
+
+def enable(directory="xconnector_cache", ttl=7 * 24 * 3600, ttls=None):
+    """
+
+    Keep every downloaded page in a cache directory, so that the next request for the same url is served from the disk
+
+    Args:
+
+        directory (str): default = "xconnector_cache", the directory of the cache (created if missing)
+
+        ttl (float): default = one week, seconds a cached page is used without asking the server again
+
+        ttls (dict): time to live of some databases, overriding ttl, e.g. {"HMDB": 30 * 24 * 3600, "ReSpect": 3600}.
+        The keys are database names (HMDB, LMDB, YMDB, T3DB, ReSpect) or host names
+
+    Raises:
+
+        TypeError if argument (ttls) is not a dict or has an unknown database
+
+    Note:
+
+        The pages are stored compressed in an SQLite file keyed by the normalized url.
+        When a page is older than its time to live it is revalidated with ETag/Last-Modified, and only downloaded again if it changed.
+
+    Example:
+
+        enable("xconnector_cache", ttls={"HMDB": 30 * 24 * 3600})
+
+    """
+
+    if ttls is None:
+        ttls = {}
+    if type(ttls) != dict:
+        raise TypeError ("ttls argument should be a dict")
+
+    host_ttls = {}
+    for name, value in ttls.items():
+        if name in HOSTS:
+            for host in HOSTS[name]:
+                host_ttls[host] = value
+        elif "." in name:
+            host_ttls[name.lower()] = value
+        else:
+            raise TypeError (f"ttls keys should be host names or from {list(HOSTS)}")
+
+    os.makedirs(directory, exist_ok=True)
+    settings["path"] = os.path.join(directory, "responses.sqlite")
+    settings["ttl"] = ttl
+    settings["ttls"] = host_ttls
+    _connection()
+
+
+def disable():
+    """
+
+    Stop using the cache (the files are kept on the disk)
+
+    """
+    settings["path"] = None
+
+
+def is_enabled():
+    return settings["path"] is not None
+
+
+def clear():
+    """
+
+    Remove all the pages from the cache
+
+    """
+    if is_enabled():
+        connection = _connection()
+        with connection:
+            connection.execute("DELETE FROM responses")
+
+
+def normalize(url):
+    """
+
+    Normalize a url to be used as a cache key (lower case scheme and host, no default port, no fragment, sorted query)
+
+    """
+    parsed = urllib.parse.urlsplit(url)
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or "").lower()
+    if parsed.port and parsed.port != {"http": 80, "https": 443}.get(scheme):
+        host = f"{host}:{parsed.port}"
+    query = urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(parsed.query, keep_blank_values=True)))
+    return urllib.parse.urlunsplit((scheme, host, parsed.path or "/", query, ""))
+
+
+def ttl_for(url):
+    host = (urllib.parse.urlsplit(url).hostname or "").lower()
+    return settings["ttls"].get(host, settings["ttl"])
+
+
+def _connection():
+    # one connection per thread and per cache file
+    path = settings["path"]
+    if getattr(_local, "path", None) != path:
+        connection = sqlite3.connect(path, timeout=60)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("""CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            headers TEXT NOT NULL,
+            body BLOB NOT NULL,
+            fetched_at REAL NOT NULL)""")
+        _local.connection = connection
+        _local.path = path
+    return _local.connection
+
+
+def lookup(url):
+    """
+
+    Get the cached answer of a url
+
+    Returns:
+
+        Entry, or None if the cache is disabled or the url was never cached
+
+    """
+    if not is_enabled():
+        return None
+    row = _connection().execute(
+        "SELECT url, headers, body, fetched_at FROM responses WHERE key = ?", (normalize(url),)).fetchone()
+    if row is None:
+        return None
+    final_url, headers, body, fetched_at = row
+    headers = http.client.parse_headers(io.BytesIO(headers.encode("latin-1")))
+    return Entry(final_url, headers, zlib.decompress(body), fetched_at)
+
+
+def store(url, final_url, headers, body):
+    """
+
+    Keep the answer of a url in the cache (nothing is done if the cache is disabled)
+
+    """
+    if not is_enabled():
+        return
+    kept = "".join(f"{name}: {headers[name]}\r\n" for name in _KEPT_HEADERS if headers.get(name)) + "\r\n"
+    connection = _connection()
+    with connection:
+        connection.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+            (normalize(url), final_url, kept, zlib.compress(body, 6), time.time()))
+
+
+def touch(url):
+    """
+
+    Mark a cached answer as fresh again, after the server confirmed that it did not change
+
+    """
+    if not is_enabled():
+        return
+    connection = _connection()
+    with connection:
+        connection.execute("UPDATE responses SET fetched_at = ? WHERE key = ?", (time.time(), normalize(url)))
@@ -0,0 +1,301 @@
+import os
+
+from .lazy import pd
+
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+
+def _arrow():
+    # pyarrow is only needed to export, it is not a dependency of the rest of the package
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError ("exporting to Parquet or Arrow needs pyarrow, install it with: pip install pyarrow") from None
+    return pyarrow
+
+
+def _unique(columns):
+    # the tables of the pages may repeat a column name, the files can not
+    seen = {}
+    names = []
+    for column in columns:
+        name = str(column)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}_{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _as_str(series):
+    # keep the missing values missing, write everything else as text
+    return series.astype(str).astype(object).where(series.notna(), None)
+
+
+class Writer:
+
+    """
+
+    Write data frames to one Parquet or Arrow IPC file as they come, in row groups of bounded size
+
+    Args:
+
+        path (str): path of the file
+
+        format (str): default = "parquet", "parquet" or "arrow" (Arrow IPC file, e.g. for pyarrow.ipc.open_file or pandas.read_feather)
+
+        rows_per_group (int): default = 5000, number of rows kept in memory before they are written as one row group
+
+        as_str (bool): default = None, store every column as text (True), keep the types of the first rows (False),
+                       or None: keep the types only if all the columns of the first rows are numbers (e.g. peak lists), else store text
+
+    Raises:
+
+        ImportError if pyarrow is not installed
+
+        ValueError if argument (format) is not parquet or arrow
+
+    Note:
+
+        The schema is fixed by the first rows written: the index becomes the first column, a column missing from later
+        data frames is written as missing values, and a column they add is left out and counted in the dropped attribute.
+        Storing text (the default for the pages) keeps one schema however the pages differ, e.g. "1.2" and "< 0.1".
+
+    Example:
+
+        with Writer("geninfo.parquet") as writer:
+            for table in HMDB.Geninfo(accessions, concurrency=8):
+                writer.write(table)
+
+    """
+
+    def __init__(self, path, format="parquet", rows_per_group=5000, as_str=None):
+
+        if format not in FORMATS:
+            raise ValueError (f"format argument should be a string from {list(FORMATS)}")
+        if type(rows_per_group) != int or rows_per_group < 1:
+            raise TypeError ("rows_per_group argument must be an integer more than zero")
+
+        self._pa = _arrow()
+        self.path = path
+        self.format = format
+        self.rows_per_group = rows_per_group
+        self.as_str = as_str
+        self.schema = None
+        self.columns = None
+        self.rows = 0
+        self.dropped = {}
+        self._frames = []
+        self._buffered = 0
+        self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return f"Writer({self.path!r}, {self.rows} rows)"
+
+    def write(self, frame):
+        """
+
+        Add the rows of a data frame, they are written once rows_per_group rows are waiting
+
+        Args:
+
+            frame (DataFrame): the rows, e.g. one data frame yielded by Geninfo
+
+        """
+        if len(frame) == 0:
+            return
+        frame = frame.reset_index()
+        frame.columns = _unique(frame.columns)
+        self._frames.append(frame)
+        self._buffered += len(frame)
+        if self._buffered >= self.rows_per_group:
+            self.flush()
+
+    def _fix_schema(self, frame):
+        pa = self._pa
+        as_str = self.as_str
+        if as_str is None:
+            as_str = not all(pd.api.types.is_numeric_dtype(dtype) for dtype in frame.dtypes.iloc[1:])
+        fields = []
+        for column in frame.columns:
+            if as_str or not pd.api.types.is_numeric_dtype(frame[column].dtype):
+                fields.append(pa.field(column, pa.string()))
+            else:
+                fields.append(pa.field(column, pa.from_numpy_dtype(frame[column].dtype)))
+        self.schema = pa.schema(fields)
+        self.columns = list(frame.columns)
+
+    def _open(self):
+        pa = self._pa
+        if self.format == "parquet":
+            self._writer = pa.parquet.ParquetWriter(self.path, self.schema)
+        else:
+            self._writer = pa.ipc.new_file(self.path, self.schema)
+
+    def flush(self):
+        """
+
+        Write the waiting rows as one row group
+
+        """
+        if not self._frames:
+            return
+        frame = pd.concat(self._frames, ignore_index=True, sort=False)
+        self._frames = []
+        self._buffered = 0
+
+        if self.schema is None:
+            self._fix_schema(frame)
+            self._open()
+
+        for column in frame.columns:
+            if column not in self.columns:
+                self.dropped[column] = self.dropped.get(column, 0) + len(frame)
+        frame = frame.reindex(columns=self.columns)
+        for field in self.schema:
+            if field.type == self._pa.string():
+                frame[field.name] = _as_str(frame[field.name])
+
+        try:
+            table = self._pa.Table.from_pandas(frame, schema=self.schema, preserve_index=False)
+        except (self._pa.ArrowInvalid, self._pa.ArrowTypeError) as error:
+            raise TypeError (f"the rows do not fit the schema of {self.path} ({error}), write them with as_str=True") from None
+        self._writer.write_table(table)
+        self.rows += len(frame)
+
+    def close(self):
+        """
+
+        Write the waiting rows and close the file (nothing is written if no row was added)
+
+        """
+        self.flush()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def _paths(path, format, count, sections):
+    # one file per data frame of the yielded tuples: <path>_<section><extension>
+    stem, extension = os.path.splitext(path)
+    extension = extension or FORMATS[format]
+    if sections is None:
+        sections = [str(i) for i in range(count)]
+    if len(sections) != count:
+        raise ValueError (f"the results have {count} data frames each, {len(sections)} section names given")
+    return [f"{stem}_{section}{extension}" for section in sections]
+
+
+class _Sink:
+
+    # the writers of the results, made when the first result shows if they are data frames or tuples
+
+    def __init__(self, path, format, rows_per_group, as_str, sections):
+        self.arguments = (path, format, rows_per_group, as_str, sections)
+        self.writers = None
+
+    def write(self, result):
+        path, format, rows_per_group, as_str, sections = self.arguments
+        frames = result if isinstance(result, tuple) else (result,)
+        if self.writers is None:
+            paths = _paths(path, format, len(frames), sections) if isinstance(result, tuple) else [path]
+            self.writers = [Writer(each, format, rows_per_group, as_str) for each in paths]
+        for writer, frame in zip(self.writers, frames):
+            writer.write(frame)
+
+    def close(self):
+        for writer in self.writers or []:
+            writer.close()
+        return {writer.path: writer.rows for writer in self.writers or []}
+
+
+def write(results, path, format="parquet", rows_per_group=5000, as_str=None, sections=None):
+    """
+
+    Write the data frames of a generator (e.g. HMDB.Geninfo, respectDB.AccData) to Parquet or Arrow IPC file(s) as they are downloaded
+
+    Args:
+
+        results (iterable): the data frames, or tuples of data frames (e.g. the data and the peak data of AccData)
+
+        path (str): path of the file, for tuples the path of section i is <path stem>_<section><extension>
+
+        format (str): default = "parquet", "parquet" or "arrow"
+
+        rows_per_group (int): default = 5000, number of rows kept in memory before they are written
+
+        as_str (bool): default = None, see Writer
+
+        sections (list): default = None, names of the data frames of the tuples (their position if None)
+
+    Returns:
+
+        dict of path: number of rows written
+
+    Raises:
+
+        ImportError if pyarrow is not installed
+
+        ValueError if argument (format) is not parquet or arrow, or if sections does not match the tuples
+
+    Note:
+
+        Only rows_per_group rows are kept in memory, whatever the number of accessions, and the rows already written stay
+        readable if the crawl stops (Parquet files are readable only once closed, the file is closed even on error).
+
+    Example:
+
+        write(HMDB.Geninfo(accessions, concurrency=8), "geninfo.parquet")
+        write(respectDB.AccData(accessions), "respect.parquet", sections=["data", "peaks"])
+        table = pandas.read_parquet("respect_peaks.parquet")
+
+    """
+
+    _arrow()
+    sink = _Sink(path, format, rows_per_group, as_str, sections)
+    try:
+        for result in results:
+            sink.write(result)
+    finally:
+        rows = sink.close()
+    return rows
+
+
+async def awrite(results, path, format="parquet", rows_per_group=5000, as_str=None, sections=None):
+    """
+
+    Async counterpart of write, for the async generators (e.g. HMDB.aGeninfo)
+
+    Args:
+
+        the same as write, results is an async iterable
+
+    Returns:
+
+        dict of path: number of rows written
+
+    Example:
+
+        await awrite(HMDB.aGeninfo(accessions), "geninfo.arrow", format="arrow")
+
+    """
+
+    _arrow()
+    sink = _Sink(path, format, rows_per_group, as_str, sections)
+    try:
+        async for result in results:
+            sink.write(result)
+    finally:
+        rows = sink.close()
+    return rows
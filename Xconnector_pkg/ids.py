@@ -0,0 +1,44 @@
+import re
+
+
+# the accession IDs of each database as they are written in the pages, matched on the raw bytes
+PATTERNS = {
+    "HMDB": re.compile(rb"HMDB\d{7}"),
+    "LMDB": re.compile(rb"LMDB\d{5}"),
+    "YMDB": re.compile(rb"YMDB\d{5}"),
+    "T3DB": re.compile(rb"T3D\d{4}"),
+    # the ReSpect accessions are taken from the links to their records
+    "ReSpect": re.compile(rb"menta\.cgi/respect/datail/datail\?accession=([A-Z]+[0-9]+)"),
+}
+
+
+def extract(page, database):
+    """
+
+    Find the accession IDs of a database in a downloaded page
+
+    Args:
+
+        page (bytes): the page, as returned by transport.get (a str is encoded first)
+
+        database (str): HMDB, LMDB, YMDB, T3DB or ReSpect
+
+    Returns:
+
+        list of the IDs in the order of the page (the ranking of the search), each ID once
+
+    Raises:
+
+        TypeError if argument (database) is not one of the above
+
+    Example:
+
+        ids = extract(transport.get(url), "HMDB")
+
+    """
+
+    if database not in PATTERNS:
+        raise TypeError (f"database argument should be a string from {list(PATTERNS)}")
+    if isinstance(page, str):
+        page = page.encode("utf-8")
+    return list(dict.fromkeys(found.decode("ascii") for found in PATTERNS[database].findall(page)))
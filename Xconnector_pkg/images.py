@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+
+from . import ids, parallel, records, transport
+from .lazy import pd
+
+
+# the structure image of an accession in each database
+URLS = {
+    "HMDB": "http://www.hmdb.ca/structures/{accession}/image.png",
+    "LMDB": "http://lmdb.ca/structures/{accession}/image.png",
+    "YMDB": "http://www.ymdb.ca/structures/{accession}/image.png",
+    "T3DB": "http://www.t3db.ca/structures/{accession}/image.png",
+}
+
+MANIFEST = "manifest.json"
+
+
+def url(accession, database=None):
+    """
+
+    The url of the structure image of an accession
+
+    Args:
+
+        accession (str): HMDB, LMDB, YMDB or T3DB ID
+
+        database (str): default = None, HMDB, LMDB, YMDB or T3DB (found from the accession if None)
+
+    Returns:
+
+        str url of the png image
+
+    Raises:
+
+        TypeError if argument (database) is not one of the above or can not be found from the accession
+
+    Example:
+
+        print (url("HMDB0000001"))
+
+    """
+
+    if database is None:
+        found = [name for name in URLS if ids.PATTERNS[name].fullmatch(accession.encode("ascii", "replace"))]
+        if not found:
+            raise TypeError (f"the database of {accession} is not one of {list(URLS)}, give it as database argument")
+        database = found[0]
+    if database not in URLS:
+        raise TypeError (f"database argument should be a string from {list(URLS)}")
+    return URLS[database].format(accession=accession)
+
+
+def _digest(body):
+    return hashlib.sha256(body).hexdigest()
+
+
+def _file_digest(path):
+    with open(path, "rb") as handle:
+        return _digest(handle.read())
+
+
+def _read_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST)
+    with open(path + ".tmp", "w") as handle:
+        json.dump(manifest, handle, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def _is_present(out_dir, entry):
+    # the file is kept only if it still has the content it was downloaded with
+    if entry.get("status", "ok") != "ok":
+        return False
+    path = os.path.join(out_dir, entry["file"])
+    return os.path.exists(path) and _file_digest(path) == entry["sha256"]
+
+
+def _download(item):
+    accession, database, out_dir = item
+    address = url(accession, database)
+    try:
+        body = transport.get(address)
+        digest = _digest(body)
+        name = f"{accession}.png"
+        path = os.path.join(out_dir, name)
+        # an identical file is not written again
+        if not (os.path.exists(path) and _file_digest(path) == digest):
+            with open(path + ".tmp", "wb") as handle:
+                handle.write(body)
+            os.replace(path + ".tmp", path)
+    except Exception as error:
+        # one failed image does not stop the others, it is tried again by the next download
+        return accession, {"status": records.status_of(error), "error": f"{type(error).__name__}: {error}", "url": address}
+    return accession, {"status": "ok", "file": name, "sha256": digest, "url": address}
+
+
+def download(accessions, out_dir=".", database=None, concurrency=1):
+    """
+
+    Download the structure images of many accessions into a directory, skipping the images already downloaded there
+
+    Args:
+
+        accessions (list): list of HMDB, LMDB, YMDB or T3DB IDs (they may be mixed if database is None)
+
+        out_dir (str): default = ".", the directory of the images (created if missing), one file <accession>.png per accession
+
+        database (str): default = None, HMDB, LMDB, YMDB or T3DB (found from each accession if None)
+
+        concurrency (int): default = 1, number of images downloaded at the same time over the pooled connections
+
+    Returns:
+
+        Data frame indexed by the accessions with the columns Path (None if there is no image), Status ("ok", "not_found"
+        when the database has no image, "error" when it could not be downloaded) and Error (the error message)
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+        TypeError if the database of an accession can not be found
+
+    Note:
+
+        The SHA-256 of every image, or the status of the failed ones, is written in out_dir/manifest.json.
+        An accession whose file is still there with the same hash is not downloaded again, so calling download again
+        resumes an interrupted download and retries the failed images.
+
+    Example:
+
+        images = download(["HMDB0000001", "LMDB00001", "T3D0001"], "structures", concurrency=8)
+        print (images[images["Status"] != "ok"])
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("download takes list as an argument")
+
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = _read_manifest(out_dir)
+    # check the databases before any request
+    for accession in accessions:
+        url(accession, database)
+
+    missing = [accession for accession in dict.fromkeys(accessions)
+        if accession not in manifest or not _is_present(out_dir, manifest[accession])]
+
+    try:
+        for accession, entry in parallel.imap(_download, [(accession, database, out_dir) for accession in missing], concurrency):
+            manifest[accession] = entry
+    finally:
+        # keep what was downloaded even if the download is interrupted
+        _write_manifest(out_dir, manifest)
+
+    entries = [manifest[accession] for accession in accessions]
+    return pd.DataFrame({
+        "Path": [os.path.join(out_dir, entry["file"]) if entry.get("status", "ok") == "ok" else None for entry in entries],
+        "Status": [entry.get("status", "ok") for entry in entries],
+        "Error": [entry.get("error") for entry in entries],
+    }, index=accessions)
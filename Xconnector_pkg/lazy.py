@@ -0,0 +1,41 @@
+import importlib
+
+
+class Module:
+
+    """
+
+    A module imported on the first use of one of its attributes, to keep the import of the package fast
+
+    Args:
+
+        name (str): the name of the module (e.g. "pandas")
+
+    Note:
+
+        The import is done by importlib, so it is thread safe, and the attributes are kept once they are read.
+        Modules that are only needed by a few functions (e.g. matplotlib.pyplot for draw_peak) are imported inside them instead.
+
+    Example:
+
+        pd = Module("pandas")
+        df = pd.DataFrame()     # pandas is imported here
+
+    """
+
+    def __init__(self, name):
+        self.__dict__["_name"] = name
+
+    def __getattr__(self, attribute):
+        value = getattr(importlib.import_module(self._name), attribute)
+        self.__dict__[attribute] = value
+        return value
+
+    def __repr__(self):
+        return f"<lazy module {self._name!r}>"
+
+
+np = Module("numpy")
+pd = Module("pandas")
+# asyncio alone takes longer to import than the rest of the package, it is only needed by the async functions
+aio = Module(f"{__package__}.aio")
@@ -0,0 +1,133 @@
+from .lazy import np, pd
+
+
+# the ESI adducts of the Fiehn lab table, as (multimer, charge, mass added to M / charge)
+# so that the ion m/z = multimer * M / charge + added mass
+ADDUCTS = {
+    "positive": {
+        "M+3H": (1, 3, 1.007276), "M+2H+Na": (1, 3, 8.334590), "M+H+2Na": (1, 3, 15.766190), "M+3Na": (1, 3, 22.989218),
+        "M+2H": (1, 2, 1.007276), "M+H+NH4": (1, 2, 9.520550), "M+H+Na": (1, 2, 11.998247), "M+H+K": (1, 2, 19.985217),
+        "M+ACN+2H": (1, 2, 21.520550), "M+2Na": (1, 2, 22.989218), "M+2ACN+2H": (1, 2, 42.033823), "M+3ACN+2H": (1, 2, 62.547097),
+        "M+H": (1, 1, 1.007276), "M+H-H2O": (1, 1, -17.003289), "M+H-2H2O": (1, 1, -35.013853), "M+NH4": (1, 1, 18.033823),
+        "M+Na": (1, 1, 22.989218), "M+CH3OH+H": (1, 1, 33.033489), "M+K": (1, 1, 38.963158), "M+ACN+H": (1, 1, 42.033823),
+        "M+2Na-H": (1, 1, 44.971160), "M+IsoProp+H": (1, 1, 61.065340), "M+ACN+Na": (1, 1, 64.015765), "M+2K-H": (1, 1, 76.919040),
+        "M+DMSO+H": (1, 1, 79.021220), "M+2ACN+H": (1, 1, 83.060370), "M+IsoProp+Na+H": (1, 1, 84.055110),
+        "2M+H": (2, 1, 1.007276), "2M+NH4": (2, 1, 18.033823), "2M+Na": (2, 1, 22.989218), "2M+K": (2, 1, 38.963158),
+        "2M+ACN+H": (2, 1, 42.033823), "2M+ACN+Na": (2, 1, 64.015765),
+    },
+    "negative": {
+        "M-3H": (1, 3, -1.007276), "M-2H": (1, 2, -1.007276), "M-H2O-H": (1, 1, -19.018390), "M-H": (1, 1, -1.007276),
+        "M+Na-2H": (1, 1, 20.974666), "M+Cl": (1, 1, 34.969402), "M+K-2H": (1, 1, 36.948606), "M+FA-H": (1, 1, 44.998201),
+        "M+Hac-H": (1, 1, 59.013851), "M+Br": (1, 1, 78.918885), "M+TFA-H": (1, 1, 112.985586),
+        "2M-H": (2, 1, -1.007276), "2M+FA-H": (2, 1, 44.998201), "2M+Hac-H": (2, 1, 59.013851), "3M-H": (3, 1, -1.007276),
+    },
+    "neutral": {
+        "M": (1, 1, 0.0),
+    },
+}
+
+
+class MassIndex:
+
+    """
+
+    Monoisotopic masses of a compound table sorted once, to match many query masses with many adducts in one vectorized pass
+
+    Args:
+
+        compounds (DataFrame): table with the columns accession, name, formula and mono_mass (e.g. local.Store.compounds())
+
+    Raises:
+
+        TypeError if argument (compounds) is not a data frame with those columns
+
+    Note:
+
+        Every (query mass, adduct) pair is turned into the neutral mass it stands for, and the compounds within the tolerance
+        are found by binary search on the sorted masses, so there is no limit on the number of query masses.
+
+    Example:
+
+        index = MassIndex(store.compounds())
+        print (index.search([300.1, 400.2], "positive", ["M+H","M+Na"], 10, "ppm"))
+
+    """
+
+    def __init__(self, compounds):
+
+        if type(compounds) != pd.DataFrame or not {"accession","name","formula","mono_mass"} <= set(compounds.columns):
+            raise TypeError ("compounds argument must be a data frame with accession, name, formula and mono_mass columns")
+
+        compounds = compounds[compounds["mono_mass"].notna()].sort_values("mono_mass", kind="mergesort")
+        self.masses = compounds["mono_mass"].to_numpy(dtype=np.float64)
+        self.accessions = compounds["accession"].to_numpy(dtype=object)
+        self.names = compounds["name"].to_numpy(dtype=object)
+        self.formulas = compounds["formula"].to_numpy(dtype=object)
+
+    def __len__(self):
+        return len(self.masses)
+
+    def search(self, masses, mode, adducts, tolerance, tolerance_unit):
+        """
+
+        Find the compounds matching the query masses
+
+        Args:
+
+            masses (list): query m/z values, any number of them
+
+            mode (str): Ion Mode (positive, negative, or neutral)
+
+            adducts (list): Adduct Type (e.g. M+H, M+H-H2O), all the adducts of the mode if empty
+
+            tolerance (float): tolerance ± on the m/z
+
+            tolerance_unit (str): tolerance unit (Da or ppm)
+
+        Returns:
+
+            Data frame of the hits with the columns Query Mass, Compound, Name, Formula, Monoisotopic Mass, Adduct, Adduct M/Z and Delta (ppm),
+            sorted by Adduct and Monoisotopic Mass like the web search
+
+        Raises:
+
+            TypeError if an adduct is not known for the mode
+
+        """
+
+        table = ADDUCTS[mode]
+        adducts = list(adducts) or list(table)
+        unknown = [adduct for adduct in adducts if adduct not in table]
+        if unknown:
+            raise TypeError (f"unknown {mode} adducts {unknown}, known adducts are {list(table)}")
+
+        queries = np.asarray(masses, dtype=np.float64)
+        multimer, charge, added = (np.array([table[adduct][i] for adduct in adducts], dtype=np.float64) for i in range(3))
+
+        # one row per query mass and one column per adduct
+        neutral = (queries[:, None] - added[None, :]) * charge[None, :] / multimer[None, :]
+        window = tolerance if tolerance_unit == "Da" else queries[:, None] * tolerance * 1e-6
+        window = window * charge[None, :] / multimer[None, :]
+
+        low = np.searchsorted(self.masses, (neutral - window).ravel(), side="left")
+        high = np.searchsorted(self.masses, (neutral + window).ravel(), side="right")
+        counts = high - low
+
+        # expand every (query, adduct) pair to the compounds inside its window
+        pair = np.repeat(np.arange(len(counts)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        compound = low[pair] + offsets
+        query, adduct = np.divmod(pair, len(adducts))
+
+        ion = multimer[adduct] * self.masses[compound] / charge[adduct] + added[adduct]
+        result = pd.DataFrame({
+            "Query Mass": queries[query],
+            "Compound": self.accessions[compound],
+            "Name": self.names[compound],
+            "Formula": self.formulas[compound],
+            "Monoisotopic Mass": self.masses[compound],
+            "Adduct": np.array(adducts, dtype=object)[adduct],
+            "Adduct M/Z": ion,
+            "Delta (ppm)": (ion - queries[query]) / queries[query] * 1e6,
+        })
+        return result.sort_values(by=["Adduct","Monoisotopic Mass"], kind="mergesort").reset_index(drop=True)
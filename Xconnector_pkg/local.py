@@ -0,0 +1,314 @@
+import json
+import os
+import sqlite3
+import threading
+import xml.etree.ElementTree as ElementTree
+
+from . import lcms
+from .lazy import pd
+
+
+class Store:
+
+    """
+
+    A local indexed copy of a database, built from its official dump, that serves the same data frames as the web pages
+
+    Args:
+
+        path (str): path of the SQLite file written by the build_local function of a database module (e.g. HMDB.build_local)
+
+    Raises:
+
+        TypeError if argument (path) is not a string
+
+        FileNotFoundError if the file does not exist
+
+    Note:
+
+        Each section of an accession is kept as one row (JSON of the columns and the values), looked up by its primary key.
+        The compounds table keeps the name, formula and masses of every accession for the local mass searches.
+
+    Example:
+
+        store = Store("hmdb.sqlite")
+        print (store.get("HMDB0000001", "Geninfo"))
+
+    """
+
+    def __init__(self, path):
+
+        if type(path) != str:
+            raise TypeError ("path argument should be a string")
+
+        if not os.path.exists(path):
+            raise FileNotFoundError (f"no local database at {path}, build it from the dump first")
+
+        self.path = path
+        self._local = threading.local()
+        self._mass_index = None
+        self.database = self._connection().execute("SELECT value FROM meta WHERE key = 'database'").fetchone()[0]
+        self.sections = {row[0] for row in self._connection().execute("SELECT DISTINCT section FROM sections")}
+
+    def __repr__(self):
+        return f"Store({self.path!r})"
+
+    def _connection(self):
+        # sqlite connections can not be shared between threads
+        if not hasattr(self._local, "connection"):
+            self._local.connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        return self._local.connection
+
+    def get(self, accession, section):
+        """
+
+        Get one section of an accession
+
+        Returns:
+
+            Data frame with the accession as the index (as the web functions return it), or None if the accession is not in the store
+
+        """
+        row = self._connection().execute(
+            "SELECT data FROM sections WHERE accession = ? AND section = ?", (accession, section)).fetchone()
+        if row is None:
+            return None
+        return from_json(row[0], accession)
+
+    def compounds(self):
+        """
+
+        Get the compounds table (accession, name, formula, average_mass, mono_mass)
+
+        Returns:
+
+            Data frame of all the accessions of the store
+
+        """
+        return pd.read_sql_query("SELECT accession, name, formula, average_mass, mono_mass FROM compounds", self._connection())
+
+    def mass_index(self):
+        """
+
+        Get the monoisotopic masses of the compounds sorted for the local LC-MS search (built on the first call)
+
+        Returns:
+
+            lcms.MassIndex
+
+        """
+        if self._mass_index is None:
+            self._mass_index = lcms.MassIndex(self.compounds())
+        return self._mass_index
+
+
+def to_json(frame):
+    # the index is the accession of every row, it is restored by from_json
+    return json.dumps({"columns": [str(column) for column in frame.columns], "data": frame.values.tolist()})
+
+
+def from_json(data, accession):
+    data = json.loads(data)
+    frame = pd.DataFrame(data["data"], columns=data["columns"])
+    if frame.columns.tolist() == [accession]:
+        # the pathways frame has the accession as its column, not as its index
+        return frame
+    return frame.rename(index=dict.fromkeys(range(len(frame)), accession))
+
+
+def iterparse(path, tag):
+    """
+
+    Stream the records of a large XML dump with bounded memory
+
+    Args:
+
+        path (str): path of the XML file
+
+        tag (str): the tag of one record (e.g. "metabolite"), without namespace
+
+    Returns:
+
+        A generator object for the record elements, with the namespaces removed from the tags.
+        Each element is cleared once the next one is read, so it must not be kept.
+
+    """
+    root = None
+    for event, element in ElementTree.iterparse(path, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = element
+            continue
+        if element.tag.rpartition("}")[2] != tag or element is root:
+            continue
+        for child in element.iter():
+            child.tag = child.tag.rpartition("}")[2]
+        yield element
+        # drop the parsed records from the tree
+        root.clear()
+
+
+def build(path, database, items, batch_size=1000):
+    """
+
+    Write a local store
+
+    Args:
+
+        path (str): path of the SQLite file, replaced if it exists
+
+        database (str): name of the database (HMDB, LMDB, YMDB or T3DB)
+
+        items (iterable): tuples of (accession, compound, sections), compound is a dict of name, formula, average_mass and mono_mass,
+        sections is a dict of section name to data frame
+
+        batch_size (int): default = 1000, number of accessions written in one transaction
+
+    Returns:
+
+        int number of accessions written
+
+    """
+    connection = sqlite3.connect(path)
+    try:
+        connection.executescript("""
+            DROP TABLE IF EXISTS meta;
+            DROP TABLE IF EXISTS sections;
+            DROP TABLE IF EXISTS compounds;
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE sections (accession TEXT, section TEXT, data TEXT, PRIMARY KEY (accession, section)) WITHOUT ROWID;
+            CREATE TABLE compounds (accession TEXT PRIMARY KEY, name TEXT, formula TEXT, average_mass REAL, mono_mass REAL);
+        """)
+        connection.execute("INSERT INTO meta VALUES ('database', ?)", (database,))
+
+        count = 0
+        sections_rows, compounds_rows = [], []
+        for accession, compound, sections in items:
+            count += 1
+            compounds_rows.append((accession, compound.get("name"), compound.get("formula"),
+                _number(compound.get("average_mass")), _number(compound.get("mono_mass"))))
+            sections_rows.extend((accession, name, to_json(frame)) for name, frame in sections.items())
+            if count % batch_size == 0:
+                _write(connection, sections_rows, compounds_rows)
+                sections_rows, compounds_rows = [], []
+        _write(connection, sections_rows, compounds_rows)
+
+        connection.execute("CREATE INDEX compounds_mono_mass ON compounds (mono_mass)")
+        connection.commit()
+    finally:
+        connection.close()
+
+    return count
+
+
+def _write(connection, sections_rows, compounds_rows):
+    with connection:
+        connection.executemany("INSERT OR REPLACE INTO sections VALUES (?, ?, ?)", sections_rows)
+        connection.executemany("INSERT OR REPLACE INTO compounds VALUES (?, ?, ?, ?, ?)", compounds_rows)
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def text(element, path, default="Not Available"):
+    # the text of a child element, the web pages show Not Available for the empty fields
+    if element is None:
+        return default
+    found = element.findtext(path)
+    if found is None or found.strip() == "":
+        return default
+    return found.strip()
+
+
+def texts(element, path):
+    # the texts of all the matching child elements
+    if element is None:
+        return []
+    return [child.text.strip() for child in element.findall(path) if child.text and child.text.strip()]
+
+
+# where the general information rows of the pages are in the XML dumps of HMDB, LMDB, YMDB and T3DB
+GENINFO_XML = {"Version":"version","Status":"status","Creation Date":"creation_date","Update Date":"update_date",
+    "Common Name":"name","Description":"description","Chemical Formula":"chemical_formula",
+    "Average Molecular Weight":"average_molecular_weight","Monoisotopic Molecular Weight":"monisotopic_molecular_weight",
+    "IUPAC Name":"iupac_name","Traditional Name":"traditional_iupac","CAS Registry Number":"cas_registry_number",
+    "SMILES":"smiles","InChI Identifier":"inchi","InChI Key":"inchikey","Kingdom":"taxonomy/kingdom",
+    "Super Class":"taxonomy/super_class","Class":"taxonomy/class","Sub Class":"taxonomy/sub_class",
+    "Direct Parent":"taxonomy/direct_parent","Molecular Framework":"taxonomy/molecular_framework","State":"state",
+    "DrugBank ID":"drugbank_id","FoodDB ID":"foodb_id","Chemspider ID":"chemspider_id","KEGG Compound ID":"kegg_id",
+    "ChEBI ID":"chebi_id","PubChem Compound":"pubchem_compound_id"}
+
+LOCATIONS_XML = {"Cellular Locations":"biological_properties/cellular_locations/cellular",
+    "Biospecimen Locations":"biological_properties/biospecimen_locations/biospecimen",
+    "Tissue Locations":"biological_properties/tissue_locations/tissue"}
+
+# the property names of the XML dumps that are not written like on the pages
+PROPERTY_NAMES = {"logp":"logP","logs":"logS","solubility":"Water Solubility","water_solubility":"Water Solubility",
+    "pka_strongest_acidic":"pKa (Strongest Acidic)","pka_strongest_basic":"pKa (Strongest Basic)",
+    "acceptor_count":"Hydrogen Acceptor Count","donor_count":"Hydrogen Donor Count","number_of_rings":"Number of Rings",
+    "veber_rule":"Veber's Rule","mddr_like_rule":"MDDR-like Rule","iupac":"IUPAC Name","mono_mass":"Monoisotopic Weight",
+    "average_mass":"Average Molecular Weight"}
+
+
+def accession(element):
+    # the dumps do not all name the ID element the same way
+    for path in ("accession", "ymdb_id", "t3db_id", "lmdb_id"):
+        found = text(element, path, None)
+        if found is not None:
+            return found
+    return None
+
+
+def xml_geninfo(element, rows, id_row):
+    # one row data frame of the general information, its columns in the order of rows
+    geninfo = {name: text(element, path) for name, path in GENINFO_XML.items()}
+    geninfo[id_row] = accession(element)
+    for name, path in LOCATIONS_XML.items():
+        geninfo[name] = ", ".join(texts(element, path)) or "Not Available"
+    # the roles are the leaves of the ChemOnt ontology
+    roles = [term.findtext("term") for term in element.iter("descendant") if term.find("descendants/descendant") is None]
+    geninfo["Role"] = ", ".join(role for role in roles if role) or "Not Available"
+    columns = [name for name in rows if name in geninfo]
+    return pd.DataFrame([[geninfo[name] for name in columns]], columns=columns)
+
+
+def xml_synonyms(element):
+    # the dumps do not keep the source of the synonyms
+    return pd.DataFrame([[synonym, "Not Available"] for synonym in texts(element, "synonyms/synonym")], columns=["Value","Source"])
+
+
+def xml_properties(element, path, last_column):
+    rows = [[PROPERTY_NAMES.get(kind, kind.replace("_"," ").title()), text(prop, "value"), text(prop, "source")]
+        for prop in element.findall(path) for kind in [text(prop, "kind", "")]]
+    return pd.DataFrame(rows, columns=["Property","Value",last_column])
+
+
+def xml_concentrations(element, path):
+    rows = []
+    for conc in element.findall(path):
+        value = text(conc, "concentration_value", "")
+        units = text(conc, "concentration_units", "")
+        status = "Detected and Quantified" if value else "Detected but not Quantified"
+        condition = text(conc, "subject_condition", "") or text(conc, "patient_information")
+        rows.append([text(conc, "biospecimen"), status, f"{value} {units}".strip() or "Not Available",
+            text(conc, "subject_age"), text(conc, "subject_sex"), condition])
+    return pd.DataFrame(rows, columns=["Biospecimen","Status","Value","Age","Sex","Condition"])
+
+
+def xml_pathways(element, accession):
+    return pd.DataFrame({accession: texts(element, "biological_properties/pathways/pathway/name")})
+
+
+def xml_compound(element):
+    return {"name": text(element, "name", None), "formula": text(element, "chemical_formula", None),
+        "average_mass": text(element, "average_molecular_weight", None),
+        "mono_mass": text(element, "monisotopic_molecular_weight", None)}
+
+
+def drop_empty(sections):
+    # an empty section is left out, to get the same not found data frame as a missing page
+    return {name: frame for name, frame in sections.items() if len(frame) != 0}
@@ -0,0 +1,129 @@
+import collections
+import concurrent.futures
+
+from . import throttle
+
+
+def imap(function, items, concurrency=1):
+    """
+
+    Apply a function to each item using a bounded pool of threads, and yield the results in the order of the items
+
+    Args:
+
+        function (callable): the function to apply to each item
+
+        items (iterable): the items, consumed lazily
+
+        concurrency (int): default = 1, number of items processed at the same time (1 means one after the other in the calling thread)
+
+    Returns:
+
+        A generator object for the results, in the same order as the items
+
+    Raises:
+
+        TypeError if argument (concurrency) is not an integer more than zero
+
+    Note:
+
+        At most 2 * concurrency items are in flight or waiting to be consumed, so memory stays bounded however long the input is.
+        An error raised by the function is raised again when its result is reached.
+
+    Example:
+
+        for page in imap(transport.get, urls, concurrency=8):
+            print (len(page))
+
+    """
+
+    if type(concurrency) != int or concurrency < 1:
+        raise TypeError ("concurrency argument must be an integer more than zero")
+
+    if concurrency == 1:
+        for item in items:
+            yield function(item)
+        return
+
+    window_size = 2 * concurrency
+    window = collections.deque()
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        for item in items:
+            # the hosts see the concurrency asked for (see throttle.Controller.seed)
+            window.append(pool.submit(throttle.requesting, concurrency, function, item))
+            # sliding window, wait for the oldest item before submitting more
+            if len(window) >= window_size:
+                yield window.popleft().result()
+        while window:
+            yield window.popleft().result()
+    finally:
+        # the consumer may stop early, do not run the items nobody will read
+        for future in window:
+            future.cancel()
+        pool.shutdown(wait=False)
+
+
+def paginate(function, concurrency=4, is_empty=lambda result: len(result) == 0):
+    """
+
+    Fetch the pages 1, 2, 3, ... of a paginated browse or search, with the next pages fetched ahead in parallel,
+    and yield the result of each page in order until the first empty page
+
+    Args:
+
+        function (callable): takes the page number and returns the result of that page (e.g. a data frame or a list of IDs)
+
+        concurrency (int): default = 4, number of pages fetched at the same time (1 means one after the other)
+
+        is_empty (callable): default = len(result) == 0, tells if a page result marks the end
+
+    Returns:
+
+        A generator object for the results of the pages before the first empty one
+
+    Raises:
+
+        TypeError if argument (concurrency) is not an integer more than zero
+
+    Note:
+
+        At most concurrency - 1 pages past the end are requested, and they are dropped.
+
+    Example:
+
+        for table in paginate(lambda page: transport.read_table(f"{url}&page={page}"), concurrency=8):
+            print (table)
+
+    """
+
+    if type(concurrency) != int or concurrency < 1:
+        raise TypeError ("concurrency argument must be an integer more than zero")
+
+    if concurrency == 1:
+        page = 1
+        while True:
+            result = function(page)
+            if is_empty(result):
+                return
+            yield result
+            page += 1
+
+    window = collections.deque()
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        for page in range(1, concurrency + 1):
+            window.append(pool.submit(throttle.requesting, concurrency, function, page))
+        next_page = concurrency + 1
+        while True:
+            result = window.popleft().result()
+            if is_empty(result):
+                return
+            yield result
+            # keep concurrency pages in flight
+            window.append(pool.submit(throttle.requesting, concurrency, function, next_page))
+            next_page += 1
+    finally:
+        for future in window:
+            future.cancel()
+        pool.shutdown(wait=False)
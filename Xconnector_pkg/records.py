@@ -0,0 +1,235 @@
+from . import local, parallel, transport
+from .lazy import aio
+
+
+class Record:
+
+    """
+
+    One accession page of a database, downloaded and parsed only once
+
+    Args:
+
+        accession (str): the database ID of the page
+
+    Raises:
+
+        TypeError if argument (accession) is not a string
+
+    Note:
+
+        This is the shared base of HMDB.Record, LMDB.Record, YMDB.Record and T3DP.Record, each of them sets
+        the page url (main_url) and adds its own sections. The sections are built lazily from the one fetch and then kept.
+        Every section data frame has its status in df.attrs["status"] (see status), so a not found accession can be told
+        apart from one that failed to download and is worth asking again.
+
+    """
+
+    main_url = None
+    # a local.Store set with set_backend("local", path), its sections are then read from it instead of the web
+    store = None
+
+    def __init__(self, accession):
+
+        if type(accession) != str:
+            raise TypeError (f"{type(self).__name__} takes string as an argument with only one ID")
+
+        self.accession = accession
+        self._tables = None
+        self._error = None
+        self._sections = {}
+
+    def __repr__(self):
+        return f"{type(self).__module__.split('.')[-1]}.{type(self).__name__}({self.accession!r})"
+
+    @property
+    def status(self):
+        """
+
+        "ok" if the page was fetched, "not_found" if it does not exist, "error" if it could not be fetched
+        (timeout, server down, ... the error is in record.error), None before the fetch
+
+        """
+        if self._tables is not None:
+            return "ok"
+        if self._error is None:
+            return None
+        return status_of(self._error)
+
+    @property
+    def error(self):
+        return self._error
+
+    def _read(self):
+        # get the data in form of tables
+        return self._parse(transport.text(self.main_url + self.accession))
+
+    def _parse(self, page):
+        # the tables are only converted when a section uses them
+        return transport.parse_tables(page)
+
+    def fetch(self):
+        """
+
+        Download and parse the page (only the first time it is called)
+
+        Returns:
+
+            transport.Tables, the list of Data frame(s) of the tables in the page
+
+        Raises:
+
+            the download/parsing error, every time it is called, if the page could not be fetched
+
+        """
+        if self._tables is None and self._error is None:
+            try:
+                self._tables = self._read()
+            except Exception as error:
+                self._error = error
+        if self._error is not None:
+            raise self._error
+        return self._tables
+
+    def _load(self, page, sections):
+        # runs in a worker thread: parse the page and convert the tables there, not on the event loop
+        tables = self._parse(page)
+        self._tables = tables
+        if sections is None:
+            for i in range(len(tables)):
+                try:
+                    tables[i]
+                except Exception:
+                    # raised again when a section uses that table
+                    pass
+        for name in sections or ():
+            try:
+                getattr(self, name)
+            except Exception:
+                pass
+        return tables
+
+    async def afetch(self, sections=None):
+        """
+
+        Download the page without blocking the event loop and parse it in a worker thread (only the first time it is awaited)
+
+        Args:
+
+            sections (list): default = None, names of the sections built in the worker thread too (e.g. ["Geninfo"]),
+                             if None every table of the page is converted there
+
+        Returns:
+
+            transport.Tables, the list of Data frame(s) of the tables in the page
+
+        Raises:
+
+            the download/parsing error, every time it is awaited, if the page could not be fetched
+
+        """
+        if self._tables is None and self._error is None:
+            try:
+                page = await aio.text(self.main_url + self.accession)
+                await aio.run(self._load, page, sections)
+            except Exception as error:
+                self._tables = None
+                self._error = error
+        if self._error is not None:
+            raise self._error
+        return self._tables
+
+    def _section(self, name, builder):
+        # every section is built only once from the fetched tables
+        if name not in self._sections:
+            if self.store is not None and name in self.store.sections:
+                frame = self.store.get(self.accession, name)
+                # an accession missing from the store gets the same not found data frame as a missing page
+                status = "ok" if frame is not None else "not_found"
+                frame = frame if frame is not None else builder(Missing(self.accession))
+            else:
+                frame = builder(self)
+                status = self.status
+            if status is not None:
+                frame.attrs["status"] = status
+            self._sections[name] = frame
+        return self._sections[name]
+
+
+class Missing:
+
+    # stands for a page that does not exist, its sections fall back to their not found data frames
+
+    def __init__(self, accession):
+        self.accession = accession
+
+    def fetch(self):
+        raise LookupError(f"{self.accession} is not in the local store")
+
+
+def status_of(error):
+    # a page that does not exist is not an error worth retrying
+    if isinstance(error, (transport.NotFound, LookupError)):
+        return "not_found"
+    return "error"
+
+
+def set_backend(record_class, backend, path):
+    # the backend is kept on the Record class of the database module
+    if backend == "web":
+        record_class.store = None
+    elif backend == "local":
+        if type(path) != str:
+            raise TypeError ("path argument should be the path of the local store built with build_local")
+        store = local.Store(path)
+        if store.database != record_class.__module__.split(".")[-1].replace("T3DP", "T3DB"):
+            raise TypeError (f"{path} is a {store.database} store")
+        record_class.store = store
+    else:
+        raise TypeError ("backend argument should be a string from (web, local)")
+
+
+def as_record(record_class, accession):
+    # accept both IDs and already created Record objects
+    if isinstance(accession, record_class):
+        return accession
+    return record_class(accession)
+
+
+def _fetched(record):
+    # the sections of a missing page fall back to their not found data frames
+    if record.store is not None:
+        # local sections need no download, the others are fetched when they are used
+        return record
+    try:
+        record.fetch()
+    except Exception:
+        pass
+    return record
+
+
+def fetch_all(record_class, accessions, concurrency=1):
+    # fetch every page once, with up to concurrency pages downloaded at the same time, in the order of accessions
+    records = (as_record(record_class, i_acc) for i_acc in accessions)
+    return parallel.imap(_fetched, records, concurrency)
+
+
+async def _afetched(record, sections=None):
+    if record.store is not None:
+        return record
+    try:
+        await record.afetch(sections)
+    except Exception:
+        pass
+    return record
+
+
+def afetch_all(record_class, accessions, concurrency=8, sections=None):
+    # async counterpart of fetch_all, the tables (or only the named sections) are converted off the event loop
+    records = (as_record(record_class, i_acc) for i_acc in accessions)
+    return aio.imap(lambda record: _afetched(record, sections), records, concurrency)
+
+
+def rename_index(tables, accession):
+    # to make the row.names =  to the id
+    return tables.rename(index=dict.fromkeys(range(len(tables)), accession))
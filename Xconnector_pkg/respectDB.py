@@ -1,35 +1,32 @@
-import pandas as pd
-from pandas import DataFrame
+import concurrent.futures
+import os
 import urllib
-import urllib.request
-import matplotlib.pyplot as plt
-import numpy as np
-import re
+import urllib.parse
 import math
+from . import ids, parallel, spectra, throttle, transport
+from .lazy import aio, np, pd
 
-def AccData(accessions):
-    """
 
-    Retrieve MSn spectra from ReSpect database
+def _accdata_url(i_acc):
 
-    Args:
+    main_url = "http://spectra.psc.riken.jp/menta.cgi/respect/datail/datail?"
 
-        accessions (list): list of ReSpect accessions
+    # creating the query search url by accessions
+    dict_url = {"accession":i_acc}
+    api_request =  urllib.parse.urlencode(dict_url)
+    return main_url + api_request
 
-    Returns:
 
-        Two generators object for Data frame(s) contains MSn spectra data from ReSpect database and peak data 
+def _AccData(i_acc):
+    return _parse_AccData(i_acc, transport.text(_accdata_url(i_acc)))
 
-    Raises:
 
-        TypeError if argument (accessions) is not a list
+async def _aAccData(i_acc):
+    page = await aio.text(_accdata_url(i_acc))
+    return await aio.run(_parse_AccData, i_acc, page)
 
-    Example
 
-        for data , peak_data in AccData(["PM013507","PS058407"]):
-            print (data , peak_data)
-
-    """
+def _parse_AccData(i_acc, page):
 
     def add_all_df(dfdf_new):
 
@@ -59,56 +56,183 @@ def AccData(accessions):
         dfdf = dfdf.drop(["Sub Tag"], 0)
         return dfdf
 
+    # get the data in form of tables
+    tables = transport.parse_html(page)
+    if len (tables) > 1 :
+        tables = tables[1]
+        #### modify peak data
+        # save the infromation of that cell
+        peak = tables.iat[-1,2]
+        # remove the peak data cell values from tables
+        tables.iat[-1, 2] = ""
+
+        # creat dataframe for peak data, float64 columns that are views of the parsed peak arrays
+        peak_tables = spectra.Peaks.parse(peak[peak.find("rel.int.")+9:], i_acc).frame()
+
+        #remove the last row from tables
+        tables.drop(index=len(tables)-1,inplace = True)
+        
+
+        tables = add_all_df(tables)
+    else:
+        tables = pd.DataFrame(index=[i_acc])
+        peak_tables = pd.DataFrame()
+
+    return tables, peak_tables
+
+
+def set_rate_limit(**kwargs):
+
+    """
+
+    Pace the requests sent to ReSpect (e.g. to stay under the rate the server tolerates)
+
+    Args:
+
+        the keyword arguments of throttle.configure (rate, burst, adaptive, concurrency, min_concurrency, max_concurrency, slow, failures, cooldown)
+
+    Raises:
+
+        TypeError if an argument is not one of the settings of throttle.configure
+
+    Note:
+
+        With adaptive=True the number of requests in flight adapts between min_concurrency and max_concurrency:
+        it grows while ReSpect answers quickly and is halved after a 429/503 answer or a latency spike.
+
+    Example:
+
+        set_rate_limit(rate=5, burst=5, adaptive=True, max_concurrency=8)
+
+    """
+
+    throttle.configure("ReSpect", **kwargs)
+
+
+def AccData(accessions, concurrency=1):
+    """
+
+    Retrieve MSn spectra from ReSpect database
+
+    Args:
+
+        accessions (list): list of ReSpect accessions
+
+        concurrency (int): default = 1, number of accessions downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        Two generators object for Data frame(s) contains MSn spectra data from ReSpect database and peak data 
+
+        the peak data has float64 columns m/z, Intensity and Relative intensity (see spectra.Peaks.from_frame for the arrays)
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example
+
+        for data , peak_data in AccData(["PM013507","PS058407"]):
+            print (data , peak_data)
+
+    """
 
     if type(accessions) != list:
         raise TypeError ("AccData takes list as an argument")
 
-    main_url = "http://spectra.psc.riken.jp/menta.cgi/respect/datail/datail?"
+    for tables, peak_tables in parallel.imap(_AccData, accessions, concurrency):
+        yield tables, peak_tables
 
-    for i_acc in accessions:
-        # creating the query search url by accessions
-        dict_url = {"accession":i_acc}
-        api_request =  urllib.parse.urlencode(dict_url)
-        api_request = main_url + api_request
-            
-        # get the data in form of tables
-        tables = pd.read_html(api_request)
-        if len (tables) > 1 :
-            tables = tables[1]
-            #### modify peak data
-            # save the infromation of that cell
-            peak = tables.iat[-1,2]
-            # remove the peak data cell values from tables
-            tables.iat[-1, 2] = ""
-
-            # creat dataframe for peak data
-            peak_table = peak[peak.find("rel.int.")+9:]
-            peak_table = peak_table.strip()
-            peak_table = peak_table.split(" ")
-            peak_table = list(filter(None, peak_table))
-            peak_table = [peak_table[x:x+3] for x in range(0,len(peak_table),3)]
-            peak_table[0] = [i.replace(u'\xa0', ' ') for i in peak_table[0] ]
-            peak_tables = DataFrame(peak_table,columns = peak_table[0]).drop(0,0)
-            peak_tables.reset_index(inplace=True, drop=True)
-
-            rename_list_index = [i_acc] * len(peak_tables)
-            index_name = list ( range(0, len(peak_tables)) )
-            dict_rename_index = dict( zip( index_name , rename_list_index ) )
-
-            peak_tables = peak_tables.rename(index=dict_rename_index)
-
-            #remove the last row from tables
-            tables.drop(index=len(tables)-1,inplace = True)
-            
-
-            tables = add_all_df(tables)
-        else:
-            tables = pd.DataFrame(index=[i_acc])
-            peak_tables = pd.DataFrame()
 
-        yield tables, peak_tables
-      
-def draw_peak(accession):
+def BuildLibrary(accessions, concurrency=1, library=None):
+    """
+
+    Build a local MS/MS spectral library from ReSpect spectra, to search many query spectra without any request
+
+    Args:
+
+        accessions (list): list of ReSpect accessions
+
+        concurrency (int): default = 1, number of accessions downloaded at the same time
+
+        library (spectra.SpectralLibrary): default = None, a library to add the spectra to (a new one if None)
+
+    Returns:
+
+        spectra.SpectralLibrary
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example
+
+        library = BuildLibrary(["PM013507","PS058407"])
+        print (library.search(195.088, ["69.034 120", "138.066 1000"]))
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("BuildLibrary takes list as an argument")
+
+    if library is None:
+        library = spectra.SpectralLibrary()
+    for tables, peak_tables in AccData(accessions, concurrency):
+        library.add_respect(tables, peak_tables)
+
+    return library
+
+
+def _peak_arrays(peak_table):
+
+    # m/z and relative intensity sorted by m/z, no conversion for the float frames of AccData
+    peaks = spectra.Peaks.from_frame(peak_table).sorted()
+    return peaks.mz, peaks.relative_intensity
+
+
+def _y_limit(top):
+
+    if top == 100:
+        return top + 10
+    elif top == 1000:
+        return top + 100
+    else:
+        return top + 20
+
+
+def _draw_stems(axes, accession, mz, intensity, labels):
+
+    # one line collection for all the peaks, instead of one bar and one text per peak
+    axes.vlines(mz, 0, intensity, color="blue", alpha=0.6, linewidth=1)
+    axes.set_xlabel("m/z", fontsize=18)
+    axes.set_ylabel("Relative intensity", fontsize=16)
+    axes.set_title(f"ID: {accession}")
+    if len(mz) > 0:
+        axes.set_ylim(0, _y_limit(intensity.max()))
+
+    # label only the most intense peaks
+    if labels and len(mz) > 0:
+        top = np.argsort(-intensity, kind="stable")[:labels]
+        for i in top:
+            axes.text(mz[i], intensity[i] + 1, f"{mz[i]:g}", color="blue", rotation=40, fontsize=9)
+
+
+def _render(accession, mz, intensity, path, labels, figsize, dpi):
+
+    # a figure on the Agg canvas, without pyplot: no global state, so it can run in a worker
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot()
+    figure.suptitle("MSn spectra", fontsize=20)
+    _draw_stems(axes, accession, mz, intensity, labels)
+    figure.savefig(path)
+    return path
+
+
+def draw_peak(accession, fast=False, labels=10):
     """
 
     Retrieve MSn spectra from ReSpect database
@@ -117,6 +241,10 @@ def draw_peak(accession):
 
     accession (str): string of ReSpect accession
 
+    fast (bool): default = False, draw the peaks as one collection of vertical lines, for spectra with many peaks
+
+    labels (int): default = 10, number of the most intense peaks labelled with their m/z when fast is True
+
     Returns:
 
         BarContainer
@@ -125,17 +253,33 @@ def draw_peak(accession):
 
         TypeError if argument (accession) is more than one or not a string
 
+    Note:
+
+        By default every peak is drawn as a bar with its intensity written above it, which gets slow past a few hundred peaks.
+        To save the spectra of many accessions to files use draw_peaks.
+
     Example
 
         draw_peak("PS058407").show()
+        draw_peak("PS058407", fast=True, labels=5).show()
 
     """
 
     if type(accession) == list and len(accession) > 1:
         raise  TypeError ("draw_peak takes only one accession")
 
+    # matplotlib is slow to import, it is only needed here
+    import matplotlib.pyplot as plt
+
     for _ , peak_table in AccData([accession]):
 
+        if fast:
+            mz, intensity = _peak_arrays(peak_table)
+            figure, axes = plt.subplots(figsize=(15, 15))
+            figure.suptitle("MSn spectra", fontsize=20)
+            _draw_stems(axes, accession, mz, intensity, labels)
+            return plt
+
         peak_table["m/z"] = pd.to_numeric(peak_table["m/z"])
         peak_table["Relative intensity"] = pd.to_numeric(peak_table["Relative intensity"])
         peak_table.sort_values(by = "m/z", axis= 0 ,inplace=True,ascending = True)
@@ -144,7 +288,7 @@ def draw_peak(accession):
     peak_table.reset_index(inplace=True)
     peak_table.drop("index",axis=1,inplace=True)
     peak_table.drop(["Intensity"] , axis = 1 , inplace = True)
-    index_replace = dict(zip(peak_table.index , peak_table["Relative intensity"].astype(str)))
+    index_replace = dict(zip(peak_table.index , peak_table["Relative intensity"].map("{:g}".format)))
     peak_table.rename(index= index_replace, inplace = True)
 
     plt.style.use("seaborn-pastel")
@@ -155,48 +299,101 @@ def draw_peak(accession):
     plt.suptitle('MSn spectra', fontsize=20)
     plt.xlabel('m/z', fontsize=18)
     plt.ylabel('Relative intensity', fontsize=16)
-    if max(peak_table["Relative intensity"]) == 100:
-        plt.ylim(0, max(peak_table["Relative intensity"])+10)
-    elif max(peak_table["Relative intensity"]) == 1000:
-        plt.ylim(0, max(peak_table["Relative intensity"])+100)
-    else:
-        plt.ylim(0, max(peak_table["Relative intensity"])+20)
+    plt.ylim(0, _y_limit(max(peak_table["Relative intensity"])))
     plt.title(f"ID: {accession}")
 
     for x, y in enumerate(peak_table["Relative intensity"]):
-        plt.text(x-0.01, y + 1, str(y), color='blue', rotation=40)
+        plt.text(x-0.01, y + 1, f"{y:g}", color='blue', rotation=40)
 
     return plt
 
-def Keyword(name,formula, exactmass,tolerance):
+
+def draw_peaks(accessions, directory, format="png", labels=10, concurrency=4, processes=1, figsize=(15, 15), dpi=100):
     """
 
-    Searching and Retrieve MSn spectra from ReSpect database
+    Save the MSn spectra of many ReSpect accessions to image files, e.g. to put them in a report
 
     Args:
 
-        name (str): compound name
-        formula (str): compound formula
-        exactmass (str): compound exact mass
-        tolerance (str): compound tolerance
+        accessions (list): list of ReSpect accessions
+
+        directory (str): the directory of the files (created if missing), one file <accession>.<format> per accession
+
+        format (str): default = "png", "png" or "svg"
+
+        labels (int): default = 10, number of the most intense peaks labelled with their m/z
+
+        concurrency (int): default = 4, number of accessions downloaded at the same time
+
+        processes (int): default = 1, number of worker processes drawing the files (1 means in the calling process)
+
+        figsize (tuple): default = (15, 15), size of the figures in inches
+
+        dpi (int): default = 100, resolution of the png files
 
     Returns:
 
-        Two generators object for Data frame(s) contains MSn spectra data from ReSpect database and peak data 
+        dict of accession: path of its file, or None if ReSpect has no peak data for it
 
     Raises:
 
-        TypeError if argument (name) is not a str
-        TypeError if argument (formula) is not a str
-        TypeError if argument (exactmass) is not a str
-        TypeError if argument (tolerance) is not a str
+        TypeError if argument (accessions) is not a list
 
-    Example
+        ValueError if argument (format) is not "png" or "svg"
 
-        print ( Keyword("","C21H2","","") )
+    Note:
+
+        The figures are drawn like draw_peak(accession, fast=True) on the non-interactive Agg canvas, without pyplot,
+        so the open figures of the caller are not touched. The downloads and the drawing overlap.
+
+    Example
 
+        paths = draw_peaks(["PM013507","PS058407"], "spectra", format="svg", processes=4)
 
     """
+
+    if type(accessions) != list:
+        raise TypeError ("draw_peaks takes list as an argument")
+    if format not in ("png", "svg"):
+        raise ValueError ("format must be png or svg")
+    if type(processes) != int or processes < 1:
+        raise TypeError ("processes argument must be an integer more than zero")
+
+    os.makedirs(directory, exist_ok=True)
+    pool = concurrent.futures.ProcessPoolExecutor(max_workers=processes) if processes > 1 else None
+
+    paths = {}
+    try:
+        for accession, (_, peak_table) in zip(accessions, AccData(accessions, concurrency)):
+            if len(peak_table) == 0:
+                paths[accession] = None
+                continue
+            mz, intensity = _peak_arrays(peak_table)
+            path = os.path.join(directory, f"{accession}.{format}")
+            if pool is None:
+                paths[accession] = _render(accession, mz, intensity, path, labels, figsize, dpi)
+            else:
+                paths[accession] = pool.submit(_render, accession, mz, intensity, path, labels, figsize, dpi)
+
+        # wait for every drawing before the pool is shut down
+        for accession, path in paths.items():
+            if isinstance(path, concurrent.futures.Future):
+                paths[accession] = path.result()
+    except BaseException:
+        # the drawings still waiting are not needed anymore
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+            pool = None
+        raise
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+    return paths
+
+
+def _keyword_url(name,formula, exactmass,tolerance):
+
     if type(name) != str:
         raise  TypeError ("Keyword takes str as an argument")
     if type(formula) != str:
@@ -210,12 +407,11 @@ def Keyword(name,formula, exactmass,tolerance):
     main_url = "http://spectra.psc.riken.jp/menta.cgi/respect/search/keyword?"
     dict_url = {"name":name,"formula":formula,"exactmass":exactmass,"tolerance":tolerance,"hideGraph":"hideGraph"}
     api_request =  urllib.parse.urlencode(dict_url)
-    api_request = main_url + api_request
-    xml = urllib.request.urlopen(api_request)
-    contents = str(xml.read())
+    return main_url + api_request
 
-    acc = re.findall('menta.cgi/respect/datail/datail\?accession=[A-Z]+[0-9]+', contents)
-    acc = [i[i.find("=")+1:] for i in acc]
+
+def _find_accessions(xml):
+    acc = ids.extract(xml, "ReSpect")
 
     if len(acc) == 0:
         not_found = "Your search did not match any documents in ReSpect database"
@@ -224,3 +420,102 @@ def Keyword(name,formula, exactmass,tolerance):
         return acc
 
 
+def Keyword(name,formula, exactmass,tolerance):
+    """
+
+    Searching and Retrieve MSn spectra from ReSpect database
+
+    Args:
+
+        name (str): compound name
+        formula (str): compound formula
+        exactmass (str): compound exact mass
+        tolerance (str): compound tolerance
+
+    Returns:
+
+        Two generators object for Data frame(s) contains MSn spectra data from ReSpect database and peak data 
+
+    Raises:
+
+        TypeError if argument (name) is not a str
+        TypeError if argument (formula) is not a str
+        TypeError if argument (exactmass) is not a str
+        TypeError if argument (tolerance) is not a str
+
+    Example
+
+        print ( Keyword("","C21H2","","") )
+
+
+    """
+    api_request = _keyword_url(name,formula, exactmass,tolerance)
+
+    return _find_accessions(transport.get(api_request))
+
+
+async def aAccData(accessions, concurrency=8):
+    """
+
+    Async counterpart of AccData, the spectra are downloaded without blocking the event loop
+
+    Args:
+
+        accessions (list): list of ReSpect accessions
+
+        concurrency (int): default = 8, number of accessions downloaded at the same time, the results keep the order of accessions
+
+    Returns:
+
+        An async generator object for the same (data, peak data) Data frame(s) as AccData
+
+    Raises:
+
+        TypeError if argument (accessions) is not a list
+
+    Example
+
+        async for data , peak_data in aAccData(["PM013507","PS058407"]):
+            print (data , peak_data)
+
+    """
+
+    if type(accessions) != list:
+        raise TypeError ("aAccData takes list as an argument")
+
+    async for tables, peak_tables in aio.imap(_aAccData, accessions, concurrency):
+        yield tables, peak_tables
+
+
+async def aKeyword(name,formula, exactmass,tolerance):
+    """
+
+    Async counterpart of Keyword, the search page is downloaded without blocking the event loop
+
+    Args:
+
+        name (str): compound name
+        formula (str): compound formula
+        exactmass (str): compound exact mass
+        tolerance (str): compound tolerance
+
+    Returns:
+
+        list of ReSpect accessions
+
+    Raises:
+
+        TypeError if argument (name) is not a str
+        TypeError if argument (formula) is not a str
+        TypeError if argument (exactmass) is not a str
+        TypeError if argument (tolerance) is not a str
+
+    Example
+
+        print ( await aKeyword("","C21H2","","") )
+
+    """
+
+    api_request = _keyword_url(name,formula, exactmass,tolerance)
+
+    return _find_accessions(await aio.get(api_request))
@@ -0,0 +1,464 @@
+import struct
+
+from .lazy import np, pd
+
+
+COLUMNS = ["m/z", "Intensity", "Relative intensity"]
+
+
+class Peaks:
+
+    """
+
+    The peak list of one spectrum, kept as float64 arrays of m/z, intensity and relative intensity
+
+    Args:
+
+        data (array): 3 x n array, its rows are the m/z, intensity and relative intensity of the n peaks
+
+        accession (str): default = None, ID of the spectrum
+
+    Note:
+
+        The three rows are stored one after the other in one block, so mz, intensity, relative_intensity and the frame
+        of the peaks are views of it, nothing is copied. A pickle of Peaks is the raw block plus the accession.
+
+    Example:
+
+        peaks = Peaks.parse("m/z int. rel.int. 69.033 1200 100 110.071 426 35.5", "PS058407")
+        print (peaks.mz, peaks.relative_intensity)
+
+    """
+
+    _HEADER = struct.Struct("<Q")
+
+    def __init__(self, data, accession=None):
+        self.data = np.ascontiguousarray(data, dtype=np.float64).reshape(3, -1)
+        self.accession = accession
+
+    @classmethod
+    def parse(cls, text, accession=None):
+        """
+
+        Parse peaks written as whitespace separated numbers, three per peak, in one vectorized conversion
+
+        Args:
+
+            text (str): the numbers, e.g. the peak cell of a ReSpect record, the leading words that are not numbers (column names) are skipped
+
+            accession (str): default = None, ID of the spectrum
+
+        Returns:
+
+            Peaks
+
+        Raises:
+
+            ValueError if a word is not a number or the count of numbers is not a multiple of three
+
+        """
+        words = text.split()
+        start = 0
+        while start < len(words) and not _is_number(words[start]):
+            start += 1
+        values = np.array(words[start:], dtype=np.float64)
+        if len(values) % 3:
+            raise ValueError (f"peaks must have three values each, got {len(values)} values")
+        # peak by peak in the text, stored column by column
+        return cls(values.reshape(-1, 3).T, accession)
+
+    @classmethod
+    def from_frame(cls, frame, accession=None):
+        """
+
+        Peaks of a data frame with m/z, Intensity and Relative intensity columns (e.g. the peak data of respectDB.AccData)
+
+        """
+        values = frame if list(frame.columns) == COLUMNS else frame[COLUMNS]
+        if any(dtype != np.float64 for dtype in values.dtypes):
+            values = values.apply(pd.to_numeric, errors="coerce")
+        if accession is None and len(frame):
+            accession = frame.index[0]
+        # a frame of one float block (e.g. made by Peaks.frame) gives a view of it
+        return cls(values.to_numpy(dtype=np.float64).T, accession)
+
+    @property
+    def mz(self):
+        return self.data[0]
+
+    @property
+    def intensity(self):
+        return self.data[1]
+
+    @property
+    def relative_intensity(self):
+        return self.data[2]
+
+    def __len__(self):
+        return self.data.shape[1]
+
+    def __repr__(self):
+        return f"Peaks({self.accession!r}, {len(self)} peaks)"
+
+    def sorted(self):
+        """
+
+        The peaks sorted by m/z (self if they already are)
+
+        """
+        if np.all(self.mz[1:] >= self.mz[:-1]):
+            return self
+        return Peaks(self.data[:, self.mz.argsort(kind="stable")], self.accession)
+
+    def frame(self):
+        """
+
+        The peaks as a data frame with float64 columns m/z, Intensity and Relative intensity, indexed by the accession
+
+        """
+        # one float block, its columns are views of the peak arrays
+        return pd.DataFrame(self.data.T, columns=COLUMNS, index=[self.accession] * len(self), copy=False)
+
+    def to_bytes(self):
+        """
+
+        The peaks as bytes: the peak count then the raw float64 block (little endian), see from_bytes
+
+        """
+        return self._HEADER.pack(len(self)) + self.data.astype("<f8", copy=False).tobytes()
+
+    @classmethod
+    def from_bytes(cls, buffer, accession=None):
+        """
+
+        Peaks written by to_bytes, the arrays are views of the buffer (read only if it is bytes)
+
+        """
+        (count,) = cls._HEADER.unpack_from(buffer)
+        data = np.frombuffer(buffer, dtype="<f8", count=3 * count, offset=cls._HEADER.size)
+        return cls(data.reshape(3, count), accession)
+
+    def __reduce__(self):
+        return (Peaks.from_bytes, (self.to_bytes(), self.accession))
+
+
+def _is_number(word):
+    try:
+        float(word)
+        return True
+    except ValueError:
+        return False
+
+
+def _peaks_arrays(peaks):
+    # accept Peaks, ["mz intensity", ...] like LCMSMS, a list of (mz, intensity) pairs, or a data frame with m/z and intensity columns
+    if isinstance(peaks, Peaks):
+        return peaks.mz, peaks.relative_intensity
+    if isinstance(peaks, pd.DataFrame):
+        intensity = "Relative intensity" if "Relative intensity" in peaks.columns else peaks.columns[1]
+        mz = "m/z" if "m/z" in peaks.columns else peaks.columns[0]
+        return (pd.to_numeric(peaks[mz], errors="coerce").to_numpy(dtype=np.float64),
+            pd.to_numeric(peaks[intensity], errors="coerce").to_numpy(dtype=np.float64))
+    pairs = [peak.split() if isinstance(peak, str) else peak for peak in peaks]
+    pairs = np.asarray(pairs, dtype=np.float64).reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+class SpectralLibrary:
+
+    """
+
+    A local MS/MS spectral library, searched by precursor m/z and binned cosine similarity
+
+    Args:
+
+        bin_width (float): default = 0.05, width (Da) of the m/z bins the peaks are summed in before scoring
+
+        intensity_power (float): default = 0.5, the intensities are raised to this power before scoring (0.5 = square root)
+
+    Raises:
+
+        TypeError if argument (bin_width) is not a positive number
+
+    Note:
+
+        The spectra are kept as one array of bins and weights (normalized to unit length per spectrum), with their precursors sorted
+        once, so the candidates of a query are found by binary search and all of them are scored in one vectorized pass.
+
+    Example:
+
+        library = SpectralLibrary()
+        library.add("PS058407", 195.0877, ["69.033 100", "110.071 35.5", "138.066 999"])
+        print (library.search(195.088, ["69.034 120", "138.066 1000"], precursor_tolerance=0.01))
+
+    """
+
+    def __init__(self, bin_width=0.05, intensity_power=0.5):
+
+        if type(bin_width) not in (int, float) or bin_width <= 0:
+            raise TypeError ("bin_width argument must be a number more than zero")
+
+        self.bin_width = float(bin_width)
+        self.intensity_power = intensity_power
+        self._pending = []
+        self._ids = np.array([], dtype=object)
+        self._modes = np.array([], dtype=object)
+        self._precursors = np.array([], dtype=np.float64)
+        self._bins = np.array([], dtype=np.int64)
+        self._weights = np.array([], dtype=np.float64)
+        self._offsets = np.zeros(1, dtype=np.int64)
+
+    def __len__(self):
+        return len(self._ids) + len(self._pending)
+
+    def __repr__(self):
+        return f"SpectralLibrary({len(self)} spectra)"
+
+    def _vector(self, mz, intensity):
+        # sum the peaks per bin and normalize, so that the dot product of two vectors is their cosine
+        keep = np.isfinite(mz) & np.isfinite(intensity) & (intensity > 0)
+        bins = np.rint(mz[keep] / self.bin_width).astype(np.int64)
+        bins, inverse = np.unique(bins, return_inverse=True)
+        weights = np.bincount(inverse, weights=intensity[keep] ** self.intensity_power, minlength=len(bins))
+        norm = np.sqrt((weights ** 2).sum())
+        return bins, (weights / norm if norm > 0 else weights)
+
+    def add(self, identifier, precursor_mz, peaks, ion_mode=None):
+        """
+
+        Add one spectrum
+
+        Args:
+
+            identifier (str): ID of the spectrum (e.g. a ReSpect accession)
+
+            precursor_mz (float): precursor m/z
+
+            peaks: Peaks, ["mz intensity", ...], list of (mz, intensity) pairs, or data frame of m/z and intensity
+
+            ion_mode (str): default = None, POSITIVE or NEGATIVE
+
+        """
+        mz, intensity = _peaks_arrays(peaks)
+        bins, weights = self._vector(mz, intensity)
+        self._pending.append((identifier, ion_mode, float(precursor_mz), bins, weights))
+
+    def add_respect(self, tables, peak_tables):
+        """
+
+        Add one spectrum returned by respectDB.AccData
+
+        Args:
+
+            tables (DataFrame): the record data of the spectrum
+
+            peak_tables (DataFrame): its peak data
+
+        Returns:
+
+            bool, False if the record has no precursor m/z or no peaks
+
+        """
+        precursor = [column for column in tables.columns if "PRECURSOR_M/Z" in column]
+        if len(peak_tables) == 0 or len(tables) == 0 or not precursor:
+            return False
+        try:
+            precursor_mz = float(str(tables[precursor[0]].iloc[0]).split()[0])
+        except ValueError:
+            return False
+        mode = [column for column in tables.columns if "ION_MODE" in column]
+        self.add(tables.index[0], precursor_mz, peak_tables, str(tables[mode[0]].iloc[0]) if mode else None)
+        return True
+
+    def add_msp(self, path):
+        """
+
+        Add the spectra of an MSP file (NIST/MassBank text format)
+
+        Args:
+
+            path (str): path of the MSP file
+
+        Returns:
+
+            int number of spectra added
+
+        """
+        count = 0
+        fields, peaks = {}, []
+
+        def flush():
+            if peaks and "precursormz" in fields:
+                self.add(fields.get("name", fields.get("db#", str(count))), float(fields["precursormz"]), peaks,
+                    fields.get("ion_mode", fields.get("ionmode")))
+                return 1
+            return 0
+
+        with open(path) as handle:
+            for line in handle:
+                line = line.strip()
+                if not line:
+                    count += flush()
+                    fields, peaks = {}, []
+                elif ":" in line and not line[0].isdigit():
+                    key, _, value = line.partition(":")
+                    fields[key.strip().lower()] = value.strip()
+                else:
+                    peaks.append(line.replace("\t", " ").split()[:2])
+        count += flush()
+        return count
+
+    def _build(self):
+        # merge the added spectra into the arrays, sorted by precursor m/z
+        if not self._pending:
+            return
+        ids, modes, precursors, bins, weights = zip(*self._pending)
+        self._pending = []
+
+        lengths = np.concatenate([np.diff(self._offsets), [len(b) for b in bins]])
+        all_ids = np.concatenate([self._ids, np.array(ids, dtype=object)])
+        all_modes = np.concatenate([self._modes, np.array(modes, dtype=object)])
+        all_precursors = np.concatenate([self._precursors, np.array(precursors, dtype=np.float64)])
+        starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]).astype(np.int64)
+        all_bins = np.concatenate([self._bins] + list(bins))
+        all_weights = np.concatenate([self._weights] + list(weights))
+
+        order = np.argsort(all_precursors, kind="mergesort")
+        offsets = np.concatenate([[0], np.cumsum(lengths[order])]).astype(np.int64)
+        # the peaks of every spectrum moved to its sorted position
+        peak_order = np.arange(offsets[-1]) + np.repeat(starts[order] - offsets[:-1], lengths[order])
+        self._ids, self._modes, self._precursors = all_ids[order], all_modes[order], all_precursors[order]
+        self._bins, self._weights = all_bins[peak_order], all_weights[peak_order]
+        self._offsets = offsets
+
+    def _score(self, first, last, bins, weights):
+        # cosine of the query with the library spectra first..last-1, in one pass over their peaks
+        start, end = self._offsets[first], self._offsets[last]
+        library_bins = self._bins[start:end]
+        spectrum = np.repeat(np.arange(last - first), np.diff(self._offsets[first:last + 1]))
+        position = np.searchsorted(bins, library_bins)
+        position[position == len(bins)] = 0
+        matched = bins[position] == library_bins if len(bins) else np.zeros(len(library_bins), dtype=bool)
+        products = np.where(matched, self._weights[start:end] * weights[position] if len(bins) else 0.0, 0.0)
+        scores = np.bincount(spectrum, weights=products, minlength=last - first)
+        counts = np.bincount(spectrum, weights=matched, minlength=last - first).astype(np.int64)
+        return scores, counts
+
+    def search(self, precursor_mz, peaks, precursor_tolerance=0.01, precursor_tolerance_unit="Da", ion_mode=None, top=5, min_score=0.0):
+        """
+
+        Search one query spectrum
+
+        Args:
+
+            precursor_mz (float): precursor m/z of the query
+
+            peaks: Peaks, ["mz intensity", ...], list of (mz, intensity) pairs, or data frame of m/z and intensity
+
+            precursor_tolerance (float): default = 0.01, tolerance ± on the precursor m/z
+
+            precursor_tolerance_unit (str): default = "Da", tolerance unit (Da or ppm)
+
+            ion_mode (str): default = None, only the library spectra of that mode (POSITIVE or NEGATIVE) if given
+
+            top (int): default = 5, number of best hits returned
+
+            min_score (float): default = 0.0, the hits with a lower cosine are left out
+
+        Returns:
+
+            Data frame of the hits with the columns Library ID, Precursor M/Z, Ion Mode, Score and Matched Peaks, best first
+
+        """
+        return self.search_batch([(None, precursor_mz, peaks)], precursor_tolerance, precursor_tolerance_unit,
+            ion_mode, top, min_score).drop(columns="Query")
+
+    def search_batch(self, queries, precursor_tolerance=0.01, precursor_tolerance_unit="Da", ion_mode=None, top=5, min_score=0.0):
+        """
+
+        Search many query spectra (e.g. all the DDA spectra of one run) in one call
+
+        Args:
+
+            queries (iterable): tuples of (query ID, precursor m/z, peaks)
+
+            the other arguments are the same as search
+
+        Returns:
+
+            Data frame of the hits with the columns Query, Library ID, Precursor M/Z, Ion Mode, Score and Matched Peaks,
+            the best hits of each query first
+
+        Raises:
+
+            TypeError if argument (precursor_tolerance_unit) is not Da or ppm
+
+        Example:
+
+            hits = library.search_batch([("scan 1", 195.088, ["69.034 120"]), ("scan 2", 181.07, ["163.06 40"])])
+
+        """
+
+        if precursor_tolerance_unit not in ("Da", "ppm"):
+            raise TypeError ("precursor_tolerance_unit argument should be string (Da or ppm)")
+        self._build()
+
+        results = []
+        for query, precursor_mz, peaks in queries:
+            window = precursor_tolerance if precursor_tolerance_unit == "Da" else precursor_mz * precursor_tolerance * 1e-6
+            first = int(np.searchsorted(self._precursors, precursor_mz - window, side="left"))
+            last = int(np.searchsorted(self._precursors, precursor_mz + window, side="right"))
+            if first == last:
+                continue
+
+            bins, weights = self._vector(*_peaks_arrays(peaks))
+            scores, counts = self._score(first, last, bins, weights)
+            candidates = np.arange(first, last)
+            keep = scores >= min_score
+            if ion_mode is not None:
+                keep &= np.array([str(mode).upper() == ion_mode.upper() for mode in self._modes[first:last]])
+            best = np.argsort(-scores[keep], kind="mergesort")[:top]
+            chosen = candidates[keep][best]
+            results.append(pd.DataFrame({
+                "Query": [query] * len(chosen),
+                "Library ID": self._ids[chosen],
+                "Precursor M/Z": self._precursors[chosen],
+                "Ion Mode": self._modes[chosen],
+                "Score": scores[keep][best],
+                "Matched Peaks": counts[keep][best],
+            }))
+
+        if not results:
+            return pd.DataFrame(columns=["Query","Library ID","Precursor M/Z","Ion Mode","Score","Matched Peaks"])
+        return pd.concat(results, ignore_index=True)
+
+    def save(self, path):
+        """
+
+        Write the library to a NumPy .npz file
+
+        """
+        self._build()
+        # a missing ion mode is written as "" (not "None") and read back as None
+        modes = np.array(["" if mode is None else str(mode) for mode in self._modes], dtype=str)
+        np.savez(path, ids=self._ids.astype(str), modes=modes, precursors=self._precursors,
+            bins=self._bins, weights=self._weights, offsets=self._offsets,
+            settings=np.array([self.bin_width, self.intensity_power]))
+
+    @classmethod
+    def load(cls, path):
+        """
+
+        Read a library written by save
+
+        """
+        data = np.load(path)
+        library = cls(float(data["settings"][0]), float(data["settings"][1]))
+        library._ids = data["ids"].astype(object)
+        # the files written before missing modes were stored as "" have "None"
+        library._modes = np.array([None if mode in ("", "None") else mode for mode in data["modes"].tolist()], dtype=object)
+        library._precursors = data["precursors"]
+        library._bins = data["bins"]
+        library._weights = data["weights"]
+        library._offsets = data["offsets"]
+        return library
@@ -0,0 +1,362 @@
+import json
+import os
+import threading
+
+from .lazy import np, pd
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+class IndexedTable:
+
+    """
+
+    A CSV table loaded once and kept in memory, with a hash index on each of its identifier columns
+
+    Args:
+
+        path (str): path of the CSV file
+
+        columns (list): the identifier columns indexed when the table is loaded
+
+        as_str (bool): default = False, index the str() of the values (so that 1234.0, nan, ... are looked up as strings)
+
+        read_csv keyword arguments (e.g. dtype=str) are passed to pandas.read_csv
+
+    Note:
+
+        The file is only read on the first lookup. Each index maps a value to the positions of its rows,
+        so a lookup costs the number of requested values instead of a scan of the table.
+        If the table was converted by build (a .columns directory next to the CSV, newer than it), its columns and indexes
+        are memory-mapped instead, and only the requested rows are decoded.
+
+    Example:
+
+        table = IndexedTable("DB//Polyphenol_Metabolites.csv", ["name","formula"], dtype=str)
+        print (table.lookup("formula", ["C28H33O16"]))
+
+    """
+
+    def __init__(self, path, columns, as_str=False, **kwargs):
+        self.path = path
+        self.columns = list(columns)
+        self.as_str = as_str
+        self.kwargs = kwargs
+        self._frame = None
+        self._indexes = {}
+        self._lock = threading.Lock()
+        self._binary = _Columns.open(path)
+
+    def __repr__(self):
+        return f"IndexedTable({self.path!r})"
+
+    @property
+    def frame(self):
+        # the whole table, read on first use
+        if self._frame is None:
+            with self._lock:
+                if self._frame is None and self._binary is not None:
+                    self._frame = self._binary.rows(np.arange(self._binary.length))
+                elif self._frame is None:
+                    frame = pd.read_csv(self.path, **self.kwargs)
+                    self._indexes = {column: self._build_index(frame, column) for column in self.columns if column in frame.columns}
+                    self._frame = frame
+        return self._frame
+
+    def _build_index(self, frame, column):
+        keys = frame[column].apply(str) if self.as_str else frame[column]
+        # positions (not labels) of the rows of every value, missing values are not indexed
+        return keys.reset_index(drop=True).groupby(keys.to_numpy(), sort=False).indices
+
+    def index(self, column):
+        """
+
+        Get the index of a column (built on the first call for a column that is not an identifier column)
+
+        Returns:
+
+            dict of value to the array of row positions
+
+        """
+        frame = self.frame
+        if column not in self._indexes:
+            with self._lock:
+                if column not in self._indexes:
+                    self._indexes[column] = self._build_index(frame, column)
+        return self._indexes[column]
+
+    def positions(self, column, values):
+        """
+
+        Get the positions of the rows whose column is one of the values, in the order of the table
+
+        """
+        found = list(self.matches(column, values).values())
+        if not found:
+            return np.array([], dtype=np.int64)
+        return np.sort(np.concatenate(found)).astype(np.int64)
+
+    def matches(self, column, values):
+        """
+
+        Get the positions of the rows of each value, in one lookup of the column index
+
+        Returns:
+
+            dict of value to the array of its row positions, the values not found are left out
+
+        """
+        if self._binary is not None and column in self._binary.indexed:
+            return self._binary.matches(column, values)
+        index = self.index(column)
+        return {value: index[value] for value in set(values) if value in index}
+
+    def lookup(self, column, values):
+        """
+
+        Get the rows whose column is one of the values
+
+        Args:
+
+            column (str): the column to look up
+
+            values (list): the requested values
+
+        Returns:
+
+            Data frame of the matching rows, in the order of the table and with their original index (like df.loc[df[column].isin(values)])
+
+        """
+        return self.rows(self.positions(column, values))
+
+    def rows(self, positions):
+        """
+
+        Get the rows at some positions (e.g. returned by positions), with their original index
+
+        """
+        if self._binary is not None:
+            return self._binary.rows(np.asarray(positions, dtype=np.int64))
+        return self.frame.take(positions)
+
+
+class _Columns:
+
+    # the memory-mapped columns of a table written by build
+    def __init__(self, directory):
+        with open(os.path.join(directory, "columns.json")) as handle:
+            meta = json.load(handle)
+        self.directory = directory
+        self.columns = meta["columns"]
+        self.strings = set(meta["strings"])
+        self.indexed = meta["indexed"]
+        self.keys = meta["keys"]
+        self.length = meta["length"]
+        self.dtypes = meta["dtypes"]
+        self._arrays = {}
+
+    @classmethod
+    def open(cls, path):
+        directory = binary_path(path)
+        meta = os.path.join(directory, "columns.json")
+        if not os.path.exists(meta):
+            return None
+        if os.path.exists(path) and os.path.getmtime(path) > os.path.getmtime(meta):
+            # the CSV was changed after the build
+            return None
+        return cls(directory)
+
+    def _load(self, name):
+        # mapped once, the pages are read by the OS when they are used
+        if name not in self._arrays:
+            self._arrays[name] = np.load(os.path.join(self.directory, name), mmap_mode="r")
+        return self._arrays[name]
+
+    def _strings(self, name):
+        return _Strings(self._load(f"{name}.npy"), self._load(f"{name}.starts.npy"))
+
+    def rows(self, positions):
+        data = {}
+        for number, column in enumerate(self.columns):
+            if column in self.strings:
+                codes = np.asarray(self._load(f"{number}.codes.npy")[positions])
+                data[column] = self._strings(f"{number}.values").take(codes)
+            else:
+                data[column] = np.asarray(self._load(f"{number}.npy")[positions]).astype(self.dtypes[column])
+        return pd.DataFrame(data, index=positions, columns=self.columns)
+
+    def matches(self, column, values):
+        # the keys are sorted, so the requested values are found by binary search
+        name = self.indexed[column]
+        keys = self._strings(self.keys[column])
+        offsets = self._load(f"{name}.offsets.npy")
+        order = self._load(f"{name}.order.npy")
+        found = {}
+        for value in {value for value in values if type(value) == str}:
+            key = keys.find(value)
+            if key is not None:
+                found[value] = np.asarray(order[offsets[key]:offsets[key + 1]], dtype=np.int64)
+        return found
+
+
+class _Strings:
+
+    # sorted distinct strings stored as one UTF-8 buffer, string i is buffer[starts[i]:starts[i + 1]]
+    def __init__(self, buffer, starts):
+        self.buffer = buffer
+        self.starts = starts
+
+    def __len__(self):
+        return len(self.starts) - 1
+
+    def encoded(self, i):
+        return self.buffer[self.starts[i]:self.starts[i + 1]].tobytes()
+
+    def find(self, value):
+        # UTF-8 bytes sort like the strings, so the buffer is searched without decoding it
+        value = value.encode("utf-8")
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self.encoded(middle) < value:
+                low = middle + 1
+            else:
+                high = middle
+        return low if low < len(self) and self.encoded(low) == value else None
+
+    def take(self, codes):
+        # only the distinct values of the rows are decoded, -1 is a missing value
+        decoded = np.full(len(codes), np.nan, dtype=object)
+        present = codes >= 0
+        distinct, inverse = np.unique(codes[present], return_inverse=True)
+        strings = np.empty(len(distinct), dtype=object)
+        strings[:] = [self.encoded(i).decode("utf-8") for i in distinct]
+        decoded[present] = strings[inverse]
+        return decoded
+
+
+def binary_path(path):
+    """
+
+    Get the directory written by build for a CSV file (e.g. DB/Polyphenol_Metabolites.columns)
+
+    """
+    return os.path.splitext(path)[0] + ".columns"
+
+
+def _sorted_index(keys):
+    # the sorted distinct keys, the rows of every key one after the other, and where the rows of each key start
+    present = pd.notna(keys)
+    distinct, codes = np.unique(keys[present].astype(str), return_inverse=True)
+    rows = np.flatnonzero(present)
+    order = rows[np.argsort(codes, kind="mergesort")]
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=len(distinct)))])
+    return distinct, order.astype(np.int64), offsets.astype(np.int64)
+
+
+def _save_strings(directory, name, distinct):
+    # one UTF-8 buffer and the int64 start of every string, instead of a fixed-width array as wide as the longest string
+    encoded = [value.encode("utf-8") for value in distinct]
+    starts = np.concatenate([[0], np.cumsum([len(value) for value in encoded], dtype=np.int64)]).astype(np.int64)
+    np.save(os.path.join(directory, f"{name}.npy"), np.frombuffer(b"".join(encoded), dtype=np.uint8))
+    np.save(os.path.join(directory, f"{name}.starts.npy"), starts)
+
+
+def build(path, columns, as_str=False, **kwargs):
+    """
+
+    Convert a CSV table into memory-mappable NumPy files, used by IndexedTable instead of the CSV from then on
+
+    Args:
+
+        the same as IndexedTable
+
+    Returns:
+
+        str path of the directory written (see binary_path)
+
+    Note:
+
+        The text columns are dictionary encoded (sorted distinct values in one UTF-8 buffer and one int32 code per row,
+        -1 for a missing value), the numeric columns keep their dtype. Each identifier column also gets the rows of every
+        sorted key (its distinct values, stored again only if as_str changes them), so nothing is built when the table
+        is loaded and many processes share the same pages of the files.
+
+    Example:
+
+        build("DB//Polyphenol_Metabolites.csv", ["name","formula"], dtype=str)
+
+    """
+    frame = pd.read_csv(path, **kwargs)
+    directory = binary_path(path)
+    os.makedirs(directory, exist_ok=True)
+
+    strings, dtypes, indexed, keys = [], {}, {}, {}
+    for number, column in enumerate(frame.columns):
+        values = frame[column].to_numpy()
+        distinct = None
+        if values.dtype == object:
+            distinct, codes = np.unique(values[pd.notna(values)].astype(str), return_inverse=True)
+            all_codes = np.full(len(values), -1, dtype=np.int32)
+            all_codes[pd.notna(values)] = codes
+            _save_strings(directory, f"{number}.values", distinct)
+            np.save(os.path.join(directory, f"{number}.codes.npy"), all_codes)
+            strings.append(column)
+        else:
+            np.save(os.path.join(directory, f"{number}.npy"), values)
+            dtypes[column] = str(values.dtype)
+
+        if column in columns:
+            column_keys = frame[column].apply(str).to_numpy() if as_str else values
+            sorted_keys, order, offsets = _sorted_index(column_keys)
+            np.save(os.path.join(directory, f"{number}.order.npy"), order)
+            np.save(os.path.join(directory, f"{number}.offsets.npy"), offsets)
+            # the distinct values of a text column are already the sorted keys
+            if distinct is not None and np.array_equal(sorted_keys, distinct):
+                keys[column] = f"{number}.values"
+            else:
+                _save_strings(directory, f"{number}.keys", sorted_keys)
+                keys[column] = f"{number}.keys"
+            indexed[column] = str(number)
+
+    # written last, a build that stopped halfway is not used
+    with open(os.path.join(directory, "columns.json"), "w") as handle:
+        json.dump({"columns": list(frame.columns), "strings": strings, "dtypes": dtypes,
+            "indexed": indexed, "keys": keys, "length": len(frame)}, handle)
+
+    with _tables_lock:
+        _tables.pop(os.path.abspath(path), None)
+    return directory
+
+
+def table(path, columns, as_str=False, **kwargs):
+    """
+
+    Get the shared IndexedTable of a CSV file, created on the first call
+
+    Args:
+
+        the same as IndexedTable
+
+    Returns:
+
+        IndexedTable, the same object for every call with the same path
+
+    """
+    key = os.path.abspath(path)
+    with _tables_lock:
+        if key not in _tables:
+            _tables[key] = IndexedTable(path, columns, as_str, **kwargs)
+        return _tables[key]
+
+
+def clear():
+    """
+
+    Drop all the loaded tables, they are read again on the next lookup (e.g. after the CSV files were updated)
+
+    """
+    with _tables_lock:
+        _tables.clear()
@@ -0,0 +1,420 @@
+import collections
+import contextvars
+import threading
+import time
+
+from . import cache
+
+
+# the settings of every host, a database name of cache.HOSTS sets all of its hosts
+# rate is in requests per second (None = no limit), burst is the number of requests sent at once after an idle time,
+# concurrency (None = no limit) caps the requests in flight, with adaptive it moves between min_concurrency and max_concurrency,
+# after failures failed requests in a row the host is not asked again for cooldown seconds
+defaults = {
+    "rate": None,
+    "burst": 1,
+    "adaptive": False,
+    "concurrency": None,
+    "min_concurrency": 1,
+    "max_concurrency": 32,
+    "slow": 3.0,
+    "failures": 5,
+    "cooldown": 30.0,
+}
+
+_settings = {}
+_hosts = {}
+_hosts_lock = threading.Lock()
+
+# the statuses of a server asking to slow down
+THROTTLED = (429, 503)
+
+# the concurrency asked by the caller (e.g. Geninfo(concurrency=8)), set by parallel and aio for the requests they run
+requested = contextvars.ContextVar("requested", default=None)
+
+
+def requesting(concurrency, function, *args):
+    # run function with requested set, in the thread (or task) that sends its requests
+    token = requested.set(concurrency)
+    try:
+        return function(*args)
+    finally:
+        requested.reset(token)
+
+
+class TokenBucket:
+
+    """
+
+    Pace the requests to one host to an average rate, allowing short bursts
+
+    Args:
+
+        rate (float): requests per second
+
+        burst (int): default = 1, number of requests that can be sent at once after an idle time
+
+    Note:
+
+        A request takes a token, or reserves the next one and waits for it, so the waiting can be done with time.sleep
+        in a thread or asyncio.sleep in an event loop with the same bucket.
+
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+
+        Take a token
+
+        Returns:
+
+            float seconds to wait before sending the request (0 if a token was available)
+
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class Controller:
+
+    """
+
+    Limit of the requests in flight to one host, fixed or adaptive (AIMD)
+
+    Args:
+
+        concurrency (int): default = None, the limit (None = no limit), or with adaptive the starting limit
+                           (None = the concurrency asked by the caller, e.g. Geninfo(concurrency=8), else max_concurrency)
+
+        min_concurrency (int): default = 1, the adaptive limit never goes below it
+
+        max_concurrency (int): default = 32, the adaptive limit never goes above it
+
+        slow (float): default = 3.0, with adaptive an answer slower than slow times the usual latency (90th percentile
+                      of the recent answers) counts as a spike
+
+        adaptive (bool): default = False, adapt the limit to the answers of the host
+
+    Note:
+
+        The adaptive limit grows by one after a full window of healthy answers (additive increase), and is halved after
+        a 429/503 answer or a latency spike (multiplicative decrease), at most once per window of limit answers.
+        Latency spikes are only looked for once min_samples answers are known, so the jitter of the first answers does not count.
+
+    """
+
+    # answers kept for the usual latency, and answers needed before a spike can lower the limit
+    samples = 64
+    min_samples = 20
+
+    def __init__(self, concurrency=None, min_concurrency=1, max_concurrency=32, slow=3.0, adaptive=False):
+        self.adaptive = adaptive
+        self.configured = concurrency is not None
+        if concurrency is not None:
+            self.limit = float(concurrency)
+        else:
+            self.limit = float(max_concurrency) if adaptive else None
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.slow = slow
+        self.in_flight = 0
+        self.latencies = collections.deque(maxlen=self.samples)
+        self._seeded = self.configured
+        self._decreased = False
+        self._answers = 0
+        self._condition = threading.Condition()
+        self._waiters = []
+
+    @property
+    def latency(self):
+        # the usual latency: 90th percentile of the recent answers
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(0.9 * len(ordered)))]
+
+    def seed(self, concurrency):
+        """
+
+        Start the adaptive limit at the concurrency asked by the caller, if it was not configured and was not lowered yet
+
+        """
+        if concurrency is None or not self.adaptive or self.configured:
+            return
+        with self._condition:
+            if self._decreased:
+                return
+            concurrency = float(min(self.max_concurrency, max(self.min_concurrency, concurrency)))
+            self.limit = concurrency if not self._seeded else max(self.limit, concurrency)
+            self._seeded = True
+            self._condition.notify_all()
+
+    def _take(self):
+        if self.limit is None or self.in_flight < max(1, int(self.limit)):
+            self.in_flight += 1
+            return True
+        return False
+
+    def acquire(self):
+        """
+
+        Wait (blocking the thread) until a request can be sent
+
+        """
+        self.seed(requested.get())
+        with self._condition:
+            while not self._take():
+                self._condition.wait()
+
+    async def aacquire(self):
+        """
+
+        Wait (without blocking the event loop) until a request can be sent
+
+        """
+        import asyncio
+
+        self.seed(requested.get())
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                if self._take():
+                    return
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter))
+            await waiter
+
+    def release(self, status=None, latency=None):
+        """
+
+        Mark a request as done and adapt the limit
+
+        Args:
+
+            status (int): default = None, the HTTP status of the answer (None if the request failed)
+
+            latency (float): default = None, seconds the request took
+
+        """
+        with self._condition:
+            self.in_flight -= 1
+            if self.adaptive:
+                self._adapt(status, latency)
+            self._condition.notify_all()
+            waiters, self._waiters = self._waiters, []
+
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+
+    def _adapt(self, status, latency):
+        self._answers += 1
+        usual = self.latency
+        spike = (latency is not None and usual is not None and len(self.latencies) >= self.min_samples
+            and latency > self.slow * usual)
+        if status in THROTTLED or spike:
+            # one decrease per window, the answers of requests sent before it are from the old limit
+            if not self._decreased or self._answers >= self.limit:
+                self.limit = max(self.min_concurrency, self.limit / 2)
+                self._decreased = True
+                self._answers = 0
+        elif status is not None and status < 400:
+            self.limit = min(self.max_concurrency, self.limit + 1 / max(1.0, self.limit))
+        if latency is not None and status is not None and status not in THROTTLED:
+            self.latencies.append(latency)
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class Breaker:
+
+    """
+
+    Circuit breaker of one host, to fail fast while the host is down instead of waiting for every timeout
+
+    Args:
+
+        failures (int): default = 5, number of failed requests in a row that opens the circuit
+
+        cooldown (float): default = 30.0, seconds the circuit stays open
+
+    Note:
+
+        When the cooldown is over one request is let through (half open): the circuit closes if it succeeds,
+        and opens again for another cooldown if it fails.
+
+    """
+
+    def __init__(self, failures=5, cooldown=30.0):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.failed = 0
+        self.opened_at = None
+        self.trial_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.cooldown:
+            return "open"
+        return "half open"
+
+    def allow(self):
+        """
+
+        Tell if a request can be sent now
+
+        Returns:
+
+            None if it can, else the seconds left before the host is tried again
+
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return None
+            now = time.monotonic()
+            left = self.cooldown - (now - self.opened_at)
+            if left > 0:
+                return left
+            if self.trial_at is not None and now - self.trial_at < self.cooldown:
+                # the trial request is not answered yet
+                return self.cooldown - (now - self.trial_at)
+            self.trial_at = now
+            return None
+
+    def success(self):
+        with self._lock:
+            self.failed = 0
+            self.opened_at = None
+            self.trial_at = None
+
+    def failure(self):
+        with self._lock:
+            self.failed += 1
+            if self.trial_at is not None or self.failed >= self.failures:
+                self.opened_at = time.monotonic()
+            self.trial_at = None
+
+
+class Host:
+
+    """
+
+    The rate limiter, the concurrency controller and the circuit breaker of one host
+
+    """
+
+    def __init__(self, rate=None, burst=1, adaptive=False, concurrency=None, min_concurrency=1, max_concurrency=32, slow=3.0,
+            failures=5, cooldown=30.0):
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.controller = Controller(concurrency, min_concurrency, max_concurrency, slow, adaptive)
+        self.breaker = Breaker(failures, cooldown)
+        self.resume_at = 0.0
+
+    def delay(self):
+        # seconds to wait for a token, or for the end of a Retry-After
+        wait = self.bucket.reserve() if self.bucket is not None else 0.0
+        return max(wait, self.resume_at - time.monotonic())
+
+    def throttled(self, retry_after=None):
+        # the server asked to slow down, stop sending requests for the time it gave
+        if retry_after:
+            self.resume_at = max(self.resume_at, time.monotonic() + retry_after)
+
+
+def configure(database=None, **kwargs):
+    """
+
+    Set the rate limit and the concurrency of a database (or of all the hosts)
+
+    Args:
+
+        database (str): default = None, a database name (HMDB, LMDB, YMDB, T3DB, ReSpect) or a host name,
+        None changes the defaults of all the hosts
+
+        rate (float): requests per second (None = no limit)
+
+        burst (int): number of requests sent at once after an idle time
+
+        adaptive (bool): adapt the number of requests in flight to the answers of the host (default = False)
+
+        concurrency (int): number of requests in flight at the same time (None = as many as the caller sends),
+        with adaptive the starting number (None = the concurrency asked by the caller)
+
+        min_concurrency (int): the adaptive concurrency never goes below it
+
+        max_concurrency (int): the adaptive concurrency never goes above it
+
+        slow (float): with adaptive, an answer slower than slow times the usual latency makes the concurrency back off
+
+        failures (int): number of failed requests in a row after which the host is not asked for cooldown seconds
+
+        cooldown (float): seconds requests to a failing host fail at once (transport.CircuitOpen) before it is tried again
+
+    Raises:
+
+        TypeError if an argument is not one of the settings above, or the database is not known
+
+    Example:
+
+        configure("HMDB", rate=5, burst=5, adaptive=True, max_concurrency=8)
+
+    """
+
+    for key in kwargs:
+        if key not in defaults:
+            raise TypeError (f"configure got an unexpected argument ({key})")
+
+    if database is None:
+        defaults.update(kwargs)
+        hosts = list(_hosts)
+    elif database in cache.HOSTS:
+        hosts = cache.HOSTS[database]
+    elif "." in database:
+        hosts = [database.lower()]
+    else:
+        raise TypeError (f"database argument should be a host name or from {list(cache.HOSTS)}")
+
+    with _hosts_lock:
+        if database is not None:
+            for host in hosts:
+                _settings.setdefault(host, {}).update(kwargs)
+        # the hosts are created again with the new settings
+        for host in hosts:
+            _hosts.pop(host, None)
+
+
+def host(name):
+    """
+
+    Get the Host (rate limiter and concurrency controller) of a host name, created on first use
+
+    """
+    name = (name or "").lower()
+    with _hosts_lock:
+        if name not in _hosts:
+            _hosts[name] = Host(**dict(defaults, **_settings.get(name, {})))
+        return _hosts[name]
+
+
+def retry_after(headers):
+    # seconds of a Retry-After header (the HTTP date form is not used by these servers)
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
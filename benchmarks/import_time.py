@@ -0,0 +1,80 @@
+"""
+
+Import-time regression benchmark
+
+Each case is run in a fresh interpreter: it imports one module of the package and reports the time it took
+and the heavy dependencies it loaded. A case fails if it loads a dependency it should not need, or if it is
+slower than --max-ms.
+
+Usage:
+
+    python benchmarks/import_time.py [--repeat 5] [--max-ms 300]
+
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# module, attribute used, the dependencies that must not be imported by it
+CASES = [
+    ("BEDB", "GetInfo", ["matplotlib", "pandas", "numpy", "asyncio"]),
+    ("PEDB", "GetInfo", ["matplotlib", "pandas", "numpy", "asyncio"]),
+    ("HMDB", "Search", ["matplotlib", "pandas", "numpy", "asyncio", "lxml"]),
+    ("LMDB", "Geninfo", ["matplotlib", "pandas", "numpy", "asyncio"]),
+    ("YMDB", "Geninfo", ["matplotlib", "pandas", "numpy", "asyncio"]),
+    ("T3DP", "Geninfo", ["matplotlib", "pandas", "numpy", "asyncio"]),
+    ("respectDB", "AccData", ["matplotlib", "pandas", "numpy", "asyncio"]),
+]
+
+HEAVY = ["matplotlib", "pandas", "numpy", "lxml", "asyncio"]
+
+SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+# the package of this checkout, not an installed copy
+import Xconnector_pkg as package
+module = __import__(package.__name__ + ".{module}", fromlist=["{attribute}"])
+getattr(module, "{attribute}")
+elapsed = time.perf_counter() - started
+print(json.dumps({{"ms": elapsed * 1000, "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def run_case(module, attribute):
+    code = SCRIPT.format(root=ROOT, module=module, attribute=attribute, heavy=HEAVY)
+    output = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="runs of each case, the median is reported")
+    parser.add_argument("--max-ms", type=float, default=None, help="fail if a case takes longer (median)")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'case':<22}{'median ms':>10}  loaded")
+    for module, attribute, forbidden in CASES:
+        runs = [run_case(module, attribute) for _ in range(args.repeat)]
+        median = statistics.median(run["ms"] for run in runs)
+        loaded = runs[-1]["loaded"]
+        problems = [f"loads {name}" for name in loaded if name in forbidden]
+        if args.max_ms is not None and median > args.max_ms:
+            problems.append(f"slower than {args.max_ms:.0f} ms")
+        failed = failed or bool(problems)
+        print(f"{module + '.' + attribute:<22}{median:>10.1f}  {', '.join(loaded) or '-'}"
+            + (f"  FAIL: {'; '.join(problems)}" if problems else ""))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()